@@ -2,14 +2,39 @@ import asyncio
 import uuid
 import random
 import json
+from collections import OrderedDict, deque
 from typing import Dict, Any, List, Optional, Tuple
 import numpy as np
 from ..core.vector3 import Vector3
+from ..core.spatial_hash import SpatialHashGrid
+from .npc_batch import NPCBatch, chance_over_ticks
+from .intent_matcher import IntentMatcher
+
+# Cell size for the NPC/user spatial index, sized for the usual 50 unit interest radius
+ENTITY_CELL_SIZE = 50.0
+ENTITY_CELL_HEIGHT = 1000.0
 
 class AISystem:
-    def __init__(self):
+    def __init__(self, spatial_index: Optional[SpatialHashGrid] = None, batched: bool = False,
+                 seed: Optional[int] = None, near_radius: float = 50.0, mid_radius: float = 150.0,
+                 mid_interval: int = 4, max_fast_forward: int = 200):
         # Store NPC instances
         self.npcs = {}
+        # Level of detail: NPCs within near_radius of a player update every tick,
+        # within mid_radius every mid_interval ticks, the rest stay frozen and are
+        # fast-forwarded (up to max_fast_forward ticks) once a player comes close
+        self.tick = 0
+        self.near_radius = near_radius
+        self.mid_radius = mid_radius
+        self.mid_interval = mid_interval
+        self.max_fast_forward = max_fast_forward
+        self.lod_stats = {"near": 0, "mid": 0, "far": 0, "updated": 0}
+        # In batched mode NPC state lives in arrays and all NPCs step together
+        self.batch = NPCBatch(seed=seed) if batched else None
+        # Spatial index NPCs register into as ("npc", npc_id), may be shared with users
+        if spatial_index is None:
+            spatial_index = SpatialHashGrid(ENTITY_CELL_SIZE, cell_height=ENTITY_CELL_HEIGHT)
+        self.spatial_index = spatial_index
         # Track memory and behavior models
         self.dialogue_model = DialogueModel()
         self.behavior_model = BehaviorModel()
@@ -18,24 +43,140 @@ class AISystem:
         """Initialize AI system components"""
         await self.dialogue_model.initialize()
         await self.behavior_model.initialize()
+        if self.batch is not None:
+            self.batch.build_action_table(self.behavior_model.behaviors)
         
     async def create_npc(self, position: Vector3, personality_type: str = "default") -> str:
         """Create a new NPC at the given position"""
         npc_id = f"npc_{uuid.uuid4()}"
-        npc = NPC(npc_id, position, personality_type, self.dialogue_model, self.behavior_model)
+        if self.batch is not None:
+            npc = BatchedNPC(self.batch, npc_id, position, personality_type, self.dialogue_model, self.behavior_model)
+        else:
+            npc = NPC(npc_id, position, personality_type, self.dialogue_model, self.behavior_model)
         await npc.initialize()
-        self.npcs[npc_id] = npc
+        self._add_npc(npc)
+        return npc_id
+        
+    async def restore_npc(self, npc_data: Dict[str, Any]) -> str:
+        """Recreate an NPC saved with Database.save_npc, memory included"""
+        npc_id = npc_data["npc_id"]
+        position = npc_data["position"]
+        personality_type = npc_data["personality_type"]
+        if self.batch is not None:
+            npc = BatchedNPC(self.batch, npc_id, position, personality_type, self.dialogue_model, self.behavior_model)
+        else:
+            npc = NPC(npc_id, position, personality_type, self.dialogue_model, self.behavior_model)
+        npc.attributes = npc_data["attributes"]
+        memory_data = npc_data["memory_data"]
+        if "identity" in memory_data:
+            npc.memory = NPCMemory.from_dict(memory_data)
+        else:
+            # Older rows stored only the identity
+            npc.memory.add_identity(npc.attributes)
+        self._add_npc(npc)
         return npc_id
         
+    def _add_npc(self, npc: 'NPC'):
+        npc.last_update_tick = self.tick
+        self.npcs[npc.id] = npc
+        position = npc.position
+        self.spatial_index.update_point(("npc", npc.id), position.x, position.y, position.z)
+        
     async def remove_npc(self, npc_id: str):
         """Remove an NPC from the system"""
         if npc_id in self.npcs:
-            del self.npcs[npc_id]
+            npc = self.npcs.pop(npc_id)
+            if isinstance(npc, BatchedNPC):
+                npc.detach()
+        self.spatial_index.remove(("npc", npc_id))
             
-    async def update_npcs(self):
-        """Update all NPCs"""
-        for npc in list(self.npcs.values()):
-            await npc.update()
+    async def update_npcs(self, player_positions: Optional[List[Vector3]] = None):
+        """Update NPCs, only those near the given players if positions are passed"""
+        self.tick += 1
+        if self.batch is not None:
+            await self.update_batch(player_positions)
+            return
+            
+        if player_positions is None:
+            near_ids = list(self.npcs)
+            mid_ids = []
+        else:
+            near_ids, mid_ids = self.classify_npcs(player_positions)
+            
+        due = near_ids + [
+            npc_id for npc_id in mid_ids
+            if self.tick - self.npcs[npc_id].last_update_tick >= self.mid_interval
+        ]
+        self.record_lod(len(near_ids), len(mid_ids), len(due))
+        
+        index = self.spatial_index
+        for npc_id in due:
+            npc = self.npcs.get(npc_id)
+            if npc is None:
+                continue
+            ticks = min(self.tick - npc.last_update_tick, self.max_fast_forward)
+            npc.last_update_tick = self.tick
+            await npc.update(ticks)
+            
+            position = npc.position
+            index.update_point(("npc", npc_id), position.x, position.y, position.z)
+            
+    async def update_batch(self, player_positions: Optional[List[Vector3]] = None):
+        """Step the batched NPCs that are due this tick in one call"""
+        batch = self.batch
+        if player_positions is None:
+            rows = np.arange(batch.count)
+            self.record_lod(batch.count, 0, batch.count)
+        else:
+            npcs = self.npcs
+            near_ids, mid_ids = self.classify_npcs(player_positions)
+            near_rows = np.fromiter((npcs[npc_id]._slot for npc_id in near_ids), dtype=np.intp, count=len(near_ids))
+            mid_rows = np.fromiter((npcs[npc_id]._slot for npc_id in mid_ids), dtype=np.intp, count=len(mid_ids))
+            mid_rows = mid_rows[self.tick - batch.last_ticks[mid_rows] >= self.mid_interval]
+            rows = np.concatenate((near_rows, mid_rows))
+            self.record_lod(len(near_ids), len(mid_ids), len(rows))
+        
+        ticks = np.minimum(self.tick - batch.last_ticks[rows], self.max_fast_forward)
+        batch.last_ticks[rows] = self.tick
+        moved = batch.step(rows, ticks)
+        self.reindex_batch(moved)
+        
+    def classify_npcs(self, player_positions: List[Vector3]) -> Tuple[List[str], List[str]]:
+        """Split NPCs around players into near and mid-range ids, everything else is far"""
+        index = self.spatial_index
+        near = set()
+        mid = set()
+        for position in player_positions:
+            for kind, entity_id in index.query_radius(position.x, position.y, position.z, self.mid_radius):
+                if kind == "npc":
+                    mid.add(entity_id)
+            for kind, entity_id in index.query_radius(position.x, position.y, position.z, self.near_radius):
+                if kind == "npc":
+                    near.add(entity_id)
+        mid -= near
+        return list(near), list(mid)
+        
+    def record_lod(self, near: int, mid: int, updated: int):
+        self.lod_stats = {
+            "near": near,
+            "mid": mid,
+            "far": len(self.npcs) - near - mid,
+            "updated": updated
+        }
+        
+    def reindex_npcs(self):
+        """Refresh NPC positions in the spatial index (cheap for NPCs that stay in their cell)"""
+        index = self.spatial_index
+        for npc_id, npc in self.npcs.items():
+            position = npc.position
+            index.update_point(("npc", npc_id), position.x, position.y, position.z)
+            
+    def reindex_batch(self, slots):
+        """Refresh the spatial index for the batched NPCs in the given slots"""
+        index = self.spatial_index
+        npcs = self.batch.npcs
+        for slot, (x, y, z) in zip(slots.tolist(), self.batch.positions[slots].tolist()):
+            index.update_point(("npc", npcs[slot].id), x, y, z)
             
     async def get_npc_state(self, npc_id: str) -> Optional[Dict[str, Any]]:
         """Get the current state of an NPC"""
@@ -57,13 +198,11 @@ class AISystem:
         
     def get_npcs_in_range(self, position: Vector3, range_limit: float) -> List[str]:
         """Get IDs of all NPCs within range of a position"""
-        in_range = []
-        
-        for npc_id, npc in self.npcs.items():
-            if self.is_in_range(position, npc.position, range_limit):
-                in_range.append(npc_id)
-                
-        return in_range
+        return [
+            entity_id
+            for kind, entity_id in self.spatial_index.query_radius(position.x, position.y, position.z, range_limit)
+            if kind == "npc"
+        ]
         
     def is_in_range(self, pos1: Vector3, pos2: Vector3, range_limit: float) -> bool:
         """Check if two positions are within range"""
@@ -90,6 +229,7 @@ class NPC:
         self.target_position = None
         self.path = []
         self.interaction_cooldown = 0
+        self.last_update_tick = 0
         
         # NPC attributes
         self.attributes = {
@@ -204,54 +344,81 @@ class NPC:
         num_dislikes = random.randint(1, 3)
         return random.sample(all_dislikes, num_dislikes)
         
-    async def update(self):
-        """Update NPC state and behavior"""
+    async def update(self, ticks: int = 1):
+        """Update NPC state and behavior, ticks > 1 covers several ticks in one step"""
         # Update cooldowns
         if self.interaction_cooldown > 0:
-            self.interaction_cooldown -= 1
+            self.interaction_cooldown = max(0, self.interaction_cooldown - ticks)
+            
+        # Walk the expected distance of any skipped ticks before the normal step
+        if ticks > 1:
+            self.catch_up_walk(ticks - 1)
             
         # Get behavior action from model
         behavior_action = await self.behavior_model.get_action(self)
         
         # Execute behavior
-        await self.execute_behavior(behavior_action)
+        await self.execute_behavior(behavior_action, ticks)
         
-    async def execute_behavior(self, behavior_action: Dict[str, Any]):
+    def catch_up_walk(self, skipped_ticks: int):
+        """Move toward the target as far as the NPC would walk on average in the skipped ticks"""
+        target = self.target_position
+        if target is None:
+            return
+            
+        position = self.position
+        dx = target.x - position.x
+        dy = target.y - position.y
+        dz = target.z - position.z
+        distance = (dx*dx + dy*dy + dz*dz) ** 0.5
+        if distance <= 0.1:
+            self.target_position = None
+            return
+            
+        travel = min(0.05 * skipped_ticks * self.behavior_model.walk_share, distance)
+        position.x += dx / distance * travel
+        position.y += dy / distance * travel
+        position.z += dz / distance * travel
+        self.position = position
+        self.rotation = float((np.degrees(np.arctan2(dz, dx)) + 90) % 360)
+        
+    async def execute_behavior(self, behavior_action: Dict[str, Any], ticks: int = 1):
         """Execute a behavior action"""
         action_type = behavior_action.get("type", "idle")
         
         if action_type == "idle":
             # Maybe slightly rotate or look around
-            if random.random() < 0.1:
+            if random.random() < chance_over_ticks(0.1, ticks):
                 self.rotation = (self.rotation + random.uniform(-10, 10)) % 360
                 
         elif action_type == "walk":
             # Move towards a target position if set
-            if self.target_position:
-                direction = Vector3(
-                    self.target_position.x - self.position.x,
-                    self.target_position.y - self.position.y,
-                    self.target_position.z - self.position.z
-                )
+            target = self.target_position
+            if target:
+                position = self.position
+                dx = target.x - position.x
+                dy = target.y - position.y
+                dz = target.z - position.z
                 # Normalize direction and set speed
-                distance = (direction.x**2 + direction.y**2 + direction.z**2) ** 0.5
+                distance = (dx**2 + dy**2 + dz**2) ** 0.5
                 if distance > 0.1:
                     speed = 0.05  # Units per update
-                    direction.x /= distance
-                    direction.y /= distance
-                    direction.z /= distance
+                    dx /= distance
+                    dy /= distance
+                    dz /= distance
                     
-                    # Update position
-                    self.position.x += direction.x * speed
-                    self.position.y += direction.y * speed
-                    self.position.z += direction.z * speed
+                    # Update position (assigned back so batched NPCs see the write)
+                    position.x += dx * speed
+                    position.y += dy * speed
+                    position.z += dz * speed
+                    self.position = position
                     
                     # Update rotation to face movement direction
-                    self.rotation = (np.degrees(np.arctan2(direction.z, direction.x)) + 90) % 360
+                    self.rotation = float((np.degrees(np.arctan2(dz, dx)) + 90) % 360)
                 else:
                     # Reached target, clear it
                     self.target_position = None
-            elif random.random() < 0.01:  # 1% chance to pick a new position
+            elif random.random() < chance_over_ticks(0.01, ticks):  # 1% chance per tick to pick a new position
                 # Pick a random position nearby
                 self.target_position = Vector3(
                     self.position.x + random.uniform(-10, 10),
@@ -374,14 +541,130 @@ class NPC:
             "appearance": self.attributes["appearance"]
         }
 
+class BatchedNPC(NPC):
+    """NPC whose movement and behavior state is a row in an NPCBatch.
+    
+    position and target_position return fresh Vector3 copies of the row;
+    assign them back to write. After detach() the NPC keeps its last state
+    as plain attributes.
+    """
+    
+    def __init__(self, batch: NPCBatch, *args, **kwargs):
+        self._batch = batch
+        self._slot = batch.allocate(self)
+        super().__init__(*args, **kwargs)
+        
+    def detach(self):
+        """Release the batch row and keep a local copy of its state"""
+        if self._batch is None:
+            return
+        state = (self.position, self.target_position, self.rotation, self.interaction_cooldown,
+                 self.behavior_state, self.last_update_tick)
+        self._batch.release(self._slot)
+        self._batch = None
+        self._slot = None
+        self.__dict__.update(zip(
+            ("_position", "_target_position", "_rotation", "_interaction_cooldown", "_behavior_state",
+             "_last_update_tick"), state
+        ))
+        
+    @property
+    def position(self) -> Vector3:
+        if self._batch is None:
+            return self._position
+        x, y, z = self._batch.positions[self._slot].tolist()
+        return Vector3(x, y, z)
+        
+    @position.setter
+    def position(self, value: Vector3):
+        if self._batch is None:
+            self._position = value
+        else:
+            self._batch.positions[self._slot] = (value.x, value.y, value.z)
+            
+    @property
+    def target_position(self) -> Optional[Vector3]:
+        if self._batch is None:
+            return self._target_position
+        if not self._batch.has_target[self._slot]:
+            return None
+        x, y, z = self._batch.targets[self._slot].tolist()
+        return Vector3(x, y, z)
+        
+    @target_position.setter
+    def target_position(self, value: Optional[Vector3]):
+        if self._batch is None:
+            self._target_position = value
+        elif value is None:
+            self._batch.has_target[self._slot] = False
+        else:
+            self._batch.targets[self._slot] = (value.x, value.y, value.z)
+            self._batch.has_target[self._slot] = True
+            
+    @property
+    def rotation(self) -> float:
+        if self._batch is None:
+            return self._rotation
+        return float(self._batch.rotations[self._slot])
+        
+    @rotation.setter
+    def rotation(self, value: float):
+        if self._batch is None:
+            self._rotation = value
+        else:
+            self._batch.rotations[self._slot] = value
+            
+    @property
+    def interaction_cooldown(self) -> int:
+        if self._batch is None:
+            return self._interaction_cooldown
+        return int(self._batch.cooldowns[self._slot])
+        
+    @interaction_cooldown.setter
+    def interaction_cooldown(self, value: int):
+        if self._batch is None:
+            self._interaction_cooldown = value
+        else:
+            self._batch.cooldowns[self._slot] = value
+            
+    @property
+    def behavior_state(self) -> str:
+        if self._batch is None:
+            return self._behavior_state
+        return self._batch.state_names[self._batch.states[self._slot]]
+        
+    @behavior_state.setter
+    def behavior_state(self, value: str):
+        if self._batch is None:
+            self._behavior_state = value
+        else:
+            self._batch.states[self._slot] = self._batch.state_code(value)
+            
+    @property
+    def last_update_tick(self) -> int:
+        if self._batch is None:
+            return self._last_update_tick
+        return int(self._batch.last_ticks[self._slot])
+        
+    @last_update_tick.setter
+    def last_update_tick(self, value: int):
+        if self._batch is None:
+            self._last_update_tick = value
+        else:
+            self._batch.last_ticks[self._slot] = value
+
 class DialogueModel:
     def __init__(self):
         # In a real implementation, this would load a language model
         # but for this example, we'll use templates and simple logic
         self.templates = {}
+        self.intent_matcher = None
         
     async def initialize(self):
         """Load templates and prepare the model"""
+        # Compile the keyword intents once
+        self.intent_matcher = IntentMatcher.from_file()
+        
         # Load response templates
         self.templates = {
             "greeting": [
@@ -420,24 +703,8 @@ class DialogueModel:
         """Generate a response based on the input message"""
         message = message.lower().strip()
         
-        # Simple keyword matching for response templates
-        response_type = "unknown"
-        
-        # Check for greetings
-        if any(word in message for word in ["hello", "hi", "hey", "greetings"]):
-            response_type = "greeting"
-        # Check for farewells
-        elif any(word in message for word in ["goodbye", "bye", "farewell", "see you"]):
-            response_type = "farewell"
-        # Check for questions about the NPC
-        elif any(word in message for word in ["who are you", "your name", "about you", "yourself"]):
-            response_type = "about_self"
-        # Check for questions about location
-        elif any(word in message for word in ["where", "place", "area", "location", "region"]):
-            response_type = "about_location"
-        # Check for questions about weather
-        elif any(word in message for word in ["weather", "rain", "sunny", "temperature"]):
-            response_type = "about_weather"
+        # Keyword matching for response templates (see data/intents.json)
+        response_type = self.intent_matcher.classify(message)
             
         # Get a random template from the appropriate category
         templates = self.templates.get(response_type, self.templates["unknown"])
@@ -457,6 +724,10 @@ class DialogueModel:
 class BehaviorModel:
     def __init__(self):
         self.behaviors = {}
+        self.behavior_types = []
+        self.behavior_weights = []
+        # Share of ticks spent walking, used to fast-forward NPCs that skipped ticks
+        self.walk_share = 0.0
         
     async def initialize(self):
         """Initialize behavior patterns"""
@@ -484,6 +755,13 @@ class BehaviorModel:
                 ]
             }
         }
+        self.behavior_types = list(self.behaviors)
+        self.behavior_weights = [data["weight"] for data in self.behaviors.values()]
+        total_weight = sum(self.behavior_weights)
+        self.walk_share = sum(
+            data["weight"] / total_weight * sum(action["type"] == "walk" for action in data["actions"]) / len(data["actions"])
+            for data in self.behaviors.values()
+        )
         
     async def get_action(self, npc: NPC) -> Dict[str, Any]:
         """Get the next action for an NPC based on its state"""
@@ -492,25 +770,48 @@ class BehaviorModel:
             return random.choice(self.behaviors["idle"]["actions"])
             
         # Select a behavior type based on weights
-        behavior_types = []
-        weights = []
-        
-        for behavior_type, data in self.behaviors.items():
-            behavior_types.append(behavior_type)
-            weights.append(data["weight"])
-            
-        behavior_type = random.choices(behavior_types, weights=weights, k=1)[0]
+        behavior_type = random.choices(self.behavior_types, weights=self.behavior_weights, k=1)[0]
         
         # Return a random action from the selected behavior
         return random.choice(self.behaviors[behavior_type]["actions"])
 
 class NPCMemory:
-    def __init__(self):
+    """Bounded memory of one NPC.
+    
+    Interactions and dialogues are kept in fixed-size ring buffers, each known
+    user keeps a short history of their own interactions, and known users are
+    evicted least recently seen first. Everything that falls out of a buffer
+    is still counted in the summary counters, so memory per NPC stays
+    constant however popular the NPC gets. The ids of the last
+    max_evicted_users evicted users are kept so has_met_user still
+    recognises them.
+    """
+    
+    __slots__ = (
+        "identity", "known_users", "interactions", "dialogue_history", "knowledge",
+        "user_histories", "interaction_counts", "total_interactions", "total_dialogues",
+        "forgotten_users", "evicted_users", "max_known_users", "max_user_history", "max_evicted_users"
+    )
+    
+    def __init__(self, max_interactions: int = 50, max_dialogues: int = 20,
+                 max_known_users: int = 1024, max_user_history: int = 5, max_evicted_users: int = 4096):
         self.identity = {}
-        self.known_users = {}
-        self.interactions = []
-        self.dialogue_history = []
+        self.known_users: 'OrderedDict[str, Dict[str, Any]]' = OrderedDict()
+        self.interactions = deque(maxlen=max_interactions)
+        self.dialogue_history = deque(maxlen=max_dialogues)
         self.knowledge = {}
+        # Last few interactions per user, bounded like known_users
+        self.user_histories: 'OrderedDict[str, deque]' = OrderedDict()
+        # Summary of everything seen, including entries already evicted
+        self.interaction_counts: Dict[str, int] = {}
+        self.total_interactions = 0
+        self.total_dialogues = 0
+        self.forgotten_users = 0
+        # Ids of users evicted from known_users, oldest first
+        self.evicted_users: 'OrderedDict[str, None]' = OrderedDict()
+        self.max_known_users = max_known_users
+        self.max_user_history = max_user_history
+        self.max_evicted_users = max_evicted_users
         
     def add_identity(self, identity_data: Dict[str, Any]):
         """Add identity information to memory"""
@@ -518,23 +819,42 @@ class NPCMemory:
         
     def add_user_info(self, user_id: str, key: str, value: Any):
         """Add or update information about a user"""
-        if user_id not in self.known_users:
-            self.known_users[user_id] = {}
+        info = self.known_users.get(user_id)
+        if info is None:
+            info = self.known_users[user_id] = {}
+            self.evicted_users.pop(user_id, None)
+            if len(self.known_users) > self.max_known_users:
+                evicted_id, _ = self.known_users.popitem(last=False)
+                self.forgotten_users += 1
+                self.evicted_users[evicted_id] = None
+                if len(self.evicted_users) > self.max_evicted_users:
+                    self.evicted_users.popitem(last=False)
+        else:
+            self.known_users.move_to_end(user_id)
             
-        self.known_users[user_id][key] = value
+        info[key] = value
         
     def add_interaction(self, user_id: str, interaction_type: str, data: Dict[str, Any]):
         """Record an interaction with a user"""
-        self.interactions.append({
+        interaction = {
             "user_id": user_id,
             "timestamp": self.get_timestamp(),
             "type": interaction_type,
             "data": data
-        })
+        }
+        self.interactions.append(interaction)
+        
+        history = self.user_histories.get(user_id)
+        if history is None:
+            history = self.user_histories[user_id] = deque(maxlen=self.max_user_history)
+            if len(self.user_histories) > self.max_known_users:
+                self.user_histories.popitem(last=False)
+        else:
+            self.user_histories.move_to_end(user_id)
+        history.append(interaction)
         
-        # Trim history if it gets too long
-        if len(self.interactions) > 50:
-            self.interactions = self.interactions[-50:]
+        self.total_interactions += 1
+        self.interaction_counts[interaction_type] = self.interaction_counts.get(interaction_type, 0) + 1
             
     def add_dialogue(self, user_message: str, npc_response: str):
         """Record a dialogue exchange"""
@@ -543,22 +863,71 @@ class NPCMemory:
             "user_message": user_message,
             "npc_response": npc_response
         })
-        
-        # Trim history if it gets too long
-        if len(self.dialogue_history) > 20:
-            self.dialogue_history = self.dialogue_history[-20:]
+        self.total_dialogues += 1
             
     def has_met_user(self, user_id: str) -> bool:
-        """Check if the NPC has met this user before"""
-        return user_id in self.known_users
+        """Check if the NPC has met this user before, evicted users included"""
+        return user_id in self.known_users or user_id in self.evicted_users
         
     def get_user_info(self, user_id: str) -> Dict[str, Any]:
         """Get known information about a user"""
         return self.known_users.get(user_id, {})
         
+    def get_user_history(self, user_id: str) -> List[Dict[str, Any]]:
+        """Get the most recent interactions with a user"""
+        return list(self.user_histories.get(user_id, ()))
+        
     def get_recent_dialogues(self, limit: int = 5) -> List[Dict[str, Any]]:
         """Get the most recent dialogue exchanges"""
-        return self.dialogue_history[-limit:]
+        return list(self.dialogue_history)[-limit:]
+        
+    def get_summary(self) -> Dict[str, Any]:
+        """Get counters covering everything the NPC has seen"""
+        return {
+            "total_interactions": self.total_interactions,
+            "total_dialogues": self.total_dialogues,
+            "interaction_counts": dict(self.interaction_counts),
+            "known_users": len(self.known_users),
+            "forgotten_users": self.forgotten_users
+        }
+        
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert memory to a bounded dictionary for storage"""
+        return {
+            "identity": self.identity,
+            "known_users": dict(self.known_users),
+            "interactions": list(self.interactions),
+            "dialogue_history": list(self.dialogue_history),
+            "knowledge": self.knowledge,
+            "user_histories": {user_id: list(history) for user_id, history in self.user_histories.items()},
+            "evicted_users": list(self.evicted_users),
+            "summary": self.get_summary()
+        }
+        
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], **limits) -> 'NPCMemory':
+        """Create a memory instance from stored data"""
+        memory = cls(**limits)
+        memory.identity = data.get("identity", {})
+        memory.knowledge = data.get("knowledge", {})
+        memory.interactions.extend(data.get("interactions", []))
+        memory.dialogue_history.extend(data.get("dialogue_history", []))
+        for user_id in data.get("evicted_users", [])[-memory.max_evicted_users:]:
+            memory.evicted_users[user_id] = None
+        for user_id, info in data.get("known_users", {}).items():
+            for key, value in info.items():
+                memory.add_user_info(user_id, key, value)
+        for user_id, history in data.get("user_histories", {}).items():
+            memory.user_histories[user_id] = deque(history, maxlen=memory.max_user_history)
+            if len(memory.user_histories) > memory.max_known_users:
+                memory.user_histories.popitem(last=False)
+            
+        summary = data.get("summary", {})
+        memory.total_interactions = summary.get("total_interactions", len(memory.interactions))
+        memory.total_dialogues = summary.get("total_dialogues", len(memory.dialogue_history))
+        memory.interaction_counts = dict(summary.get("interaction_counts", {}))
+        memory.forgotten_users = summary.get("forgotten_users", 0) + memory.forgotten_users
+        return memory
         
     def get_timestamp(self) -> int:
         """Get current timestamp"""
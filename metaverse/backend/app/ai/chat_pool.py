@@ -0,0 +1,129 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+import logging
+
+logger = logging.getLogger("metaverse.npc_chat")
+
+FALLBACK_REPLY = "Hmm... give me a moment, I'm lost in thought."
+
+class NPCChatPool:
+    """Runs NPC dialogue requests in the background with bounded concurrency.
+
+    At most max_workers replies are generated at once, at most max_pending
+    requests are accepted and at most max_per_npc requests wait on any one
+    NPC. Requests to the same NPC are answered in the order they were
+    submitted, except past max_per_npc. A reply not ready timeout seconds
+    after submission, waiting for a free worker included, is replaced by
+    the fallback reply.
+    """
+
+    def __init__(self, ai_system, max_workers: int = 8, max_pending: int = 256, max_per_npc: int = 16,
+                 timeout: float = 5.0, fallback: str = FALLBACK_REPLY):
+        self.ai_system = ai_system
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.max_per_npc = max_per_npc
+        self.timeout = timeout
+        self.fallback = fallback
+        self.pending = 0
+        self.completed = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.rejected = 0
+        self._semaphore = asyncio.Semaphore(max_workers)
+        self._tasks: Set[asyncio.Task] = set()
+        # One lock per NPC with requests in flight, keeps that NPC's replies in order
+        self._npc_locks: Dict[str, asyncio.Lock] = {}
+        self._npc_pending: Dict[str, int] = {}
+
+    async def submit(self, npc_id: str, message: str, deliver: Callable[[str], Awaitable[Any]]) -> bool:
+        """Queue a chat message for an NPC, deliver(reply) is awaited with the answer.
+
+        If the pool is full the fallback reply is delivered instead, still
+        after the NPC's earlier replies, and False is returned. If the NPC
+        already has max_per_npc requests waiting nothing is queued: the
+        fallback is delivered right away, so its order with the replies
+        still waiting is best-effort.
+        """
+        if self._npc_pending.get(npc_id, 0) >= self.max_per_npc:
+            self.rejected += 1
+            try:
+                await deliver(self.fallback)
+            except Exception as e:
+                logger.error(f"Error delivering chat reply from {npc_id}: {e}")
+            return False
+
+        accepted = self.pending < self.max_pending
+        if accepted:
+            self.pending += 1
+        else:
+            self.rejected += 1
+
+        self._npc_pending[npc_id] = self._npc_pending.get(npc_id, 0) + 1
+        lock = self._npc_locks.get(npc_id)
+        if lock is None:
+            lock = self._npc_locks[npc_id] = asyncio.Lock()
+
+        deadline = asyncio.get_running_loop().time() + self.timeout
+        task = asyncio.create_task(self._run(npc_id, message if accepted else None, deliver, lock, deadline))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return accepted
+
+    async def _run(self, npc_id: str, message: Optional[str], deliver: Callable[[str], Awaitable[Any]],
+                   lock: asyncio.Lock, deadline: float):
+        try:
+            async with lock:
+                if message is None:
+                    reply = self.fallback
+                else:
+                    reply = await self._generate(npc_id, message, deadline)
+                # Deliver while holding the NPC lock so replies go out in order
+                await deliver(reply)
+                if message is not None:
+                    self.completed += 1
+        except Exception as e:
+            logger.error(f"Error delivering chat reply from {npc_id}: {e}")
+        finally:
+            if message is not None:
+                self.pending -= 1
+            remaining = self._npc_pending[npc_id] - 1
+            if remaining:
+                self._npc_pending[npc_id] = remaining
+            else:
+                del self._npc_pending[npc_id]
+                del self._npc_locks[npc_id]
+
+    async def _generate(self, npc_id: str, message: str, deadline: float) -> str:
+        try:
+            remaining = deadline - asyncio.get_running_loop().time()
+            if remaining <= 0:
+                raise asyncio.TimeoutError
+            return await asyncio.wait_for(self._generate_when_free(npc_id, message), remaining)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            logger.warning(f"Chat reply from {npc_id} timed out after {self.timeout}s")
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"Error generating chat reply from {npc_id}: {e}")
+        return self.fallback
+
+    async def _generate_when_free(self, npc_id: str, message: str) -> str:
+        async with self._semaphore:
+            return await self.ai_system.process_npc_chat(npc_id, message)
+
+    async def close(self):
+        """Cancel every request still in flight"""
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "pending": self.pending,
+            "completed": self.completed,
+            "timeouts": self.timeouts,
+            "errors": self.errors,
+            "rejected": self.rejected
+        }
@@ -0,0 +1,62 @@
+import json
+import re
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Sequence, Tuple
+
+# Intents shipped with the dialogue model, in priority order
+DEFAULT_INTENTS_PATH = Path(__file__).parent / "data" / "intents.json"
+
+class IntentMatcher:
+    """Keyword intent classifier compiled into a single regex.
+
+    Keywords match anywhere in the message (plain substring semantics), and
+    when keywords of several intents occur the intent listed first wins. All
+    keywords form one alternation ordered by intent priority; each search
+    resumes one character after the previous match start, so overlapping
+    keywords are still seen. Results for repeated messages come from an LRU
+    cache.
+    """
+
+    def __init__(self, intents: Sequence[Tuple[str, Sequence[str]]], default: str = "unknown",
+                 cache_size: int = 1024):
+        self.intent_names = [name for name, _ in intents]
+        self.default = default
+        # Keyword -> priority of the first intent listing it
+        self.priorities: Dict[str, int] = {}
+        for priority, (_, keywords) in enumerate(intents):
+            for keyword in keywords:
+                self.priorities.setdefault(keyword, priority)
+        self.pattern = None
+        if self.priorities:
+            self.pattern = re.compile("|".join(re.escape(keyword) for keyword in self.priorities))
+        self.classify = lru_cache(maxsize=cache_size)(self._classify)
+
+    @classmethod
+    def from_file(cls, path: Path = DEFAULT_INTENTS_PATH, **kwargs) -> 'IntentMatcher':
+        """Load intents from a JSON file of {"default": ..., "intents": [{"name", "keywords"}]}"""
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        intents = [(intent["name"], intent["keywords"]) for intent in data["intents"]]
+        return cls(intents, default=data.get("default", "unknown"), **kwargs)
+
+    def _classify(self, message: str) -> str:
+        """Get the highest-priority intent whose keywords occur in an already lowercased message"""
+        if self.pattern is None:
+            return self.default
+
+        search = self.pattern.search
+        priorities = self.priorities
+        best = len(self.intent_names)
+        match = search(message)
+        while match is not None:
+            priority = priorities[match.group()]
+            if priority < best:
+                best = priority
+                if best == 0:
+                    break
+            match = search(message, match.start() + 1)
+
+        if best == len(self.intent_names):
+            return self.default
+        return self.intent_names[best]
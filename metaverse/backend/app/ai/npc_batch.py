@@ -0,0 +1,221 @@
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+
+# Action kinds in the flattened action table
+ACTION_IDLE = 0
+ACTION_WALK = 1
+ACTION_EMOTE = 2
+
+ACTION_KINDS = {"idle": ACTION_IDLE, "walk": ACTION_WALK, "emote": ACTION_EMOTE}
+
+# Same constants as NPC.execute_behavior
+WALK_SPEED = 0.05
+ARRIVE_DISTANCE = 0.1
+IDLE_TURN_CHANCE = 0.1
+IDLE_TURN_DEGREES = 10.0
+NEW_TARGET_CHANCE = 0.01
+TARGET_RANGE = 10.0
+
+def chance_over_ticks(chance, ticks):
+    """Probability that a per-tick chance happens at least once in the given ticks"""
+    return 1 - (1 - chance) ** ticks
+
+class NPCBatch:
+    """Structure-of-arrays state for NPCs that are stepped together.
+
+    Row i of every array belongs to the NPC in npcs[i]. Rows are kept dense:
+    removing an NPC moves the last row into the freed slot. Behavior states
+    are stored as codes into state_names.
+    """
+
+    def __init__(self, capacity: int = 64, seed: Optional[int] = None):
+        self.count = 0
+        self.npcs: List[Any] = []
+        self.rng = np.random.default_rng(seed)
+        self.state_names: List[str] = ["idle"]
+        self.state_codes: Dict[str, int] = {"idle": 0}
+        # Flattened action table, built from BehaviorModel.behaviors
+        self.action_kinds = None
+        self.action_states = None
+        self.action_cdf = None
+        self.idle_cdf = None
+        # Share of ticks spent walking, used to fast-forward long steps
+        self.walk_share = 0.0
+        self._allocate_arrays(max(1, capacity))
+
+    @property
+    def capacity(self) -> int:
+        return len(self.rotations)
+
+    def _allocate_arrays(self, capacity: int):
+        self.positions = np.zeros((capacity, 3), dtype=np.float64)
+        self.targets = np.zeros((capacity, 3), dtype=np.float64)
+        self.has_target = np.zeros(capacity, dtype=bool)
+        self.rotations = np.zeros(capacity, dtype=np.float64)
+        self.cooldowns = np.zeros(capacity, dtype=np.int32)
+        self.states = np.zeros(capacity, dtype=np.int32)
+        # Tick each NPC was last stepped on, for level-of-detail scheduling
+        self.last_ticks = np.zeros(capacity, dtype=np.int64)
+
+    def _arrays(self) -> Tuple[np.ndarray, ...]:
+        return (self.positions, self.targets, self.has_target, self.rotations, self.cooldowns, self.states,
+                self.last_ticks)
+
+    def _grow(self):
+        old = self._arrays()
+        self._allocate_arrays(self.capacity * 2)
+        for old_array, new_array in zip(old, self._arrays()):
+            new_array[:self.count] = old_array[:self.count]
+
+    def allocate(self, npc: Any) -> int:
+        """Reserve a row for an NPC and return its slot"""
+        if self.count == self.capacity:
+            self._grow()
+
+        slot = self.count
+        self.count += 1
+        self.npcs.append(npc)
+        return slot
+
+    def release(self, slot: int):
+        """Free a row, moving the last NPC into it to keep rows dense"""
+        last = self.count - 1
+        if slot != last:
+            for array in self._arrays():
+                array[slot] = array[last]
+
+            moved = self.npcs[last]
+            moved._slot = slot
+            self.npcs[slot] = moved
+
+        self.npcs.pop()
+        for array in self._arrays():
+            array[last] = 0
+        self.count = last
+
+    def state_code(self, name: str) -> int:
+        code = self.state_codes.get(name)
+        if code is None:
+            code = len(self.state_names)
+            self.state_names.append(name)
+            self.state_codes[name] = code
+        return code
+
+    def build_action_table(self, behaviors: Dict[str, Dict[str, Any]]):
+        """Flatten behavior weights and actions into one probability table.
+
+        Every action gets weight / total weight / number of actions in its
+        behavior, the same odds as BehaviorModel.get_action. NPCs in
+        interaction cooldown pick uniformly among the idle actions.
+        """
+        kinds = []
+        states = []
+        probabilities = []
+        idle_probabilities = []
+        total_weight = sum(data["weight"] for data in behaviors.values())
+
+        for behavior_type, data in behaviors.items():
+            actions = data["actions"]
+            for action in actions:
+                kinds.append(ACTION_KINDS.get(action.get("type", "idle"), ACTION_IDLE))
+                states.append(self.state_code(action.get("emote", "idle")))
+                probabilities.append(data["weight"] / total_weight / len(actions))
+                idle_probabilities.append(1.0 / len(actions) if behavior_type == "idle" else 0.0)
+
+        self.action_kinds = np.array(kinds, dtype=np.int8)
+        self.action_states = np.array(states, dtype=np.int32)
+        self.walk_share = float(sum(p for p, kind in zip(probabilities, kinds) if kind == ACTION_WALK))
+        self.action_cdf = np.cumsum(probabilities)
+        self.idle_cdf = np.cumsum(idle_probabilities)
+        # Guard against rounding leaving the last bucket unreachable
+        self.action_cdf[-1] = 1.0
+        self.idle_cdf[np.flatnonzero(idle_probabilities)[-1]:] = 1.0
+
+    def step(self, rows: Optional[np.ndarray] = None, ticks: Optional[np.ndarray] = None) -> np.ndarray:
+        """Advance NPCs by one behavior step, returning the slots that moved.
+
+        rows selects the slots to step (all by default) and ticks how many
+        ticks each step covers (1 by default). For a step covering several
+        ticks, NPCs with a target first walk the expected distance of the
+        skipped ticks, then take one normal step with per-tick chances scaled
+        to the whole span, matching NPC.update(ticks).
+        """
+        if rows is None:
+            rows = np.arange(self.count)
+        if ticks is None:
+            ticks = np.ones(len(rows), dtype=np.int64)
+        m = len(rows)
+        if m == 0 or self.action_cdf is None:
+            return np.empty(0, dtype=np.intp)
+
+        moved = []
+        skipped = ticks - 1
+        catching_up = np.flatnonzero((skipped > 0) & self.has_target[rows])
+        if len(catching_up):
+            travel = WALK_SPEED * self.walk_share * skipped[catching_up]
+            moved.append(self._walk(rows[catching_up], travel, clamp=True))
+
+        cooldowns = np.maximum(self.cooldowns[rows] - ticks, 0)
+        self.cooldowns[rows] = cooldowns
+        cooling = cooldowns > 0
+
+        # One draw per NPC for every random decision this step
+        draws = self.rng.random((m, 6))
+        choice = np.searchsorted(self.action_cdf, draws[:, 0], side="right")
+        if cooling.any():
+            choice[cooling] = np.searchsorted(self.idle_cdf, draws[cooling, 0], side="right")
+        np.minimum(choice, len(self.action_kinds) - 1, out=choice)
+        kinds = self.action_kinds[choice]
+
+        # Idle: occasionally look around
+        turning = np.flatnonzero((kinds == ACTION_IDLE) & (draws[:, 1] < chance_over_ticks(IDLE_TURN_CHANCE, ticks)))
+        if len(turning):
+            slots = rows[turning]
+            self.rotations[slots] = (self.rotations[slots] + (draws[turning, 2] * 2 - 1) * IDLE_TURN_DEGREES) % 360
+
+        # Emote: switch animation state
+        emoting = kinds == ACTION_EMOTE
+        self.states[rows[emoting]] = self.action_states[choice[emoting]]
+
+        # Walk: step toward the target, or maybe pick a new one
+        walking = kinds == ACTION_WALK
+        has_target = self.has_target[rows]
+        stepping = rows[walking & has_target]
+        choosing = np.flatnonzero(walking & ~has_target & (draws[:, 3] < chance_over_ticks(NEW_TARGET_CHANCE, ticks)))
+        if len(stepping):
+            moved.append(self._walk(stepping, WALK_SPEED))
+
+        if len(choosing):
+            offsets = (draws[choosing, 4:6] * 2 - 1) * TARGET_RANGE
+            slots = rows[choosing]
+            self.targets[slots] = self.positions[slots]
+            self.targets[slots, 0] += offsets[:, 0]
+            self.targets[slots, 2] += offsets[:, 1]
+            self.has_target[slots] = True
+
+        if not moved:
+            return np.empty(0, dtype=np.intp)
+        return np.unique(np.concatenate(moved))
+
+    def _walk(self, slots: np.ndarray, travel, clamp: bool = False) -> np.ndarray:
+        """Move NPCs toward their targets, clearing targets already reached.
+
+        With clamp=True a walk never passes the target; otherwise it moves the
+        full distance like a single NPC.execute_behavior step.
+        """
+        positions = self.positions[slots]
+        direction = self.targets[slots] - positions
+        distance = np.sqrt(np.einsum("ij,ij->i", direction, direction))
+        arrived = distance <= ARRIVE_DISTANCE
+        self.has_target[slots[arrived]] = False
+
+        going = ~arrived
+        moved = slots[going]
+        distance = distance[going]
+        direction = direction[going] / distance[:, None]
+        travel = np.broadcast_to(travel, arrived.shape)[going]
+        if clamp:
+            travel = np.minimum(travel, distance)
+        self.positions[moved] = positions[going] + direction * travel[:, None]
+        self.rotations[moved] = (np.degrees(np.arctan2(direction[:, 2], direction[:, 0])) + 90) % 360
+        return moved
@@ -0,0 +1,71 @@
+from typing import Any, List
+import numpy as np
+
+class PhysicsBodyStore:
+    """Structure-of-arrays storage for physics bodies.
+
+    Row i of every array belongs to the body in bodies[i]. Rows are kept
+    dense: removing a body moves the last row into the freed slot.
+    """
+
+    def __init__(self, capacity: int = 64):
+        self.count = 0
+        self.bodies: List[Any] = []
+        # Bumped whenever rows are added or moved, so row-keyed caches can tell they are stale
+        self.generation = 0
+        self._allocate_arrays(max(1, capacity))
+
+    @property
+    def capacity(self) -> int:
+        return len(self.masses)
+
+    def _allocate_arrays(self, capacity: int):
+        self.positions = np.zeros((capacity, 3), dtype=np.float64)
+        self.velocities = np.zeros((capacity, 3), dtype=np.float64)
+        self.forces = np.zeros((capacity, 3), dtype=np.float64)
+        self.masses = np.ones(capacity, dtype=np.float64)
+        self.static = np.zeros(capacity, dtype=bool)
+        self.asleep = np.zeros(capacity, dtype=bool)
+
+    def _grow(self):
+        old = (self.positions, self.velocities, self.forces, self.masses, self.static, self.asleep)
+        self._allocate_arrays(self.capacity * 2)
+        new = (self.positions, self.velocities, self.forces, self.masses, self.static, self.asleep)
+        for old_array, new_array in zip(old, new):
+            new_array[:self.count] = old_array[:self.count]
+
+    def allocate(self, body: Any) -> int:
+        """Reserve a row for a body and return its slot"""
+        if self.count == self.capacity:
+            self._grow()
+
+        slot = self.count
+        self.count += 1
+        self.generation += 1
+        self.bodies.append(body)
+        return slot
+
+    def release(self, slot: int):
+        """Free a row, moving the last body into it to keep rows dense"""
+        last = self.count - 1
+        if slot != last:
+            self.positions[slot] = self.positions[last]
+            self.velocities[slot] = self.velocities[last]
+            self.forces[slot] = self.forces[last]
+            self.masses[slot] = self.masses[last]
+            self.static[slot] = self.static[last]
+            self.asleep[slot] = self.asleep[last]
+
+            moved = self.bodies[last]
+            moved._slot = slot
+            self.bodies[slot] = moved
+
+        self.bodies.pop()
+        self.positions[last] = 0.0
+        self.velocities[last] = 0.0
+        self.forces[last] = 0.0
+        self.masses[last] = 1.0
+        self.static[last] = False
+        self.asleep[last] = False
+        self.count = last
+        self.generation += 1
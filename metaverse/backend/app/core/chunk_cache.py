@@ -0,0 +1,70 @@
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+class ChunkCache:
+    """Bounded chunk store with least-recently-used eviction.
+
+    get() counts hits and misses and marks the chunk as recently used; peek()
+    does neither, so hot paths like terrain sampling don't skew the stats.
+    """
+
+    def __init__(self, capacity: int = 4096):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self._chunks: 'OrderedDict[str, Any]' = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._chunks)
+
+    def __contains__(self, chunk_id: str) -> bool:
+        return chunk_id in self._chunks
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._chunks)
+
+    def items(self):
+        return self._chunks.items()
+
+    def get(self, chunk_id: str) -> Optional[Any]:
+        """Look up a chunk, counting the hit or miss"""
+        chunk = self._chunks.get(chunk_id)
+        if chunk is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._chunks.move_to_end(chunk_id)
+        return chunk
+
+    def peek(self, chunk_id: str) -> Optional[Any]:
+        """Look up a chunk without touching its recency or the counters"""
+        return self._chunks.get(chunk_id)
+
+    def put(self, chunk_id: str, chunk: Any) -> List[Tuple[str, Any]]:
+        """Store a chunk and return the (chunk_id, chunk) pairs evicted to make room"""
+        self._chunks[chunk_id] = chunk
+        self._chunks.move_to_end(chunk_id)
+
+        evicted = []
+        while len(self._chunks) > self.capacity:
+            evicted.append(self._chunks.popitem(last=False))
+        self.evictions += len(evicted)
+        return evicted
+
+    def pop(self, chunk_id: str) -> Optional[Any]:
+        return self._chunks.pop(chunk_id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._chunks),
+            "capacity": self.capacity,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
@@ -0,0 +1,163 @@
+import struct
+from typing import Any, Dict, List, Sequence
+import numpy as np
+
+# Media type used for binary chunk payloads on the REST API
+CHUNK_MEDIA_TYPE = "application/x-metaverse-chunks"
+
+CHUNK_MAGIC = b"MVCK"
+BATCH_MAGIC = b"MVCB"
+FORMAT_VERSION = 1
+
+# Header flags
+FLAG_QUANTIZED = 0x01
+
+# magic, version, flags, size, position x/y/z, height offset, height scale,
+# vegetation count, structure count
+CHUNK_HEADER = struct.Struct("<4sBBHfffffHH")
+# magic, version, chunk count; every chunk follows as a u32 length + payload
+BATCH_HEADER = struct.Struct("<4sBH")
+CHUNK_LENGTH = struct.Struct("<I")
+
+VEGETATION_TYPES = ("tree", "bush", "grass", "flower")
+STRUCTURE_TYPES = ("house", "tower", "ruins", "camp")
+
+VEGETATION_DTYPE = np.dtype([
+    ("type", "u1"), ("x", "<f4"), ("y", "<f4"), ("z", "<f4"),
+    ("scale", "<f4"), ("rotation", "<f4")
+])
+STRUCTURE_DTYPE = np.dtype([
+    ("type", "u1"), ("x", "<f4"), ("y", "<f4"), ("z", "<f4"),
+    ("rotation", "<f4"), ("variant", "u1")
+])
+
+# Largest magnitude used for quantized heights, symmetric around zero
+QUANTIZED_RANGE = 32767
+
+def _type_codes(records: List[Dict[str, Any]], names: Sequence[str]) -> List[int]:
+    codes = []
+    for record in records:
+        try:
+            codes.append(names.index(record["type"]))
+        except ValueError:
+            raise ValueError(f"Cannot encode unknown type: {record['type']}")
+    return codes
+
+def _pack_vegetation(vegetation: List[Dict[str, Any]]) -> bytes:
+    packed = np.zeros(len(vegetation), dtype=VEGETATION_DTYPE)
+    if vegetation:
+        packed["type"] = _type_codes(vegetation, VEGETATION_TYPES)
+        for axis in ("x", "y", "z"):
+            packed[axis] = [veg["position"][axis] for veg in vegetation]
+        packed["scale"] = [veg["properties"]["scale"] for veg in vegetation]
+        packed["rotation"] = [veg["properties"]["rotation"] for veg in vegetation]
+    return packed.tobytes()
+
+def _pack_structures(structures: List[Dict[str, Any]]) -> bytes:
+    packed = np.zeros(len(structures), dtype=STRUCTURE_DTYPE)
+    if structures:
+        packed["type"] = _type_codes(structures, STRUCTURE_TYPES)
+        for axis in ("x", "y", "z"):
+            packed[axis] = [structure["position"][axis] for structure in structures]
+        packed["rotation"] = [structure["properties"]["rotation"] for structure in structures]
+        packed["variant"] = [structure["properties"]["variant"] for structure in structures]
+    return packed.tobytes()
+
+def encode_chunk(chunk, quantize: bool = True) -> bytes:
+    """Encode a chunk as a compact binary payload.
+
+    With quantize=True heights are stored as int16 steps between the chunk's
+    min and max height (error under half a step); otherwise as float32.
+    """
+    heightmap = np.asarray(chunk.heightmap, dtype=np.float64)
+    size = chunk.size
+
+    if quantize:
+        low = float(heightmap.min())
+        high = float(heightmap.max())
+        offset = (low + high) / 2
+        scale = (high - low) / (2 * QUANTIZED_RANGE) or 1.0
+        heights = np.round((heightmap - offset) / scale).astype("<i2")
+        flags = FLAG_QUANTIZED
+    else:
+        offset = 0.0
+        scale = 1.0
+        heights = heightmap.astype("<f4")
+        flags = 0
+
+    header = CHUNK_HEADER.pack(
+        CHUNK_MAGIC, FORMAT_VERSION, flags, size,
+        chunk.position.x, chunk.position.y, chunk.position.z,
+        offset, scale,
+        len(chunk.vegetation), len(chunk.structures)
+    )
+    return b"".join((
+        header,
+        heights.tobytes(),
+        _pack_vegetation(chunk.vegetation),
+        _pack_structures(chunk.structures)
+    ))
+
+def encode_chunks(encoded_chunks: Sequence[bytes]) -> bytes:
+    """Join already encoded chunks into one batch payload"""
+    parts = [BATCH_HEADER.pack(BATCH_MAGIC, FORMAT_VERSION, len(encoded_chunks))]
+    for encoded in encoded_chunks:
+        parts.append(CHUNK_LENGTH.pack(len(encoded)))
+        parts.append(encoded)
+    return b"".join(parts)
+
+def decode_chunk(data: bytes) -> Dict[str, Any]:
+    """Decode a binary chunk into the same layout as Chunk.to_client_data"""
+    (magic, version, flags, size, x, y, z, offset, scale,
+     vegetation_count, structure_count) = CHUNK_HEADER.unpack_from(data, 0)
+    if magic != CHUNK_MAGIC or version != FORMAT_VERSION:
+        raise ValueError("Not a supported binary chunk")
+
+    cursor = CHUNK_HEADER.size
+    height_dtype = np.dtype("<i2") if flags & FLAG_QUANTIZED else np.dtype("<f4")
+    heights = np.frombuffer(data, dtype=height_dtype, count=size * size, offset=cursor)
+    heightmap = heights.reshape(size, size).astype(np.float64) * scale + offset
+    cursor += heights.nbytes
+
+    vegetation = np.frombuffer(data, dtype=VEGETATION_DTYPE, count=vegetation_count, offset=cursor)
+    cursor += vegetation.nbytes
+    structures = np.frombuffer(data, dtype=STRUCTURE_DTYPE, count=structure_count, offset=cursor)
+
+    return {
+        # Same id as Chunk.chunk_id, from the chunk's grid coordinates
+        "id": f"{int(x // size)}:{int(z // size)}",
+        "position": {"x": x, "y": y, "z": z},
+        "size": size,
+        "heightmap": heightmap.tolist(),
+        "vegetation": [
+            {
+                "type": VEGETATION_TYPES[record["type"]],
+                "position": {"x": float(record["x"]), "y": float(record["y"]), "z": float(record["z"])},
+                "properties": {"scale": float(record["scale"]), "rotation": float(record["rotation"])}
+            }
+            for record in vegetation
+        ],
+        "structures": [
+            {
+                "type": STRUCTURE_TYPES[record["type"]],
+                "position": {"x": float(record["x"]), "y": float(record["y"]), "z": float(record["z"])},
+                "properties": {"rotation": float(record["rotation"]), "variant": int(record["variant"])}
+            }
+            for record in structures
+        ]
+    }
+
+def decode_chunks(data: bytes) -> List[Dict[str, Any]]:
+    """Decode a batch payload produced by encode_chunks"""
+    magic, version, count = BATCH_HEADER.unpack_from(data, 0)
+    if magic != BATCH_MAGIC or version != FORMAT_VERSION:
+        raise ValueError("Not a supported binary chunk batch")
+
+    chunks = []
+    cursor = BATCH_HEADER.size
+    for _ in range(count):
+        (length,) = CHUNK_LENGTH.unpack_from(data, cursor)
+        cursor += CHUNK_LENGTH.size
+        chunks.append(decode_chunk(data[cursor:cursor + length]))
+        cursor += length
+    return chunks
@@ -0,0 +1,140 @@
+import asyncio
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+import logging
+import time
+
+from .serialization import dumps
+
+logger = logging.getLogger("metaverse.connection")
+
+# Queue policies
+DROP_OLDEST = "drop_oldest"
+COALESCE = "coalesce"
+
+class ClientConnection:
+    """Outbound side of one websocket.
+
+    Messages are put on a bounded queue and a writer task sends them, so a
+    slow client only ever delays itself. When the queue is full the oldest
+    message is dropped. With the "coalesce" policy a message sent with a
+    coalesce_key replaces a still-queued message with the same key, so a
+    lagging client gets the latest world_update rather than a backlog.
+    """
+
+    def __init__(self, websocket, max_queue: int = 64, policy: str = COALESCE, max_lag: float = 5.0):
+        if policy not in (DROP_OLDEST, COALESCE):
+            raise ValueError(f"Unknown send queue policy: {policy}")
+        self.websocket = websocket
+        self.max_queue = max_queue
+        self.policy = policy
+        self.max_lag = max_lag
+        # Entries are (kind, payload, coalesce_key, enqueued_at)
+        self.queue: Deque[Tuple[str, Any, Optional[str], float]] = deque()
+        self.closed = False
+        self.sent = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self._ready = asyncio.Event()
+        self._writer: Optional[asyncio.Task] = None
+        self._in_flight_since: Optional[float] = None
+
+    def start(self):
+        """Start the writer task"""
+        if self._writer is None:
+            self._writer = asyncio.create_task(self._drain())
+
+    def send_json(self, data: Dict[str, Any], coalesce_key: Optional[str] = None) -> bool:
+        return self._enqueue("json", data, coalesce_key)
+
+    def send_text(self, payload: str, coalesce_key: Optional[str] = None) -> bool:
+        return self._enqueue("text", payload, coalesce_key)
+
+    def send_bytes(self, payload: bytes, coalesce_key: Optional[str] = None) -> bool:
+        return self._enqueue("bytes", payload, coalesce_key)
+
+    def _enqueue(self, kind: str, payload: Any, coalesce_key: Optional[str]) -> bool:
+        """Queue a message without waiting, returns False if the connection is closed"""
+        if self.closed:
+            return False
+
+        queue = self.queue
+        if coalesce_key is not None and self.policy == COALESCE:
+            for i, (_, _, key, enqueued_at) in enumerate(queue):
+                if key == coalesce_key:
+                    # Keep the stale frame's timestamp so lag still reflects the wait
+                    queue[i] = (kind, payload, coalesce_key, enqueued_at)
+                    self.coalesced += 1
+                    return True
+
+        if len(queue) >= self.max_queue:
+            queue.popleft()
+            self.dropped += 1
+
+        queue.append((kind, payload, coalesce_key, time.monotonic()))
+        self._ready.set()
+        return True
+
+    def has_queued(self, coalesce_key: str) -> bool:
+        """Whether a message with this coalesce_key is still waiting to be sent"""
+        return any(key == coalesce_key for _, _, key, _ in self.queue)
+
+    @property
+    def lag(self) -> float:
+        """Seconds the oldest unsent (or in-flight) message has been waiting"""
+        oldest = self._in_flight_since
+        if self.queue:
+            queued_since = self.queue[0][3]
+            oldest = queued_since if oldest is None else min(oldest, queued_since)
+        return time.monotonic() - oldest if oldest is not None else 0.0
+
+    def is_lagging(self) -> bool:
+        return self.lag > self.max_lag
+
+    async def _drain(self):
+        websocket = self.websocket
+        while not self.closed:
+            if not self.queue:
+                self._ready.clear()
+                await self._ready.wait()
+                continue
+
+            kind, payload, _, enqueued_at = self.queue.popleft()
+            self._in_flight_since = enqueued_at
+            try:
+                if kind == "json":
+                    await websocket.send_text(dumps(payload))
+                elif kind == "text":
+                    await websocket.send_text(payload)
+                else:
+                    await websocket.send_bytes(payload)
+                self.sent += 1
+            except Exception as e:
+                logger.error(f"Error sending to client, closing its queue: {e}")
+                self.closed = True
+            finally:
+                self._in_flight_since = None
+
+    async def close(self, code: int = 1000):
+        """Stop the writer and close the websocket"""
+        if self._writer is not None and self._writer is not asyncio.current_task():
+            self._writer.cancel()
+        self._writer = None
+        self.queue.clear()
+
+        if not self.closed:
+            self.closed = True
+            try:
+                await self.websocket.close(code=code)
+            except Exception:
+                pass  # Already closed by the client
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queued": len(self.queue),
+            "lag": self.lag,
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "coalesced": self.coalesced,
+            "closed": self.closed
+        }
@@ -0,0 +1,63 @@
+from typing import Dict, List, Optional, Set, Tuple
+
+ChunkCoord = Tuple[int, int]
+
+def chunk_id_for(x: int, z: int) -> str:
+    return f"{x}:{z}"
+
+class ChunkInterest:
+    """Tracks the chunks one client already holds.
+
+    Each update computes the square of chunks around the client's current
+    chunk and reports only what entered or left it since the last update.
+    Nothing is recorded as held until commit() is called, once the chunks
+    have actually been queued for the client.
+    """
+
+    def __init__(self, view_distance: int = 2, binary: bool = False):
+        self.view_distance = view_distance
+        self.binary = binary
+        self.center: Optional[ChunkCoord] = None
+        self.held: Set[str] = set()
+        # Bumped on every reset and commit, so a stale update can tell it lost a race
+        self.version = 0
+
+    def reset(self):
+        """Forget what the client holds so the next update resends the whole view"""
+        self.center = None
+        self.held = set()
+        self.version += 1
+
+    def update(self, center: ChunkCoord) -> Tuple[List[ChunkCoord], List[str]]:
+        """Compare the view around a new center chunk with what the client holds.
+
+        Returns the coordinates of chunks that entered the view, nearest
+        first, and the ids of chunks that left it.
+        """
+        if center == self.center:
+            return [], []
+
+        cx, cz = center
+        visible = self._visible(center)
+        entered = [coord for chunk_id, coord in visible.items() if chunk_id not in self.held]
+        entered.sort(key=lambda coord: max(abs(coord[0] - cx), abs(coord[1] - cz)))
+        left = [chunk_id for chunk_id in self.held if chunk_id not in visible]
+        return entered, left
+
+    def commit(self, center: ChunkCoord, version: int) -> bool:
+        """Record the view around center as held, unless it changed since version was read"""
+        if version != self.version:
+            return False
+        self.center = center
+        self.held = set(self._visible(center))
+        self.version += 1
+        return True
+
+    def _visible(self, center: ChunkCoord) -> Dict[str, ChunkCoord]:
+        cx, cz = center
+        radius = self.view_distance
+        visible = {}
+        for x in range(cx - radius, cx + radius + 1):
+            for z in range(cz - radius, cz + radius + 1):
+                visible[chunk_id_for(x, z)] = (x, z)
+        return visible
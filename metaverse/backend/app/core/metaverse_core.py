@@ -1,25 +1,64 @@
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 import asyncio
 from typing import Dict, Any, List, Optional
+import json
 import logging
+import time
 
 from .world_engine import WorldEngine
+from .connection import ClientConnection, COALESCE
 from .physics_engine import PhysicsEngine
-from ..ai.ai_system import AISystem
+from .chunk_codec import encode_chunks
+from .interest import ChunkInterest
+from .serialization import dumps
+from .snapshot import SnapshotTracker
+from .scheduler import FixedTimestepScheduler
+from .spatial_hash import SpatialHashGrid
+from .update_rate import UpdateRateController
+from ..ai.ai_system import AISystem, ENTITY_CELL_SIZE, ENTITY_CELL_HEIGHT
+from ..ai.chat_pool import NPCChatPool
 from ..ai.ml_quest_system import MLQuestSystem
 from ..core.vector3 import Vector3
+from ..models.user import User
 
 logger = logging.getLogger("metaverse.core")
 
 class MetaverseCore:
-    def __init__(self):
+    def __init__(self, send_queue_size: int = 64, send_queue_policy: str = COALESCE, max_client_lag: float = 5.0,
+                 keyframe_interval: int = 100, tick_rate: float = 20.0, max_catch_up: int = 5,
+                 network_rate: float = 20.0, idle_network_rate: float = 5.0, batched_npcs: bool = False,
+                 chat_workers: int = 8, chat_timeout: float = 5.0, world_seed: Optional[int] = None,
+                 max_view_distance: int = 8):
         self.app = FastAPI(title="Metaverse API", description="Mini-Metaverse with AI")
-        self.world = WorldEngine()
-        self.ai_system = AISystem()
+        # Without a configured seed the world keeps the one stored in the database
+        self.world = WorldEngine(seed=world_seed)
+        # Shared spatial index: users register as ("user", id), NPCs as ("npc", id)
+        self.spatial_index = SpatialHashGrid(ENTITY_CELL_SIZE, cell_height=ENTITY_CELL_HEIGHT)
+        self.ai_system = AISystem(spatial_index=self.spatial_index, batched=batched_npcs)
+        # NPC replies are generated off the receive loop and sent when ready
+        self.npc_chat = NPCChatPool(self.ai_system, max_workers=chat_workers, timeout=chat_timeout)
         self.physics = PhysicsEngine()
         self.ml_quest_system = MLQuestSystem()
         self.users = {}
-        self.active_connections = {}
+        self.active_connections: Dict[str, ClientConnection] = {}
+        # Outbound queue settings applied to every new connection
+        self.send_queue_size = send_queue_size
+        self.send_queue_policy = send_queue_policy
+        self.max_client_lag = max_client_lag
+        # Chunks each connected client already holds, up to max_view_distance chunks out
+        self.chunk_interest: Dict[str, ChunkInterest] = {}
+        self.max_view_distance = max_view_distance
+        # Baseline of the last world_update each client was sent
+        self.snapshots: Dict[str, SnapshotTracker] = {}
+        self.keyframe_interval = keyframe_interval
+        self.scheduler = FixedTimestepScheduler(tick_rate, max_catch_up)
+        self.scheduler.add_phase("physics", self.physics.update)
+        self.scheduler.add_phase("ai", lambda dt: self.ai_system.update_npcs(self.get_player_positions()))
+        self.scheduler.add_phase("world", lambda dt: self.world.update_world_state())
+        # Network sends run on their own clock, each client at its own adaptive rate
+        self.network_scheduler = FixedTimestepScheduler(network_rate, max_catch_up=1)
+        self.network_scheduler.add_phase("network", lambda dt: self.send_updates_to_clients())
+        self.update_rates = UpdateRateController(self.spatial_index, network_rate, idle_network_rate)
         self.setup_routes()
         
     def setup_routes(self):
@@ -36,11 +75,37 @@ class MetaverseCore:
                     data = await websocket.receive_json()
                     await self.handle_message(user_id, data)
             except WebSocketDisconnect:
-                await self.disconnect(user_id)
+                pass
+            except Exception as e:
+                # Receiving fails once the server has closed a lagging client
+                if user_id in self.active_connections:
+                    logger.error(f"Error receiving from user {user_id}: {e}")
+            finally:
+                # A reconnect under the same id already replaced this socket
+                connection = self.active_connections.get(user_id)
+                if connection is None or connection.websocket is websocket:
+                    await self.disconnect(user_id)
     
     async def connect(self, websocket: WebSocket, user_id: str):
         await websocket.accept()
-        self.active_connections[user_id] = websocket
+        previous = self.active_connections.get(user_id)
+        if previous is not None:
+            await previous.close()
+        connection = ClientConnection(
+            websocket,
+            max_queue=self.send_queue_size,
+            policy=self.send_queue_policy,
+            max_lag=self.max_client_lag
+        )
+        connection.start()
+        self.active_connections[user_id] = connection
+        if user_id not in self.users:
+            self.users[user_id] = {"user": User(user_id), "websocket": websocket}
+        else:
+            self.users[user_id]["websocket"] = websocket
+        self.index_user(user_id)
+        self.chunk_interest[user_id] = ChunkInterest()
+        self.snapshots[user_id] = SnapshotTracker(self.keyframe_interval)
         
         await self.broadcast_event({
             "type": "user_joined",
@@ -50,11 +115,20 @@ class MetaverseCore:
         logger.info(f"User {user_id} connected")
 
     async def disconnect(self, user_id: str):
-        if user_id in self.active_connections:
-            del self.active_connections[user_id]
+        if user_id not in self.active_connections and user_id not in self.users:
+            return
+            
+        connection = self.active_connections.pop(user_id, None)
+        if connection is not None:
+            await connection.close()
         
         if user_id in self.users:
-            pass
+            del self.users[user_id]
+        self.spatial_index.remove(("user", user_id))
+            
+        self.chunk_interest.pop(user_id, None)
+        self.snapshots.pop(user_id, None)
+        self.update_rates.forget(user_id)
         
         await self.broadcast_event({
             "type": "user_left",
@@ -74,11 +148,18 @@ class MetaverseCore:
             await self.handle_interaction(user_id, data)
         elif message_type == "quest":
             await self.handle_quest_message(user_id, data)
+        elif message_type == "chunk_request":
+            await self.handle_chunk_request(user_id, data)
+        elif message_type == "resync":
+            if user_id in self.snapshots:
+                self.snapshots[user_id].request_keyframe()
             
     async def handle_movement(self, user_id: str, data: Dict[str, Any]):
         user = self.users[user_id]["user"]
         user.update_position(data)
+        self.index_user(user_id)
         await self.broadcast_user_state(user_id)
+        await self.send_chunk_updates(user_id, user.position)
         
     async def handle_interaction(self, user_id: str, data: Dict[str, Any]):
         target_id = data.get("target_id")
@@ -92,17 +173,81 @@ class MetaverseCore:
         target_id = data.get("target_id")
         
         if target_id and target_id.startswith("npc_"):
-            response = await self.ai_system.process_npc_chat(target_id, message)
-            await self.send_to_user(user_id, {
-                "type": "chat_response",
-                "data": {
-                    "from": target_id,
-                    "message": response
-                }
-            })
+            async def deliver(response: str):
+                await self.send_to_user(user_id, {
+                    "type": "chat_response",
+                    "data": {
+                        "from": target_id,
+                        "message": response
+                    }
+                })
+                
+            # A full pool answers with the fallback reply, in order with earlier
+            # replies unless this NPC already has a full queue
+            await self.npc_chat.submit(target_id, message, deliver)
         else:
             await self.broadcast_chat(user_id, message)
     
+    async def handle_chunk_request(self, user_id: str, data: Dict[str, Any]):
+        """Set a client's view options and resend every chunk in view"""
+        interest = self.chunk_interest.get(user_id)
+        if interest is None:
+            return
+            
+        interest.view_distance = self.clamp_view_distance(data.get("view_distance"), interest.view_distance)
+        interest.binary = bool(data.get("binary", interest.binary))
+        interest.reset()
+        
+        if "position" in data:
+            position = Vector3.from_dict(data["position"])
+        elif user_id in self.users:
+            position = self.users[user_id]["user"].position
+        else:
+            position = Vector3(0, 0, 0)
+        await self.send_chunk_updates(user_id, position)
+        
+    def clamp_view_distance(self, value: Any, default: int) -> int:
+        """Parse a client's view distance, keeping it between 0 and max_view_distance"""
+        try:
+            view_distance = int(value)
+        except (TypeError, ValueError):
+            return default
+        return max(0, min(view_distance, self.max_view_distance))
+        
+    async def send_chunk_updates(self, user_id: str, position: Vector3):
+        """Send a client only the chunks that entered its view, and the ids of those that left"""
+        interest = self.chunk_interest.get(user_id)
+        if interest is None:
+            return
+            
+        center = self.world.chunk_coords(position)
+        version = interest.version
+        entered, left = interest.update(center)
+        if not entered and not left:
+            return
+            
+        chunks = await self.world.get_chunks_at(entered)
+        
+        queued = True
+        if interest.binary:
+            # Entered chunks go out as one binary frame, removals as a small JSON event
+            if chunks:
+                queued = await self.send_bytes_to_user(user_id, encode_chunks([chunk.to_bytes() for chunk in chunks]))
+            if left:
+                queued = await self.send_event_to_user(
+                    user_id, {"type": "chunk_update", "chunks": [], "removed": left}) and queued
+        else:
+            payload = (
+                '{"type":"chunk_update","chunks":[' + ",".join(chunk.to_json() for chunk in chunks) +
+                '],"removed":' + json.dumps(left) + "}"
+            )
+            queued = await self.send_text_to_user(user_id, payload)
+            
+        # Only chunks that were queued count as held; if generating or sending
+        # failed, the next update sends them again
+        if queued:
+            interest.commit(center, version)
+    
     async def handle_quest_message(self, user_id: str, data: Dict[str, Any]):
         quest_action = data.get("action", "")
         
@@ -166,38 +311,47 @@ class MetaverseCore:
 
     async def broadcast_user_state(self, user_id: str):
         user = self.users[user_id]["user"]
-        state = user.get_state()
         
-        for uid, user_data in self.users.items():
-            if uid != user_id:
-                await self.send_to_user(uid, {
-                    "type": "user_state",
-                    "data": {
-                        "user_id": user_id,
-                        "state": state
-                    }
-                })
+        await self.broadcast_event({
+            "type": "user_state",
+            "data": {
+                "user_id": user_id,
+                "state": user.get_state()
+            }
+        }, exclude=[user_id])
                 
     async def broadcast_chat(self, user_id: str, message: str):
         user = self.users[user_id]["user"]
+        recipients = [uid for uid in self.get_nearby_user_ids(user.position) if uid != user_id]
         
-        for uid, user_data in self.users.items():
-            if uid != user_id:
-                other_user = user_data["user"]
-                if self.users_are_nearby(user, other_user):
-                    await self.send_to_user(uid, {
-                        "type": "chat",
-                        "data": {
-                            "user_id": user_id,
-                            "username": user.username,
-                            "message": message
-                        }
-                    })
+        await self.send_event_to_users(recipients, {
+            "type": "chat",
+            "data": {
+                "user_id": user_id,
+                "username": user.username,
+                "message": message
+            }
+        })
     
+    def index_user(self, user_id: str):
+        """Insert or move a user in the spatial index"""
+        position = self.users[user_id]["user"].position
+        self.spatial_index.update_point(("user", user_id), position.x, position.y, position.z)
+        
+    def get_player_positions(self) -> List[Vector3]:
+        return [user_data["user"].position for user_data in self.users.values()]
+        
+    def get_nearby_user_ids(self, position: Vector3, range_limit: float = 50.0) -> List[str]:
+        return [
+            entity_id
+            for kind, entity_id in self.spatial_index.query_radius(position.x, position.y, position.z, range_limit)
+            if kind == "user"
+        ]
+        
     async def send_to_user(self, user_id: str, data: Dict[str, Any]):
-        if user_id in self.users:
-            websocket = self.users[user_id]["websocket"]
-            await websocket.send_json(data)
+        connection = self.active_connections.get(user_id)
+        if connection is not None:
+            connection.send_json(data)
             
     def users_are_nearby(self, user1, user2, max_distance: float = 50.0):
         p1 = user1.position
@@ -211,27 +365,70 @@ class MetaverseCore:
         return distance_squared <= max_distance*max_distance
     
     async def run_simulation_loop(self):
-        while True:
-            await self.physics.update()
-            await self.ai_system.update_npcs()
-            await self.world.update()
-            await self.send_updates_to_clients()
-            await asyncio.sleep(0.05)
+        await asyncio.gather(self.scheduler.run(), self.network_scheduler.run())
+        
+    def stop_simulation_loop(self):
+        self.scheduler.stop()
+        self.network_scheduler.stop()
+        
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "scheduler": self.scheduler.stats(),
+            "network_scheduler": self.network_scheduler.stats(),
+            "physics": self.physics.stats(),
+            "chunk_cache": self.world.chunks.stats(),
+            "npc_lod": self.ai_system.lod_stats,
+            "npc_chat": self.npc_chat.stats(),
+            "connections": self.get_connection_stats()
+        }
 
     async def send_updates_to_clients(self):
-        for user_id, connection in self.active_connections.items():
-            if user_id in self.users:
+        now = time.monotonic()
+        rates = self.update_rates
+        rates.observe(now)
+        tolerance = self.network_scheduler.dt / 2
+        
+        lagging = []
+        for user_id, connection in list(self.active_connections.items()):
+            if connection.closed or connection.is_lagging():
+                lagging.append(user_id)
+                continue
+                
+            if user_id in self.users and rates.is_due(user_id, now):
+                rates.schedule(user_id, now, tolerance)
                 updates = await self.get_updates_for_user(user_id)
                 
-                try:
-                    await connection.send_json(updates)
-                except Exception as e:
-                    logger.error(f"Error sending updates to user {user_id}: {e}")
+                tracker = self.snapshots[user_id]
+                losses = connection.dropped + connection.coalesced
+                if losses != tracker.losses or connection.has_queued("world_update"):
+                    # The client missed an update, or the unsent one is about to be
+                    # replaced; either way a delta would name a base it never gets
+                    tracker.request_keyframe()
+                    
+                message = tracker.build(updates)
+                if message is not None:
+                    # A newer world_update replaces one the client hasn't received yet
+                    connection.send_json(message, coalesce_key="world_update")
+                # Replacing the unsent update with a keyframe loses nothing
+                tracker.losses = connection.dropped + connection.coalesced
+                
+        for user_id in lagging:
+            connection = self.active_connections.get(user_id)
+            if connection is not None:
+                logger.warning(f"Disconnecting user {user_id}: {connection.lag:.1f}s behind, {connection.dropped} messages dropped")
+            await self.disconnect(user_id)
+            
+    def get_connection_stats(self) -> Dict[str, Dict[str, Any]]:
+        stats = {}
+        for user_id, connection in self.active_connections.items():
+            stats[user_id] = connection.stats()
+            stats[user_id]["update_interval"] = self.update_rates.intervals.get(user_id)
+        return stats
 
     async def get_updates_for_user(self, user_id: str) -> Dict[str, Any]:
         user_position = Vector3(0, 0, 0)
         if user_id in self.users:
-            user_position = self.users[user_id].position
+            user_position = self.users[user_id]["user"].position
             
         nearby_users = self.get_nearby_users(user_position)
         nearby_npcs = self.ai_system.get_npcs_in_range(user_position, 50.0)
@@ -251,13 +448,10 @@ class MetaverseCore:
         return update_data
         
     def get_nearby_users(self, position: Vector3, range_limit: float = 50.0) -> List[Dict[str, Any]]:
-        nearby_users = []
-        
-        for user_id, user in self.users.items():
-            if self._is_in_range(position, user.position, range_limit):
-                nearby_users.append(user.get_state())
-                
-        return nearby_users
+        return [
+            self.users[user_id]["user"].get_state()
+            for user_id in self.get_nearby_user_ids(position, range_limit)
+        ]
         
     def _is_in_range(self, pos1: Vector3, pos2: Vector3, range_limit: float) -> bool:
         dx = pos1.x - pos2.x
@@ -271,19 +465,33 @@ class MetaverseCore:
         if exclude is None:
             exclude = []
             
+        # Serialize once and queue the same text frame for every recipient
+        payload = dumps(event)
         for user_id, connection in self.active_connections.items():
             if user_id not in exclude:
-                try:
-                    await connection.send_json(event)
-                except Exception as e:
-                    logger.error(f"Error broadcasting to user {user_id}: {e}")
+                connection.send_text(payload)
+                
+    async def send_event_to_users(self, user_ids: List[str], event: Dict[str, Any]):
+        if not user_ids:
+            return
+            
+        payload = dumps(event)
+        for user_id in user_ids:
+            connection = self.active_connections.get(user_id)
+            if connection is not None:
+                connection.send_text(payload)
                     
-    async def send_event_to_user(self, user_id: str, event: Dict[str, Any]):
-        if user_id in self.active_connections:
-            try:
-                await self.active_connections[user_id].send_json(event)
-            except Exception as e:
-                logger.error(f"Error sending event to user {user_id}: {e}")
+    async def send_event_to_user(self, user_id: str, event: Dict[str, Any]) -> bool:
+        connection = self.active_connections.get(user_id)
+        return connection is not None and connection.send_json(event)
+                
+    async def send_bytes_to_user(self, user_id: str, payload: bytes) -> bool:
+        connection = self.active_connections.get(user_id)
+        return connection is not None and connection.send_bytes(payload)
+                
+    async def send_text_to_user(self, user_id: str, payload: str) -> bool:
+        connection = self.active_connections.get(user_id)
+        return connection is not None and connection.send_text(payload)
                 
     def _get_timestamp(self) -> int:
         import time
@@ -0,0 +1,274 @@
+from typing import Any, List, Optional, Tuple
+import numpy as np
+
+# Collider types by code; any other type gets -1 and never collides
+COLLIDER_TYPES = ("box", "sphere")
+BOX = 0
+SPHERE = 1
+
+# Same constants as CollisionSystem.resolve_collision
+RESTITUTION = 0.2
+CORRECTION_PERCENT = 0.2
+CORRECTION_THRESHOLD = 0.01
+
+# Box-sphere normals for a sphere center inside the box, by nearest face
+FACE_NORMALS = np.array([
+    (-1, 0, 0), (1, 0, 0),
+    (0, -1, 0), (0, 1, 0),
+    (0, 0, -1), (0, 0, 1)
+], dtype=np.float64)
+
+def collider_arrays(bodies: List[Any]) -> Tuple[np.ndarray, np.ndarray]:
+    """Collider sizes (n, 3) and type codes (n,) for a list of physics objects"""
+    sizes = np.array([(b.collider_size.x, b.collider_size.y, b.collider_size.z) for b in bodies],
+                     dtype=np.float64).reshape(-1, 3)
+    kinds = np.array([COLLIDER_TYPES.index(b.collider_type) if b.collider_type in COLLIDER_TYPES else -1
+                      for b in bodies], dtype=np.int8)
+    return sizes, kinds
+
+def half_extents(sizes: np.ndarray, kinds: np.ndarray) -> np.ndarray:
+    """Half size of each collider's bounds; spheres use size.x as the diameter"""
+    halves = sizes / 2
+    spheres = kinds == SPHERE
+    halves[spheres] = halves[spheres, :1]
+    return halves
+
+def broadphase_pairs(low: np.ndarray, high: np.ndarray,
+                     cell_size: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """Every pair of rows whose bounds overlap, as (first, second) with first < second.
+
+    Rows are binned on x/z by the center of their bounds into square cells
+    of cell_size (the widest row by default). A row no wider than a cell can
+    only touch rows in its own or the 8 surrounding cells; wider rows are
+    tested against every row, like the oversized entries of SpatialHashGrid.
+    Pairs come back sorted by first and then second.
+    """
+    n = len(low)
+    empty = np.empty(0, dtype=np.intp)
+    if n < 2:
+        return empty, empty
+
+    widths = np.maximum(high[:, 0] - low[:, 0], high[:, 2] - low[:, 2])
+    if cell_size is None:
+        cell_size = float(widths.max())
+    if cell_size <= 0:
+        cell_size = 1.0
+    small = widths <= cell_size
+    rows = np.flatnonzero(small)
+
+    firsts = []
+    seconds = []
+    if len(rows) > 1:
+        centers = (low[rows] + high[rows]) / 2
+        cell_x = np.floor(centers[:, 0] / cell_size).astype(np.int64)
+        cell_z = np.floor(centers[:, 2] / cell_size).astype(np.int64)
+        # Leave a free column on both sides of z so neighbour keys never wrap
+        cell_z -= cell_z.min() - 1
+        span = int(cell_z.max()) + 2
+        keys = cell_x * span + cell_z
+
+        # Work in key order so every search runs over sorted targets
+        order = np.argsort(keys, kind="stable")
+        sorted_rows = rows[order]
+        sorted_keys = keys[order]
+        positions = np.arange(len(rows))
+
+        # Own cell (later rows only) plus the forward half of the neighbours
+        for dx, dz in ((0, 0), (0, 1), (1, -1), (1, 0), (1, 1)):
+            target = sorted_keys + (dx * span + dz)
+            end = np.searchsorted(sorted_keys, target, side="right")
+            start = positions + 1 if dx == dz == 0 else np.searchsorted(sorted_keys, target, side="left")
+            counts = np.maximum(end - start, 0)
+            offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+            firsts.append(np.repeat(sorted_rows, counts))
+            seconds.append(sorted_rows[np.repeat(start, counts) + offsets])
+
+    for row in np.flatnonzero(~small).tolist():
+        # Wide rows pair with every small row and with the wide rows after them
+        others = np.flatnonzero(small | (np.arange(n) > row))
+        firsts.append(np.full(len(others), row, dtype=np.intp))
+        seconds.append(others)
+
+    if not firsts:
+        return empty, empty
+    a = np.concatenate(firsts)
+    b = np.concatenate(seconds)
+    overlap = ((low[a] <= high[b]) & (high[a] >= low[b])).all(axis=1)
+    first = np.minimum(a[overlap], b[overlap])
+    second = np.maximum(a[overlap], b[overlap])
+    visit = np.lexsort((second, first))
+    return first[visit], second[visit]
+
+def narrowphase(positions: np.ndarray, sizes: np.ndarray, kinds: np.ndarray,
+                first: np.ndarray, second: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Test candidate pairs in bulk, grouped by collider types.
+
+    Gives the same contacts as CollisionSystem.check_collision: box-sphere
+    pairs are ordered box first, and normals point from the first object
+    to the second. Returns (first, second, normals, penetrations) for the
+    pairs that touch, in the order they were given.
+    """
+    first = np.asarray(first, dtype=np.intp)
+    second = np.asarray(second, dtype=np.intp)
+
+    # Mixed pairs always have the box first
+    swap = (kinds[first] == SPHERE) & (kinds[second] == BOX)
+    first, second = np.where(swap, second, first), np.where(swap, first, second)
+    kind1 = kinds[first]
+    kind2 = kinds[second]
+
+    hit = np.zeros(len(first), dtype=bool)
+    normals = np.zeros((len(first), 3), dtype=np.float64)
+    penetrations = np.zeros(len(first), dtype=np.float64)
+
+    groups = (
+        ((kind1 == BOX) & (kind2 == BOX), _box_box),
+        ((kind1 == SPHERE) & (kind2 == SPHERE), _sphere_sphere),
+        ((kind1 == BOX) & (kind2 == SPHERE), _box_sphere)
+    )
+    for selected, kernel in groups:
+        pairs = np.flatnonzero(selected)
+        if len(pairs):
+            a = first[pairs]
+            b = second[pairs]
+            touching, group_normals, group_penetrations = kernel(positions[a], sizes[a], positions[b], sizes[b])
+            pairs = pairs[touching]
+            hit[pairs] = True
+            normals[pairs] = group_normals
+            penetrations[pairs] = group_penetrations
+
+    return first[hit], second[hit], normals[hit], penetrations[hit]
+
+def _box_box(position1, size1, position2, size2):
+    min1 = position1 - size1 / 2
+    max1 = position1 + size1 / 2
+    min2 = position2 - size2 / 2
+    max2 = position2 + size2 / 2
+    touching = ((max1 >= min2) & (min1 <= max2)).all(axis=1)
+
+    overlap = np.minimum(max1 - min2, max2 - min1)[touching]
+    ox, oy, oz = overlap[:, 0], overlap[:, 1], overlap[:, 2]
+    # Smallest overlap axis, preferring x then y on ties
+    axis = np.where((ox <= oy) & (ox <= oz), 0, np.where((oy <= ox) & (oy <= oz), 1, 2))
+    rows = np.arange(len(axis))
+    normals = np.zeros((len(axis), 3), dtype=np.float64)
+    normals[rows, axis] = np.where(position1[touching, axis] < position2[touching, axis], 1.0, -1.0)
+    return touching, normals, overlap[rows, axis]
+
+def _sphere_sphere(position1, size1, position2, size2):
+    delta = position2 - position1
+    distance_squared = np.einsum("ij,ij->i", delta, delta)
+    radii_sum = size1[:, 0] / 2 + size2[:, 0] / 2
+    touching = distance_squared < radii_sum * radii_sum
+
+    delta = delta[touching]
+    distance = np.sqrt(distance_squared[touching])
+    normals = np.zeros_like(delta)
+    normals[:, 1] = 1.0  # Arbitrary direction if spheres are at the same position
+    apart = distance != 0
+    normals[apart] = delta[apart] / distance[apart, None]
+    return touching, normals, radii_sum[touching] - distance
+
+def _box_sphere(box_position, box_size, center, sphere_size):
+    box_min = box_position - box_size / 2
+    box_max = box_position + box_size / 2
+    # From the closest point on the box to the center, so normals point box to sphere
+    delta = center - np.maximum(box_min, np.minimum(center, box_max))
+    distance_squared = np.einsum("ij,ij->i", delta, delta)
+    radius = sphere_size[:, 0] / 2
+    touching = distance_squared < radius * radius
+
+    delta = delta[touching]
+    radius = radius[touching]
+    distance = np.sqrt(distance_squared[touching])
+    normals = np.empty_like(delta)
+    penetrations = radius - distance
+
+    outside = distance != 0
+    normals[outside] = delta[outside] / distance[outside, None]
+
+    # Center inside the box: push out through the nearest face
+    inside = np.flatnonzero(~outside)
+    if len(inside):
+        c = center[touching][inside]
+        low = box_min[touching][inside]
+        high = box_max[touching][inside]
+        faces = np.abs(np.stack([
+            c[:, 0] - low[:, 0], c[:, 0] - high[:, 0],
+            c[:, 1] - low[:, 1], c[:, 1] - high[:, 1],
+            c[:, 2] - low[:, 2], c[:, 2] - high[:, 2]
+        ], axis=1))
+        nearest = np.argmin(faces, axis=1)
+        normals[inside] = FACE_NORMALS[nearest]
+        penetrations[inside] = radius[inside] + faces[np.arange(len(inside)), nearest]
+    return touching, normals, penetrations
+
+def apply_contacts(positions: np.ndarray, velocities: np.ndarray, inverse_masses: np.ndarray,
+                   first: np.ndarray, second: np.ndarray, normals: np.ndarray,
+                   penetrations: np.ndarray) -> np.ndarray:
+    """Resolve contacts in one Jacobi step, returning which contacts were approaching.
+
+    Every impulse and position correction is computed from the velocities
+    and positions before any of them is applied, then summed per body with
+    np.add.at. Per contact the maths matches CollisionSystem.resolve_collision;
+    static bodies have an inverse mass of 0. Unlike the sequential solver,
+    a body with several contacts gets all of them added together.
+    """
+    w1 = inverse_masses[first]
+    w2 = inverse_masses[second]
+    total = w1 + w2
+    relative = velocities[second] - velocities[first]
+    along_normal = np.einsum("ij,ij->i", relative, normals)
+
+    # Separating contacts and pairs of static bodies are left alone
+    approaching = (along_normal <= 0) & (total > 0)
+    w1 = w1[approaching]
+    w2 = w2[approaching]
+    total = total[approaching]
+    normals = normals[approaching]
+    a = first[approaching]
+    b = second[approaching]
+
+    impulse = (-(1 + RESTITUTION) * along_normal[approaching] / total)[:, None] * normals
+    np.add.at(velocities, a, -impulse * w1[:, None])
+    np.add.at(velocities, b, impulse * w2[:, None])
+
+    penetration = penetrations[approaching]
+    correcting = penetration > CORRECTION_THRESHOLD
+    correction = (penetration * CORRECTION_PERCENT / total)[correcting, None] * normals[correcting]
+    np.add.at(positions, a[correcting], -correction * w1[correcting, None])
+    np.add.at(positions, b[correcting], correction * w2[correcting, None])
+    return approaching
+
+def sweep_toi(starts: np.ndarray, deltas: np.ndarray, low: np.ndarray, high: np.ndarray,
+              paired: bool = False) -> np.ndarray:
+    """Earliest time in [0, 1] at which each moving point enters any of the boxes.
+
+    Slab test of every segment from starts[i] to starts[i] + deltas[i]
+    (m, 3) against every box (low, high) (k, 3). With paired, segment i is
+    only tested against box i (both (m, 3)). Sweeping a collider is the
+    same test with the boxes grown by its half extents. A box that already
+    contains the start of a segment is ignored, that is an overlapping
+    contact for the discrete pass. Segments that hit nothing get inf.
+    """
+    if not paired:
+        starts = starts[:, None, :]
+        deltas = deltas[:, None, :]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t1 = (low - starts) / deltas
+        t2 = (high - starts) / deltas
+    near = np.minimum(t1, t2)
+    far = np.maximum(t1, t2)
+
+    # An axis without motion hits everything or nothing along it
+    still = np.broadcast_to(deltas == 0, near.shape)
+    if still.any():
+        inside = (starts >= low) & (starts <= high)
+        near = np.where(still, np.where(inside, -np.inf, np.inf), near)
+        far = np.where(still, np.where(inside, np.inf, -np.inf), far)
+
+    enter = near.max(axis=-1)
+    leave = far.min(axis=-1)
+    hit = (enter <= leave) & (enter >= 0) & (enter <= 1)
+    times = np.where(hit, enter, np.inf)
+    return times if paired else times.min(axis=1)
@@ -0,0 +1,353 @@
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from .vector3 import Vector3
+from .body_store import PhysicsBodyStore
+from .narrowphase import COLLIDER_TYPES, collider_arrays, half_extents
+from .physics_engine import CollisionSystem, PhysicsObject
+
+# Columns of the shared body block: name, row shape, dtype
+SHARED_COLUMNS = (
+    ("positions", (3,), np.float64),
+    ("velocities", (3,), np.float64),
+    ("sizes", (3,), np.float64),
+    ("masses", (), np.float64),
+    ("kinds", (), np.int8),
+    ("static", (), np.bool_),
+    ("asleep", (), np.bool_)
+)
+
+Contact = Tuple[int, int, float, float, float, float]
+
+def _block_size(capacity: int) -> int:
+    size = 0
+    for _, shape, dtype in SHARED_COLUMNS:
+        size += -size % 8  # Keep every column 8-byte aligned
+        size += capacity * int(np.prod(shape, dtype=np.int64)) * np.dtype(dtype).itemsize
+    return size
+
+def _views(buffer, capacity: int) -> Dict[str, np.ndarray]:
+    """Map the shared block onto one array per column"""
+    views = {}
+    offset = 0
+    for name, shape, dtype in SHARED_COLUMNS:
+        offset += -offset % 8
+        views[name] = np.ndarray((capacity,) + shape, dtype=dtype, buffer=buffer, offset=offset)
+        offset += views[name].nbytes
+    return views
+
+# Shared blocks attached in this worker process, by name
+_attached: Dict[str, Tuple[shared_memory.SharedMemory, Dict[str, np.ndarray]]] = {}
+
+def _attach(name: str, capacity: int) -> Dict[str, np.ndarray]:
+    entry = _attached.get(name)
+    if entry is None:
+        # A new block means the old one was replaced, drop it
+        for shm, _ in _attached.values():
+            shm.close()
+        _attached.clear()
+        shm = shared_memory.SharedMemory(name=name)
+        entry = _attached[name] = (shm, _views(shm.buf, capacity))
+    return entry[1]
+
+def resolve_regions(name: str, capacity: int, cell_size: Optional[float],
+                    regions: List[Tuple[int, np.ndarray]]) -> List[Tuple[int, List[Contact]]]:
+    """Worker task: resolve the contacts inside each region, writing results to the shared block.
+
+    Every region is resolved on its own with CollisionSystem, visiting rows
+    in ascending order, so the outcome doesn't depend on which worker runs
+    it. Returns each region's contacts as (row1, row2, nx, ny, nz, penetration).
+    """
+    arrays = _attach(name, capacity)
+    positions = arrays["positions"]
+    velocities = arrays["velocities"]
+    sizes = arrays["sizes"]
+    masses = arrays["masses"]
+    kinds = arrays["kinds"]
+    static = arrays["static"]
+    asleep = arrays["asleep"]
+
+    results = []
+    for region, rows in regions:
+        objects = []
+        for row in rows.tolist():
+            kind = kinds[row]
+            obj = PhysicsObject(
+                obj_id=row,
+                position=Vector3(*positions[row].tolist()),
+                velocity=Vector3(*velocities[row].tolist()),
+                mass=float(masses[row]),
+                is_static=bool(static[row]),
+                collider_type=COLLIDER_TYPES[kind] if kind >= 0 else "none",
+                collider_size=Vector3(*sizes[row].tolist())
+            )
+            obj.sleeping = bool(asleep[row])
+            objects.append(obj)
+
+        collision_system = CollisionSystem(cell_size=cell_size)
+        collision_system.resolve_collisions(objects)
+
+        for obj in objects:
+            row = obj.id
+            position = obj.position
+            velocity = obj.velocity
+            positions[row] = (position.x, position.y, position.z)
+            velocities[row] = (velocity.x, velocity.y, velocity.z)
+            asleep[row] = obj.sleeping
+
+        contacts = []
+        for collision in collision_system.collision_pairs:
+            normal = collision["normal"]
+            contacts.append((collision["obj1"].id, collision["obj2"].id,
+                             normal.x, normal.y, normal.z, collision["penetration"]))
+        results.append((region, contacts))
+    return results
+
+class RegionStepper:
+    """Resolves collisions for a PhysicsBodyStore region by region in a process pool.
+
+    Bodies are bucketed into square regions of region_size on x/z (the
+    world chunk size by default). A body whose bounds lie inside one region
+    is resolved by a worker together with the rest of that region, reading
+    and writing its row of a shared memory block. Static bodies never move,
+    so one that crosses region borders is copied into every region it
+    overlaps. Moving bodies whose bounds cross a border are resolved
+    afterwards in a serial boundary pass against the bodies they overlap.
+    Regions are resolved independently
+    and merged in a fixed order, so results are the same for any number of
+    workers and from run to run.
+
+    Terrain is left to the integration pass; workers only resolve contacts.
+    """
+
+    # Slack added to bounds, as in the broadphase
+    MARGIN = CollisionSystem.BROADPHASE_MARGIN
+
+    def __init__(self, workers: int, region_size: float = 16.0, cell_size: Optional[float] = 4.0,
+                 tasks_per_worker: int = 4):
+        self.workers = workers
+        self.region_size = region_size
+        self.cell_size = cell_size
+        self.tasks_per_worker = tasks_per_worker
+        self.executor: Optional[ProcessPoolExecutor] = None
+        self.shm: Optional[shared_memory.SharedMemory] = None
+        self.capacity = 0
+        self.arrays: Dict[str, np.ndarray] = {}
+        self._collider_generation = None
+        self.last_regions = 0
+        self.last_boundary = 0
+
+    def _ensure_block(self, capacity: int):
+        if self.shm is not None and self.capacity >= capacity:
+            return
+        self._release_block()
+        self.shm = shared_memory.SharedMemory(create=True, size=max(1, _block_size(capacity)))
+        self.capacity = capacity
+        self.arrays = _views(self.shm.buf, capacity)
+        self._collider_generation = None
+
+    def _release_block(self):
+        if self.shm is not None:
+            self.arrays = {}
+            self.shm.close()
+            self.shm.unlink()
+            self.shm = None
+            self.capacity = 0
+
+    def _sync_colliders(self, store: PhysicsBodyStore):
+        """Copy collider shapes into the block when bodies were added or moved"""
+        if self._collider_generation == store.generation:
+            return
+        n = store.count
+        self.arrays["sizes"][:n], self.arrays["kinds"][:n] = collider_arrays(store.bodies)
+        self._collider_generation = store.generation
+
+    def _crosses(self, low: np.ndarray, high: np.ndarray) -> np.ndarray:
+        """Rows whose x/z interval spans more than one region"""
+        size = self.region_size
+        return ((np.floor(low[:, 0] / size) != np.floor(high[:, 0] / size)) |
+                (np.floor(low[:, 2] / size) != np.floor(high[:, 2] / size)))
+
+    def _partition(self, n: int, interior: np.ndarray, shared: np.ndarray,
+                   low: np.ndarray, high: np.ndarray) -> List[np.ndarray]:
+        """Group interior rows by region, keeping only regions where something can collide.
+
+        Each shared row is added, in row order, to every region its bounds overlap.
+        """
+        arrays = self.arrays
+        rows = np.flatnonzero(interior)
+        if len(rows) == 0:
+            return []
+
+        size = self.region_size
+        positions = arrays["positions"]
+        region_x = np.floor(positions[rows, 0] / size).astype(np.int64)
+        region_z = np.floor(positions[rows, 2] / size).astype(np.int64)
+        # One sortable key per region
+        keys = (region_x << 32) + (region_z & 0xFFFFFFFF)
+        _, inverse, counts = np.unique(keys, return_inverse=True, return_counts=True)
+        order = np.argsort(inverse, kind="stable")
+        groups = np.split(rows[order], np.cumsum(counts)[:-1])
+
+        if len(shared):
+            firsts = order[np.cumsum(counts) - counts]
+            group_x = region_x[firsts]
+            group_z = region_z[firsts]
+            extra = [[] for _ in groups]
+            for row in shared.tolist():
+                overlapped = np.flatnonzero(
+                    (group_x >= np.floor(low[row, 0] / size)) & (group_x <= np.floor(high[row, 0] / size)) &
+                    (group_z >= np.floor(low[row, 2] / size)) & (group_z <= np.floor(high[row, 2] / size))
+                )
+                for index in overlapped.tolist():
+                    extra[index].append(row)
+            groups = [np.sort(np.concatenate([group, added])) if added else group
+                      for group, added in zip(groups, extra)]
+
+        active = ~arrays["static"][:n] & ~arrays["asleep"][:n]
+        return [group for group in groups if len(group) > 1 and active[group].any()]
+
+    def resolve_collisions(self, store: PhysicsBodyStore, collision_system: CollisionSystem):
+        """Resolve every contact between the store's bodies, filling collision_system.collision_pairs"""
+        collision_system.collision_pairs = []
+        n = store.count
+        if n == 0:
+            return
+
+        self._ensure_block(store.capacity)
+        self._sync_colliders(store)
+        arrays = self.arrays
+        arrays["positions"][:n] = store.positions[:n]
+        arrays["velocities"][:n] = store.velocities[:n]
+        arrays["masses"][:n] = store.masses[:n]
+        arrays["static"][:n] = store.static[:n]
+        arrays["asleep"][:n] = store.asleep[:n]
+
+        positions = arrays["positions"][:n]
+        halves = half_extents(self.arrays["sizes"][:n], self.arrays["kinds"][:n]) + self.MARGIN
+        low = positions - halves
+        high = positions + halves
+        crossing = self._crosses(low, high)
+        # Static bodies across borders join every region they overlap instead
+        shared = crossing & arrays["static"][:n]
+
+        regions = self._partition(n, ~crossing, np.flatnonzero(shared), low, high)
+        crossing &= ~shared
+        self.last_regions = len(regions)
+        contacts = self._run_regions(regions)
+
+        # Bring the worker results back into the store
+        store.positions[:n] = arrays["positions"][:n]
+        store.velocities[:n] = arrays["velocities"][:n]
+        bodies = store.bodies
+        for row in np.flatnonzero(store.asleep[:n] & ~arrays["asleep"][:n]).tolist():
+            if bodies[row].sleeping:
+                bodies[row].wake()
+
+        pairs = collision_system.collision_pairs
+        for row1, row2, nx, ny, nz, penetration in contacts:
+            pairs.append({
+                "normal": Vector3(nx, ny, nz),
+                "penetration": penetration,
+                "obj1": bodies[row1],
+                "obj2": bodies[row2]
+            })
+
+        self.last_boundary = int(crossing.sum())
+        if self.last_boundary:
+            self._resolve_boundary(store, collision_system, halves, crossing)
+
+    def _resolve_boundary(self, store: PhysicsBodyStore, collision_system: CollisionSystem,
+                          halves: np.ndarray, crossing: np.ndarray):
+        """Serial pass over every contact that involves a moving body crossing a region border.
+
+        Crossing bodies are visited in row order and tested against every
+        body whose bounds overlap theirs; a pair of two crossing bodies is
+        tested once, from the lower row.
+        """
+        bodies = store.bodies
+        n = len(crossing)
+        positions = store.positions[:n]
+        low = positions - halves
+        high = positions + halves
+        crossers = np.flatnonzero(crossing)
+
+        # Sweep on x: a candidate's low edge is within the widest body of the crossing
+        # body's low edge. Bodies wider than a region, like the spatial hash's
+        # oversized entries, are paired with every crossing body instead.
+        widths = high[:, 0] - low[:, 0]
+        wide = widths > self.region_size
+        narrow = np.flatnonzero(~wide)
+        order = narrow[np.argsort(low[narrow, 0], kind="stable")]
+        sorted_low = low[order, 0]
+        width = widths[narrow].max() if len(narrow) else 0.0
+        starts = np.searchsorted(sorted_low, low[crossers, 0] - width, side="left")
+        counts = np.searchsorted(sorted_low, high[crossers, 0], side="right") - starts
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        second = order[np.repeat(starts, counts) + offsets]
+        first = np.repeat(crossers, counts)
+
+        wide_rows = np.flatnonzero(wide)
+        if len(wide_rows):
+            first = np.concatenate([first, np.repeat(crossers, len(wide_rows))])
+            second = np.concatenate([second, np.tile(wide_rows, len(crossers))])
+
+        keep = (((low[first] <= high[second]) & (high[first] >= low[second])).all(axis=1) &
+                (first != second) & ~(crossing[second] & (second < first)))
+        first = first[keep]
+        second = second[keep]
+        visit = np.lexsort((second, first))
+
+        pairs = collision_system.collision_pairs
+        for row, other in zip(first[visit].tolist(), second[visit].tolist()):
+            obj1 = bodies[row]
+            obj2 = bodies[other]
+
+            # Skip if neither object is simulated
+            if (obj1.is_static or obj1.sleeping) and (obj2.is_static or obj2.sleeping):
+                continue
+
+            collision = collision_system.check_collision(obj1, obj2)
+            if collision:
+                for obj in (obj1, obj2):
+                    if obj.sleeping:
+                        obj.wake()
+                pairs.append(collision)
+                collision_system.resolve_collision(collision)
+
+    def _run_regions(self, regions: List[np.ndarray]) -> List[Contact]:
+        if not regions:
+            return []
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=self.workers)
+
+        # Deal regions out round-robin; the merge below is by region, not by task
+        task_count = min(len(regions), self.workers * self.tasks_per_worker)
+        tasks = [[] for _ in range(task_count)]
+        for index, rows in enumerate(regions):
+            tasks[index % task_count].append((index, rows))
+
+        futures = [
+            self.executor.submit(resolve_regions, self.shm.name, self.capacity, self.cell_size, task)
+            for task in tasks
+        ]
+        by_region: List[List[Contact]] = [[] for _ in regions]
+        for future in futures:
+            for index, contacts in future.result():
+                by_region[index] = contacts
+        return [contact for contacts in by_region for contact in contacts]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "regions": self.last_regions,
+            "boundary_bodies": self.last_boundary
+        }
+
+    def shutdown(self):
+        """Stop the workers and free the shared block"""
+        if self.executor is not None:
+            self.executor.shutdown(wait=True, cancel_futures=True)
+            self.executor = None
+        self._release_block()
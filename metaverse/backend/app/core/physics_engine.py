@@ -1,12 +1,49 @@
-from typing import Dict, Any, List, Optional
+import heapq
+from typing import Dict, Any, List, Optional, Tuple
+import numpy as np
 from .vector3 import Vector3
+from .spatial_hash import SpatialHashGrid
+from .body_store import PhysicsBodyStore
+from .narrowphase import apply_contacts, broadphase_pairs, collider_arrays, half_extents, narrowphase, sweep_toi
 
 class PhysicsEngine:
-    def __init__(self):
+    # Swept bodies stop this far inside what they hit so the contact is found
+    CCD_SKIN = 1e-3
+    # Shortest sub-step, for very thin colliders
+    MIN_SUBSTEP = 0.05
+    
+    def __init__(self, collision_cell_size: Optional[float] = 4.0, vectorized: bool = False,
+                 sleep_velocity: float = 0.4, sleep_ticks: Optional[int] = 10,
+                 workers: int = 0, region_size: float = 16.0, batched_contacts: bool = False,
+                 ccd_speed: Optional[float] = 10.0, max_substeps: int = 16):
         self.gravity = -9.81
-        self.collision_system = CollisionSystem()
+        # Bodies faster than ccd_speed are sub-stepped on their own and swept
+        # against the other colliders so they can't tunnel through them;
+        # a ccd_speed of None disables continuous collision detection
+        self.ccd_speed = ccd_speed
+        self.max_substeps = max_substeps
+        self.ccd_bodies = 0  # Bodies swept during the last update
+        self.ccd_hits = 0  # Sweeps stopped at a time of impact, in total
+        # Bodies slower than sleep_velocity for sleep_ticks ticks in a row are put
+        # to sleep with the bodies touching them; a sleep_ticks of None disables sleeping
+        self.sleep_velocity = sleep_velocity
+        self.sleep_ticks = sleep_ticks
+        self.collision_system = CollisionSystem(cell_size=collision_cell_size)
         self.objects = {}  # Physics objects
         self.world_ref = None  # Reference to world engine (set during initialization)
+        # In vectorized mode body state lives in contiguous arrays and is stepped in bulk
+        self.store = PhysicsBodyStore() if vectorized or workers or batched_contacts else None
+        # With workers > 0 collisions are resolved by region in a process pool (implies vectorized)
+        self.regions = None
+        if workers:
+            from .parallel_physics import RegionStepper
+            self.regions = RegionStepper(workers, region_size, collision_cell_size)
+        # Batched contacts find and resolve every contact with array kernels in one
+        # Jacobi step instead of pair by pair (implies vectorized)
+        self.batched_contacts = batched_contacts
+        # Row pairs in contact after the last batched step
+        self.contact_rows = None
+        self._colliders = None
         
     def set_world_reference(self, world_ref):
         """Set reference to the world engine for terrain queries"""
@@ -15,78 +52,451 @@ class PhysicsEngine:
     def register_object(self, obj_id: str, position: Vector3, velocity: Vector3 = None, 
                         mass: float = 1.0, is_static: bool = False, 
                         collider_type: str = "box", collider_size: Vector3 = None) -> 'PhysicsObject':
-        """Register an object with the physics system"""
-        physics_obj = PhysicsObject(
+        """Register an object with the physics system.
+        
+        The position and velocity are copied: the engine updates its vectors
+        in place, which must not move a vector the caller still holds.
+        """
+        if obj_id in self.objects:
+            self.unregister_object(obj_id)
+            
+        params = dict(
             obj_id=obj_id,
-            position=position,
-            velocity=velocity or Vector3(0, 0, 0),
+            position=Vector3(position.x, position.y, position.z),
+            velocity=Vector3(velocity.x, velocity.y, velocity.z) if velocity else Vector3(0, 0, 0),
             mass=mass,
             is_static=is_static,
             collider_type=collider_type,
             collider_size=collider_size or Vector3(1, 1, 1)
         )
         
+        if self.store is not None:
+            physics_obj = StoredPhysicsObject(self.store, **params)
+        else:
+            physics_obj = PhysicsObject(**params)
+        
         self.objects[obj_id] = physics_obj
         return physics_obj
         
     def unregister_object(self, obj_id: str):
         """Remove an object from the physics system"""
         if obj_id in self.objects:
-            del self.objects[obj_id]
+            obj = self.objects.pop(obj_id)
+            if obj.island is not None:
+                obj.island.remove(obj)
+            if isinstance(obj, StoredPhysicsObject):
+                obj.detach()
+        self.collision_system.remove_object(obj_id)
             
     def update(self, delta_time: float):
         """Update all physics objects"""
         # Apply forces and update positions
-        for obj in self.objects.values():
-            if not obj.is_static:
-                self.apply_physics(obj, delta_time)
+        if self.store is not None:
+            fast_rows = self.fast_rows()
+            self.integrate_store(delta_time, skip=fast_rows)
+            fast = [self.store.bodies[row] for row in fast_rows.tolist()]
+        else:
+            moving = [obj for obj in self.objects.values() if not obj.is_static and not obj.sleeping]
+            fast = []
+            if self.ccd_speed is not None:
+                limit = self.ccd_speed * self.ccd_speed
+                fast = [obj for obj in moving if obj.velocity.length_sq() > limit]
+                if fast:
+                    moving = [obj for obj in moving if obj.velocity.length_sq() <= limit]
+            for obj in moving:
+                self.integrate(obj, delta_time)
+            self.clamp_objects_to_terrain(moving)
+            
+        # Fast bodies move last so they are swept against where the others ended up
+        self.ccd_bodies = len(fast)
+        if fast:
+            self.integrate_swept(fast, delta_time)
                 
         # Handle collisions
-        self.collision_system.resolve_collisions(list(self.objects.values()), self.world_ref)
+        objects = list(self.objects.values())
+        if self.regions is not None:
+            self.regions.resolve_collisions(self.store, self.collision_system)
+        elif self.batched_contacts:
+            self.resolve_contacts_store()
+        else:
+            self.collision_system.resolve_collisions(objects, self.world_ref)
+        
+        if self.sleep_ticks is not None:
+            self.update_sleep(objects)
         
     def apply_physics(self, obj: 'PhysicsObject', delta_time: float):
         """Apply physics to an object"""
+        self.integrate(obj, delta_time)
+        self.clamp_objects_to_terrain([obj])
+        
+    def integrate(self, obj: 'PhysicsObject', delta_time: float):
+        """Apply gravity and forces to an object and move it"""
+        # Vectors are updated in place and assigned back, which is free for
+        # plain objects and writes the row for stored ones
+        mass = obj.mass
+        force = obj.force
+        
         # Apply gravity
-        obj.apply_force(Vector3(0, self.gravity * obj.mass, 0))
+        if not obj.is_static:
+            force.y += self.gravity * mass
         
         # Update velocity based on forces
-        acceleration = Vector3(
-            obj.force.x / obj.mass,
-            obj.force.y / obj.mass,
-            obj.force.z / obj.mass
-        )
-        obj.velocity = Vector3(
-            obj.velocity.x + acceleration.x * delta_time,
-            obj.velocity.y + acceleration.y * delta_time,
-            obj.velocity.z + acceleration.z * delta_time
-        )
+        velocity = obj.velocity
+        velocity.x += force.x / mass * delta_time
+        velocity.y += force.y / mass * delta_time
+        velocity.z += force.z / mass * delta_time
+        obj.velocity = velocity
         
         # Update position based on velocity
-        obj.position = Vector3(
-            obj.position.x + obj.velocity.x * delta_time,
-            obj.position.y + obj.velocity.y * delta_time,
-            obj.position.z + obj.velocity.z * delta_time
-        )
+        position = obj.position
+        position.x += velocity.x * delta_time
+        position.y += velocity.y * delta_time
+        position.z += velocity.z * delta_time
+        obj.position = position
+        
+        # Reset forces for next frame
+        obj.force = force.set(0, 0, 0)
         
-        # Check terrain collision
-        if self.world_ref:
-            terrain_height = self.world_ref.get_terrain_height(obj.position.x, obj.position.z)
+    def clamp_objects_to_terrain(self, objects: List['PhysicsObject']):
+        """Keep objects above the terrain using one batched height query"""
+        if not self.world_ref or not objects:
+            return
             
-            if obj.position.y < terrain_height:
-                obj.position = Vector3(obj.position.x, terrain_height, obj.position.z)
+        terrain_heights = self.world_ref.get_terrain_heights(
+            [obj.position.x for obj in objects],
+            [obj.position.z for obj in objects]
+        ).tolist()
+        
+        for obj, terrain_height in zip(objects, terrain_heights):
+            position = obj.position
+            if position.y < terrain_height:
+                position.y = terrain_height
+                obj.position = position
                 # Bounce with some dampening
-                obj.velocity = Vector3(
-                    obj.velocity.x * 0.8,
-                    -obj.velocity.y * 0.5,  # Bounce with dampening
-                    obj.velocity.z * 0.8
-                )
+                velocity = obj.velocity
+                velocity.x *= 0.8
+                velocity.y = -velocity.y * 0.5  # Bounce with dampening
+                velocity.z *= 0.8
                 
                 # If velocity is very small, stop the object
-                if abs(obj.velocity.y) < 0.1:
-                    obj.velocity = Vector3(obj.velocity.x, 0, obj.velocity.z)
+                if abs(velocity.y) < 0.1:
+                    velocity.y = 0
+                obj.velocity = velocity
+        
+    def fast_rows(self) -> np.ndarray:
+        """Store rows of simulated bodies faster than ccd_speed"""
+        store = self.store
+        n = store.count
+        if self.ccd_speed is None or n == 0:
+            return np.empty(0, dtype=np.intp)
+        velocities = store.velocities[:n]
+        speeds_sq = np.einsum("ij,ij->i", velocities, velocities)
+        return np.flatnonzero((speeds_sq > self.ccd_speed * self.ccd_speed)
+                              & ~store.static[:n] & ~store.asleep[:n])
+        
+    def integrate_swept(self, fast: List['PhysicsObject'], delta_time: float):
+        """Move fast bodies in sub-steps and stop them where they first hit a collider.
+        
+        A sub-step is no longer than the body's smallest half extent and is
+        followed by a terrain check, so the body can't skip over terrain.
+        All fast bodies are stepped together, then every sub-step segment is
+        swept as an AABB against the bounds of its body's broadphase
+        candidates in one slab test. A body that would hit one stops at the
+        time of impact, just inside it, and keeps its velocity so the
+        collision pass resolves the contact this tick.
+        """
+        if self.store is not None:
+            objects = self.store.bodies
+            sizes, kinds = self.store_colliders()
+            positions = self.store.positions[:len(objects)].copy()
+        else:
+            objects = list(self.objects.values())
+            sizes, kinds = collider_arrays(objects)
+            positions = np.array([(obj.position.x, obj.position.y, obj.position.z) for obj in objects],
+                                 dtype=np.float64).reshape(-1, 3)
+        halves = half_extents(sizes, kinds)
+        low = positions - halves
+        high = positions + halves
+        rows = {obj.id: row for row, obj in enumerate(objects)}
+        
+        # Starting state of every fast body
+        fast_rows = np.array([rows[obj.id] for obj in fast], dtype=np.intp)
+        state = np.array([(obj.position.x, obj.position.y, obj.position.z,
+                           obj.velocity.x, obj.velocity.y, obj.velocity.z,
+                           obj.force.x, obj.force.y, obj.force.z, obj.mass) for obj in fast],
+                         dtype=np.float64)
+        position = state[:, 0:3].copy()
+        velocity = state[:, 3:6].copy()
+        accel = state[:, 6:9] / state[:, 9:10]
+        accel[:, 1] += self.gravity
+        speeds = np.sqrt(np.einsum("ij,ij->i", velocity, velocity))
+        half = halves[fast_rows]
+        steps = np.maximum(half.min(axis=1), self.MIN_SUBSTEP)
+        substeps = np.clip(np.ceil(speeds * delta_time / steps), 1, self.max_substeps).astype(np.intp)
+        dts = delta_time / substeps
+        
+        # Step every body at once; one that has taken all its sub-steps stays put
+        count = len(fast)
+        path = np.empty((int(substeps.max()) + 1, count, 6), dtype=np.float64)
+        path[0, :, :3] = position
+        path[0, :, 3:] = velocity
+        world_ref = self.world_ref
+        for k in range(1, len(path)):
+            stepping = substeps >= k
+            dt = np.where(stepping, dts, 0.0)[:, None]
+            velocity += accel * dt
+            position += velocity * dt
+            if world_ref:
+                heights = world_ref.get_terrain_heights(position[:, 0], position[:, 2])
+                under = np.flatnonzero(stepping & (position[:, 1] < heights))
+                if len(under):
+                    position[under, 1] = heights[under]
+                    velocity[under, 0] *= 0.8
+                    velocity[under, 2] *= 0.8
+                    bounce = -velocity[under, 1] * 0.5
+                    bounce[np.abs(bounce) < 0.1] = 0.0
+                    velocity[under, 1] = bounce
+            path[k, :, :3] = position
+            path[k, :, 3:] = velocity
+            
+        # Broadphase: colliders whose bounds overlap the bounds a body sweeps
+        # through, from a sweep on x. Colliders wider than every swept box are
+        # tested against all of them, like the oversized entries of SpatialHashGrid.
+        reach_low = path[:, :, :3].min(axis=0) - half
+        reach_high = path[:, :, :3].max(axis=0) + half
+        widths = high[:, 0] - low[:, 0]
+        wide = widths > (reach_high[:, 0] - reach_low[:, 0]).max()
+        narrow = np.flatnonzero(~wide)
+        order = narrow[np.argsort(low[narrow, 0], kind="stable")]
+        sorted_low = low[order, 0]
+        width = widths[narrow].max() if len(narrow) else 0.0
+        starts = np.searchsorted(sorted_low, reach_low[:, 0] - width, side="left")
+        counts = np.searchsorted(sorted_low, reach_high[:, 0], side="right") - starts
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        body = np.repeat(np.arange(count), counts)
+        other = order[np.repeat(starts, counts) + offsets]
+        wide_rows = np.flatnonzero(wide)
+        if len(wide_rows):
+            body = np.concatenate([body, np.repeat(np.arange(count), len(wide_rows))])
+            other = np.concatenate([other, np.tile(wide_rows, count)])
+        keep = (((low[other] <= reach_high[body]) & (high[other] >= reach_low[body])).all(axis=1) &
+                (other != fast_rows[body]))
+        body = body[keep]
+        other = other[keep]
+        
+        hit_segment = np.full(count, -1, dtype=np.intp)
+        hit_time = np.zeros(count, dtype=np.float64)
+        if len(body):
+            # Candidates grown by the body's half extents and shrunk by the
+            # skin (at most a quarter of their size)
+            grown_low = low[other] - half[body]
+            grown_high = high[other] + half[body]
+            skin = np.minimum(self.CCD_SKIN, (grown_high - grown_low) / 4)
+            grown_low += skin
+            grown_high -= skin
+            
+            # One row per (candidate, sub-step) of the body
+            segments = substeps[body]
+            pair = np.repeat(np.arange(len(body)), segments)
+            segment = np.arange(segments.sum()) - np.repeat(np.cumsum(segments) - segments, segments)
+            owner = body[pair]
+            starts = path[segment, owner, :3]
+            deltas = path[segment + 1, owner, :3] - starts
+            times = sweep_toi(starts, deltas, grown_low[pair], grown_high[pair], paired=True)
+            
+            # The first impact of each body: earliest sub-step, then earliest time in it
+            hits = np.flatnonzero(times <= 1)
+            if len(hits):
+                hits = hits[np.lexsort((times[hits], segment[hits], owner[hits]))]
+                firsts = hits[np.flatnonzero(np.diff(owner[hits], prepend=-1))]
+                hit_segment[owner[firsts]] = segment[firsts]
+                hit_time[owner[firsts]] = times[firsts]
+                self.ccd_hits += len(firsts)
+                
+        # Bodies that hit stop at the impact with the velocity of that sub-step
+        final = path[substeps, np.arange(count)]
+        struck = np.flatnonzero(hit_segment >= 0)
+        if len(struck):
+            segment = hit_segment[struck]
+            begin = path[segment, struck, :3]
+            final[struck, :3] = begin + (path[segment + 1, struck, :3] - begin) * hit_time[struck, None]
+            final[struck, 3:] = path[segment + 1, struck, 3:]
+            
+        for obj, (px, py, pz, vx, vy, vz) in zip(fast, final.tolist()):
+            obj.position = obj.position.set(px, py, pz)
+            obj.velocity = obj.velocity.set(vx, vy, vz)
+            obj.force = obj.force.set(0, 0, 0)
+        
+    def update_sleep(self, objects: List['PhysicsObject']):
+        """Count resting ticks and put islands of resting bodies to sleep.
+        
+        Awake bodies that touched this tick form an island, and an island
+        sleeps only once every body in it has rested for sleep_ticks ticks.
+        """
+        threshold_sq = self.sleep_velocity * self.sleep_velocity
+        awake = []
+        for obj in objects:
+            if obj.is_static or obj.sleeping:
+                continue
+            if obj.velocity.length_sq() < threshold_sq:
+                obj.rest_ticks += 1
+            else:
+                obj.rest_ticks = 0
+            awake.append(obj)
+            
+        # Union-find over this tick's contacts between awake bodies
+        parent = {obj.id: obj.id for obj in awake}
+        
+        def find(key):
+            while parent[key] != key:
+                parent[key] = parent[parent[key]]
+                key = parent[key]
+            return key
+            
+        for obj1, obj2 in self.contact_pairs():
+            id1 = obj1.id
+            id2 = obj2.id
+            if id1 in parent and id2 in parent:
+                root1 = find(id1)
+                root2 = find(id2)
+                if root1 != root2:
+                    parent[root1] = root2
+                    
+        islands = {}
+        for obj in awake:
+            islands.setdefault(find(obj.id), []).append(obj)
+            
+        sleep_ticks = self.sleep_ticks
+        for island in islands.values():
+            if all(obj.rest_ticks >= sleep_ticks for obj in island):
+                for obj in island:
+                    obj.fall_asleep(island)
+                    
+    def contact_pairs(self) -> List[Tuple['PhysicsObject', 'PhysicsObject']]:
+        """Pairs of objects that were in contact during the last update"""
+        if self.contact_rows is not None:
+            bodies = self.store.bodies
+            first, second = self.contact_rows
+            return [(bodies[a], bodies[b]) for a, b in zip(first.tolist(), second.tolist())]
+        return [(collision["obj1"], collision["obj2"]) for collision in self.collision_system.collision_pairs]
+        
+    def store_colliders(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Collider sizes and type codes for the store rows, rebuilt when rows change"""
+        store = self.store
+        if self._colliders is None or self._colliders[0] != store.generation:
+            self._colliders = (store.generation,) + collider_arrays(store.bodies)
+        return self._colliders[1], self._colliders[2]
+        
+    def resolve_contacts_store(self):
+        """Find and resolve contacts between stored bodies with the batched narrowphase.
+        
+        Candidate pairs come from binning every row into collision cells, the
+        kernels test them grouped by collider types, and apply_contacts
+        resolves all of them at once. Terrain is left to integrate_store.
+        """
+        store = self.store
+        n = store.count
+        self.collision_system.collision_pairs = []
+        empty = np.empty(0, dtype=np.intp)
+        self.contact_rows = (empty, empty)
+        if n < 2:
+            return
+            
+        sizes, kinds = self.store_colliders()
+        positions = store.positions[:n]
+        halves = half_extents(sizes, kinds) + CollisionSystem.BROADPHASE_MARGIN
+        grid = self.collision_system.grid
+        first, second = broadphase_pairs(positions - halves, positions + halves,
+                                         grid.cell_size if grid is not None else None)
+        
+        # Skip pairs where neither body is simulated
+        inactive = store.static[:n] | store.asleep[:n]
+        candidates = ~(inactive[first] & inactive[second])
+        first, second, normals, penetrations = narrowphase(
+            positions, sizes, kinds, first[candidates], second[candidates]
+        )
+        
+        # Contact with a simulated body wakes sleeping ones
+        touched = np.concatenate([first, second])
+        bodies = store.bodies
+        for row in np.unique(touched[store.asleep[touched]]).tolist():
+            if bodies[row].sleeping:
+                bodies[row].wake()
+                
+        inverse_masses = np.where(store.static[:n], 0.0, 1.0 / store.masses[:n])
+        apply_contacts(positions, store.velocities[:n], inverse_masses, first, second, normals, penetrations)
+        self.contact_rows = (first, second)
+        
+    def stats(self) -> Dict[str, Any]:
+        sleeping = [obj for obj in self.objects.values() if obj.sleeping]
+        stats = {
+            "bodies": len(self.objects),
+            "sleeping": len(sleeping),
+            "islands": len({id(obj.island) for obj in sleeping}),
+            "swept": self.ccd_bodies,
+            "swept_hits": self.ccd_hits
+        }
+        if self.regions is not None:
+            stats["regions"] = self.regions.stats()
+        return stats
+        
+    def shutdown(self):
+        """Stop the parallel physics workers"""
+        if self.regions is not None:
+            self.regions.shutdown()
         
+    def integrate_store(self, delta_time: float, skip: Optional[np.ndarray] = None):
+        """Apply physics to every body in the store with array operations.
+        
+        Performs the same steps, in the same floating point order, as
+        apply_physics does for a single object. Rows in skip are left
+        alone, forces included, for integrate_swept.
+        """
+        store = self.store
+        n = store.count
+        if n == 0:
+            return
+            
+        positions = store.positions[:n]
+        velocities = store.velocities[:n]
+        forces = store.forces[:n]
+        simulated = ~store.static[:n] & ~store.asleep[:n]
+        if skip is not None:
+            simulated[skip] = False
+        dynamic = np.flatnonzero(simulated)
+        
+        if len(dynamic):
+            masses = store.masses[dynamic]
+            
+            # Apply gravity
+            forces[dynamic, 1] += self.gravity * masses
+            
+            # Update velocity and position
+            velocities[dynamic] += (forces[dynamic] / masses[:, None]) * delta_time
+            positions[dynamic] += velocities[dynamic] * delta_time
+            
+            # Check terrain collision
+            if self.world_ref:
+                terrain_heights = self.world_ref.get_terrain_heights(
+                    positions[dynamic, 0], positions[dynamic, 2]
+                )
+                below = positions[dynamic, 1] < terrain_heights
+                grounded = dynamic[below]
+                
+                if len(grounded):
+                    positions[grounded, 1] = terrain_heights[below]
+                    # Bounce with dampening, then stop very small bounces
+                    velocities[grounded] *= (0.8, -0.5, 0.8)
+                    resting = grounded[np.abs(velocities[grounded, 1]) < 0.1]
+                    velocities[resting, 1] = 0.0
+                    
         # Reset forces for next frame
-        obj.force = Vector3(0, 0, 0)
+        if skip is None or not len(skip):
+            forces[:] = 0.0
+        else:
+            kept = forces[skip].copy()
+            forces[:] = 0.0
+            forces[skip] = kept
 
 class PhysicsObject:
     def __init__(self, obj_id: str, position: Vector3, velocity: Vector3, 
@@ -99,15 +509,33 @@ class PhysicsObject:
         self.is_static = is_static
         self.collider_type = collider_type
         self.collider_size = collider_size
+        self.sleeping = False
+        # Consecutive ticks spent under the engine's sleep velocity
+        self.rest_ticks = 0
+        # Bodies put to sleep together, shared by every member while asleep
+        self.island = None
         
     def apply_force(self, force: Vector3):
-        """Apply a force to the object"""
+        """Apply a force to the object, waking it if it is asleep"""
         if not self.is_static:
-            self.force = Vector3(
-                self.force.x + force.x,
-                self.force.y + force.y,
-                self.force.z + force.z
-            )
+            if self.sleeping:
+                self.wake()
+            self.force = self.force.iadd(force)
+            
+    def fall_asleep(self, island: List['PhysicsObject']):
+        """Stop simulating the object until it or a body in its island is woken"""
+        self.sleeping = True
+        self.island = island
+        self.velocity = self.velocity.set(0, 0, 0)
+        self.force = self.force.set(0, 0, 0)
+        
+    def wake(self):
+        """Wake the object and every body asleep in the same island"""
+        island = self.island if self.island is not None else [self]
+        for obj in island:
+            obj.sleeping = False
+            obj.rest_ticks = 0
+            obj.island = None
             
     def to_dict(self) -> Dict[str, Any]:
         """Convert physics object to dictionary"""
@@ -123,9 +551,145 @@ class PhysicsObject:
             }
         }
 
+class StoredPhysicsObject(PhysicsObject):
+    """PhysicsObject whose dynamic state is a row in a PhysicsBodyStore.
+    
+    position, velocity and force return fresh Vector3 copies of the row;
+    assign them back to write. After detach() the object keeps its last
+    state as plain attributes.
+    """
+    
+    def __init__(self, store: PhysicsBodyStore, **params):
+        self._store = store
+        self._slot = store.allocate(self)
+        super().__init__(**params)
+        
+    def detach(self):
+        """Release the store row and keep a local copy of its state"""
+        if self._store is None:
+            return
+        state = (self.position, self.velocity, self.force, self.mass, self.is_static, self.sleeping)
+        self._store.release(self._slot)
+        self._store = None
+        self._slot = None
+        self.__dict__.update(zip(("_position", "_velocity", "_force", "_mass", "_is_static", "_sleeping"), state))
+        
+    def _read(self, array) -> Vector3:
+        x, y, z = array[self._slot].tolist()
+        return Vector3(x, y, z)
+        
+    @property
+    def position(self) -> Vector3:
+        if self._store is None:
+            return self._position
+        return self._read(self._store.positions)
+        
+    @position.setter
+    def position(self, value: Vector3):
+        if self._store is None:
+            self._position = value
+        else:
+            self._store.positions[self._slot] = (value.x, value.y, value.z)
+            
+    @property
+    def velocity(self) -> Vector3:
+        if self._store is None:
+            return self._velocity
+        return self._read(self._store.velocities)
+        
+    @velocity.setter
+    def velocity(self, value: Vector3):
+        if self._store is None:
+            self._velocity = value
+        else:
+            self._store.velocities[self._slot] = (value.x, value.y, value.z)
+            
+    @property
+    def force(self) -> Vector3:
+        if self._store is None:
+            return self._force
+        return self._read(self._store.forces)
+        
+    @force.setter
+    def force(self, value: Vector3):
+        if self._store is None:
+            self._force = value
+        else:
+            self._store.forces[self._slot] = (value.x, value.y, value.z)
+            
+    @property
+    def mass(self) -> float:
+        if self._store is None:
+            return self._mass
+        return float(self._store.masses[self._slot])
+        
+    @mass.setter
+    def mass(self, value: float):
+        if self._store is None:
+            self._mass = value
+        else:
+            self._store.masses[self._slot] = value
+            
+    @property
+    def is_static(self) -> bool:
+        if self._store is None:
+            return self._is_static
+        return bool(self._store.static[self._slot])
+        
+    @is_static.setter
+    def is_static(self, value: bool):
+        if self._store is None:
+            self._is_static = value
+        else:
+            self._store.static[self._slot] = value
+            
+    @property
+    def sleeping(self) -> bool:
+        if self._store is None:
+            return self._sleeping
+        return bool(self._store.asleep[self._slot])
+        
+    @sleeping.setter
+    def sleeping(self, value: bool):
+        if self._store is None:
+            self._sleeping = value
+        else:
+            self._store.asleep[self._slot] = value
+
 class CollisionSystem:
-    def __init__(self):
+    # Slack added to broadphase bounds so rounding never drops a touching pair
+    BROADPHASE_MARGIN = 1e-6
+    
+    def __init__(self, cell_size: Optional[float] = 4.0):
         self.collision_pairs = []
+        # Broadphase grid; a cell_size of None selects the brute-force O(n^2) path
+        self.grid = SpatialHashGrid(cell_size) if cell_size else None
+        
+    def remove_object(self, obj_id: str):
+        """Drop an object from the broadphase"""
+        if self.grid is not None:
+            self.grid.remove(obj_id)
+            
+    def update_broadphase(self, obj: PhysicsObject):
+        """Move an object's bounds in the broadphase grid"""
+        size = obj.collider_size
+        position = obj.position
+        margin = self.BROADPHASE_MARGIN
+        
+        if obj.collider_type == "sphere":
+            half_x = half_y = half_z = size.x/2
+        else:
+            half_x, half_y, half_z = size.x/2, size.y/2, size.z/2
+            
+        self.grid.update(
+            obj.id,
+            position.x - half_x - margin,
+            position.y - half_y - margin,
+            position.z - half_z - margin,
+            position.x + half_x + margin,
+            position.y + half_y + margin,
+            position.z + half_z + margin
+        )
         
     def check_collision(self, obj1: PhysicsObject, obj2: PhysicsObject) -> Optional[Dict[str, Any]]:
         """Check if two objects are colliding"""
@@ -150,52 +714,47 @@ class CollisionSystem:
         # Box half-sizes
         size1 = box1.collider_size
         size2 = box2.collider_size
+        position1 = box1.position
+        position2 = box2.position
         
-        min1 = Vector3(
-            box1.position.x - size1.x/2,
-            box1.position.y - size1.y/2,
-            box1.position.z - size1.z/2
-        )
-        max1 = Vector3(
-            box1.position.x + size1.x/2,
-            box1.position.y + size1.y/2,
-            box1.position.z + size1.z/2
-        )
+        # Bounds as plain floats, no temporary vectors per pair
+        min1_x = position1.x - size1.x/2
+        min1_y = position1.y - size1.y/2
+        min1_z = position1.z - size1.z/2
+        max1_x = position1.x + size1.x/2
+        max1_y = position1.y + size1.y/2
+        max1_z = position1.z + size1.z/2
         
-        min2 = Vector3(
-            box2.position.x - size2.x/2,
-            box2.position.y - size2.y/2,
-            box2.position.z - size2.z/2
-        )
-        max2 = Vector3(
-            box2.position.x + size2.x/2,
-            box2.position.y + size2.y/2,
-            box2.position.z + size2.z/2
-        )
+        min2_x = position2.x - size2.x/2
+        min2_y = position2.y - size2.y/2
+        min2_z = position2.z - size2.z/2
+        max2_x = position2.x + size2.x/2
+        max2_y = position2.y + size2.y/2
+        max2_z = position2.z + size2.z/2
         
         # Check for overlap in all axes
-        if (max1.x < min2.x or min1.x > max2.x or
-            max1.y < min2.y or min1.y > max2.y or
-            max1.z < min2.z or min1.z > max2.z):
+        if (max1_x < min2_x or min1_x > max2_x or
+            max1_y < min2_y or min1_y > max2_y or
+            max1_z < min2_z or min1_z > max2_z):
             return None  # No collision
             
         # Find the overlap depths in each axis
-        overlap_x = min(max1.x - min2.x, max2.x - min1.x)
-        overlap_y = min(max1.y - min2.y, max2.y - min1.y)
-        overlap_z = min(max1.z - min2.z, max2.z - min1.z)
+        overlap_x = min(max1_x - min2_x, max2_x - min1_x)
+        overlap_y = min(max1_y - min2_y, max2_y - min1_y)
+        overlap_z = min(max1_z - min2_z, max2_z - min1_z)
         
         # Find the axis with the smallest overlap
         if overlap_x <= overlap_y and overlap_x <= overlap_z:
             # X-axis has smallest overlap
-            normal = Vector3(1, 0, 0) if box1.position.x < box2.position.x else Vector3(-1, 0, 0)
+            normal = Vector3(1, 0, 0) if position1.x < position2.x else Vector3(-1, 0, 0)
             penetration = overlap_x
         elif overlap_y <= overlap_x and overlap_y <= overlap_z:
             # Y-axis has smallest overlap
-            normal = Vector3(0, 1, 0) if box1.position.y < box2.position.y else Vector3(0, -1, 0)
+            normal = Vector3(0, 1, 0) if position1.y < position2.y else Vector3(0, -1, 0)
             penetration = overlap_y
         else:
             # Z-axis has smallest overlap
-            normal = Vector3(0, 0, 1) if box1.position.z < box2.position.z else Vector3(0, 0, -1)
+            normal = Vector3(0, 0, 1) if position1.z < position2.z else Vector3(0, 0, -1)
             penetration = overlap_z
             
         return {
@@ -245,28 +804,25 @@ class CollisionSystem:
         """Check collision between a box and a sphere"""
         # Get the closest point on the box to the sphere center
         box_half_size = box.collider_size
-        box_min = Vector3(
-            box.position.x - box_half_size.x/2,
-            box.position.y - box_half_size.y/2,
-            box.position.z - box_half_size.z/2
-        )
-        box_max = Vector3(
-            box.position.x + box_half_size.x/2,
-            box.position.y + box_half_size.y/2,
-            box.position.z + box_half_size.z/2
-        )
+        box_position = box.position
+        center = sphere.position
+        min_x = box_position.x - box_half_size.x/2
+        min_y = box_position.y - box_half_size.y/2
+        min_z = box_position.z - box_half_size.z/2
+        max_x = box_position.x + box_half_size.x/2
+        max_y = box_position.y + box_half_size.y/2
+        max_z = box_position.z + box_half_size.z/2
         
         # Find the closest point on the box to the sphere
-        closest_x = max(box_min.x, min(sphere.position.x, box_max.x))
-        closest_y = max(box_min.y, min(sphere.position.y, box_max.y))
-        closest_z = max(box_min.z, min(sphere.position.z, box_max.z))
+        closest_x = max(min_x, min(center.x, max_x))
+        closest_y = max(min_y, min(center.y, max_y))
+        closest_z = max(min_z, min(center.z, max_z))
         
-        closest_point = Vector3(closest_x, closest_y, closest_z)
-        
-        # Calculate distance from closest point to sphere center
-        dx = closest_point.x - sphere.position.x
-        dy = closest_point.y - sphere.position.y
-        dz = closest_point.z - sphere.position.z
+        # Calculate distance from closest point to sphere center, pointing
+        # from the box to the sphere like every other normal
+        dx = center.x - closest_x
+        dy = center.y - closest_y
+        dz = center.z - closest_z
         
         distance_squared = dx*dx + dy*dy + dz*dz
         
@@ -284,12 +840,12 @@ class CollisionSystem:
         if distance == 0:
             # Find the closest face
             face_distances = [
-                abs(sphere.position.x - box_min.x),
-                abs(sphere.position.x - box_max.x),
-                abs(sphere.position.y - box_min.y),
-                abs(sphere.position.y - box_max.y),
-                abs(sphere.position.z - box_min.z),
-                abs(sphere.position.z - box_max.z)
+                abs(center.x - min_x),
+                abs(center.x - max_x),
+                abs(center.y - min_y),
+                abs(center.y - max_y),
+                abs(center.z - min_z),
+                abs(center.z - max_z)
             ]
             
             min_idx = face_distances.index(min(face_distances))
@@ -325,32 +881,151 @@ class CollisionSystem:
         # Reset collision pairs
         self.collision_pairs = []
         
-        # Check for collisions between all objects
+        if self.grid is None:
+            self.resolve_collisions_brute_force(objects, world_ref)
+            return
+            
+        grid = self.grid
+        for obj in objects:
+            if not obj.sleeping:
+                self.update_broadphase(obj)
+            
+        terrain = self.sample_terrain(objects, world_ref)
+        index_of = {obj.id: i for i, obj in enumerate(objects)}
+        if len(grid) != len(index_of):
+            for stale_id in [key for key in grid.keys() if key not in index_of]:
+                grid.remove(stale_id)
+                
+        # Visit candidate pairs in the same (i, j) order as the brute-force loop.
+        # Every move is pushed to the grid, and when a resolution moves obj1 its
+        # neighbours are re-queried, so the pairs tested and the order they are
+        # resolved in match the O(n^2) path exactly.
+        # A body still asleep at its turn can only collide with a simulated body
+        # at a later index, so it gets a turn only once such a body has touched
+        # its cells: at the start, or after moving or waking during the pass.
+        sleeper_turns = set()
+        if any(obj.sleeping for obj in objects):
+            for obj in objects:
+                if not obj.sleeping and not obj.is_static:
+                    self.mark_sleeping_neighbours(obj, objects, index_of, -1, sleeper_turns)
+                    
+        for i, obj1 in enumerate(objects):
+            if obj1.sleeping and i not in sleeper_turns:
+                continue
+                
+            if terrain[i] is not None:
+                if self.clamp_to_terrain(obj1, world_ref, terrain[i]):
+                    self.update_broadphase(obj1)
+                    
+            pending = [k for k in (index_of[key] for key in grid.query_key(obj1.id)) if k > i]
+            heapq.heapify(pending)
+            queued = set(pending)
+            
+            while pending:
+                j = heapq.heappop(pending)
+                obj2 = objects[j]
+                
+                # Skip if neither object is simulated
+                if (obj1.is_static or obj1.sleeping) and (obj2.is_static or obj2.sleeping):
+                    continue
+                    
+                collision = self.check_collision(obj1, obj2)
+                if collision:
+                    woken = []
+                    for obj in (obj1, obj2):
+                        if obj.sleeping:
+                            woken.extend(obj.island if obj.island is not None else [obj])
+                            obj.wake()
+                    self.collision_pairs.append(collision)
+                    self.resolve_collision(collision)
+                    self.update_broadphase(obj1)
+                    self.update_broadphase(obj2)
+                    
+                    for obj in [obj1, obj2] + woken:
+                        self.mark_sleeping_neighbours(obj, objects, index_of, i, sleeper_turns)
+                        
+                    for key in grid.query_key(obj1.id):
+                        k = index_of[key]
+                        if k > j and k not in queued:
+                            queued.add(k)
+                            heapq.heappush(pending, k)
+                            
+    def mark_sleeping_neighbours(self, obj: PhysicsObject, objects: List[PhysicsObject],
+                                 index_of: Dict[str, int], after: int, turns: set):
+        """Give the sleeping bodies near a simulated one, past index after, a turn"""
+        if obj.is_static:
+            return
+        for key in self.grid.query_key(obj.id):
+            k = index_of[key]
+            if k > after and objects[k].sleeping:
+                turns.add(k)
+                
+    def resolve_collisions_brute_force(self, objects: List[PhysicsObject], world_ref=None):
+        """Detect and resolve collisions by testing every pair of objects"""
+        terrain = self.sample_terrain(objects, world_ref)
+        
         for i, obj1 in enumerate(objects):
             # Check terrain collision if world reference exists
-            if world_ref and not obj1.is_static:
-                terrain_height = world_ref.get_terrain_height(obj1.position.x, obj1.position.z)
-                if obj1.position.y < terrain_height:
-                    obj1.position = Vector3(obj1.position.x, terrain_height, obj1.position.z)
-                    # Bounce with some dampening
-                    obj1.velocity = Vector3(
-                        obj1.velocity.x * 0.8,
-                        -obj1.velocity.y * 0.5,
-                        obj1.velocity.z * 0.8
-                    )
+            if terrain[i] is not None and not obj1.sleeping:
+                self.clamp_to_terrain(obj1, world_ref, terrain[i])
             
             # Check object-object collisions
             for j in range(i + 1, len(objects)):
                 obj2 = objects[j]
                 
-                # Skip if both objects are static
-                if obj1.is_static and obj2.is_static:
+                # Skip if neither object is simulated
+                if (obj1.is_static or obj1.sleeping) and (obj2.is_static or obj2.sleeping):
                     continue
                     
                 collision = self.check_collision(obj1, obj2)
                 if collision:
+                    for obj in (obj1, obj2):
+                        if obj.sleeping:
+                            obj.wake()
                     self.collision_pairs.append(collision)
                     self.resolve_collision(collision)
+                    
+    def sample_terrain(self, objects: List[PhysicsObject], world_ref) -> List[Optional[Tuple[float, float, float]]]:
+        """Batch-sample terrain under every dynamic object as (x, z, height)"""
+        samples = [None] * len(objects)
+        if not world_ref:
+            return samples
+            
+        dynamic = [i for i, obj in enumerate(objects) if not obj.is_static and not obj.sleeping]
+        if not dynamic:
+            return samples
+            
+        xs = [objects[i].position.x for i in dynamic]
+        zs = [objects[i].position.z for i in dynamic]
+        heights = world_ref.get_terrain_heights(xs, zs).tolist()
+        
+        for i, x, z, height in zip(dynamic, xs, zs, heights):
+            samples[i] = (x, z, height)
+        return samples
+        
+    def clamp_to_terrain(self, obj: PhysicsObject, world_ref,
+                         sample: Optional[Tuple[float, float, float]] = None) -> bool:
+        """Push an object above the terrain, returns True if it was moved.
+        
+        A pre-fetched (x, z, height) sample is used while the object has not
+        moved horizontally since it was taken.
+        """
+        position = obj.position
+        if sample is not None and sample[0] == position.x and sample[1] == position.z:
+            terrain_height = sample[2]
+        else:
+            terrain_height = world_ref.get_terrain_height(position.x, position.z)
+        if position.y < terrain_height:
+            position.y = terrain_height
+            obj.position = position
+            # Bounce with some dampening
+            velocity = obj.velocity
+            velocity.x *= 0.8
+            velocity.y = -velocity.y * 0.5
+            velocity.z *= 0.8
+            obj.velocity = velocity
+            return True
+        return False
     
     def resolve_collision(self, collision: Dict[str, Any]):
         """Resolve a collision between two objects"""
@@ -363,10 +1038,14 @@ class CollisionSystem:
         if obj1.is_static and obj2.is_static:
             return
             
+        # Velocities are updated in place and assigned back once
+        velocity1 = obj1.velocity
+        velocity2 = obj2.velocity
+        
         # Calculate relative velocity
-        relative_vel_x = obj2.velocity.x - obj1.velocity.x
-        relative_vel_y = obj2.velocity.y - obj1.velocity.y
-        relative_vel_z = obj2.velocity.z - obj1.velocity.z
+        relative_vel_x = velocity2.x - velocity1.x
+        relative_vel_y = velocity2.y - velocity1.y
+        relative_vel_z = velocity2.z - velocity1.z
         
         # Calculate relative velocity in terms of the normal direction
         velocity_along_normal = (
@@ -396,34 +1075,30 @@ class CollisionSystem:
             
             # Apply impulse to velocities
             if not obj1.is_static:
-                obj1.velocity = Vector3(
-                    obj1.velocity.x - impulse_x / obj1.mass,
-                    obj1.velocity.y - impulse_y / obj1.mass,
-                    obj1.velocity.z - impulse_z / obj1.mass
-                )
+                velocity1.x -= impulse_x / obj1.mass
+                velocity1.y -= impulse_y / obj1.mass
+                velocity1.z -= impulse_z / obj1.mass
+                obj1.velocity = velocity1
                 
             if not obj2.is_static:
-                obj2.velocity = Vector3(
-                    obj2.velocity.x + impulse_x / obj2.mass,
-                    obj2.velocity.y + impulse_y / obj2.mass,
-                    obj2.velocity.z + impulse_z / obj2.mass
-                )
+                velocity2.x += impulse_x / obj2.mass
+                velocity2.y += impulse_y / obj2.mass
+                velocity2.z += impulse_z / obj2.mass
+                obj2.velocity = velocity2
         else:
             # One object is static
             if obj1.is_static:
                 j /= 1 / obj2.mass
-                obj2.velocity = Vector3(
-                    obj2.velocity.x + j * normal.x / obj2.mass,
-                    obj2.velocity.y + j * normal.y / obj2.mass,
-                    obj2.velocity.z + j * normal.z / obj2.mass
-                )
+                velocity2.x += j * normal.x / obj2.mass
+                velocity2.y += j * normal.y / obj2.mass
+                velocity2.z += j * normal.z / obj2.mass
+                obj2.velocity = velocity2
             else:
                 j /= 1 / obj1.mass
-                obj1.velocity = Vector3(
-                    obj1.velocity.x - j * normal.x / obj1.mass,
-                    obj1.velocity.y - j * normal.y / obj1.mass,
-                    obj1.velocity.z - j * normal.z / obj1.mass
-                )
+                velocity1.x -= j * normal.x / obj1.mass
+                velocity1.y -= j * normal.y / obj1.mass
+                velocity1.z -= j * normal.z / obj1.mass
+                obj1.velocity = velocity1
                 
         # Positional correction to prevent sinking/jitter
         correction_percent = 0.2  # Penetration percentage to correct
@@ -439,28 +1114,28 @@ class CollisionSystem:
                 correction2 = correction * (1 / obj2.mass) / total_inverse_mass
                 
                 # Apply position correction
-                obj1.position = Vector3(
-                    obj1.position.x - normal.x * correction1,
-                    obj1.position.y - normal.y * correction1,
-                    obj1.position.z - normal.z * correction1
-                )
+                position1 = obj1.position
+                position1.x -= normal.x * correction1
+                position1.y -= normal.y * correction1
+                position1.z -= normal.z * correction1
+                obj1.position = position1
                 
-                obj2.position = Vector3(
-                    obj2.position.x + normal.x * correction2,
-                    obj2.position.y + normal.y * correction2,
-                    obj2.position.z + normal.z * correction2
-                )
+                position2 = obj2.position
+                position2.x += normal.x * correction2
+                position2.y += normal.y * correction2
+                position2.z += normal.z * correction2
+                obj2.position = position2
             else:
                 # Only one object moves
                 if not obj1.is_static:
-                    obj1.position = Vector3(
-                        obj1.position.x - normal.x * correction,
-                        obj1.position.y - normal.y * correction,
-                        obj1.position.z - normal.z * correction
-                    )
+                    position1 = obj1.position
+                    position1.x -= normal.x * correction
+                    position1.y -= normal.y * correction
+                    position1.z -= normal.z * correction
+                    obj1.position = position1
                 else:
-                    obj2.position = Vector3(
-                        obj2.position.x + normal.x * correction,
-                        obj2.position.y + normal.y * correction,
-                        obj2.position.z + normal.z * correction
-                    ) 
\ No newline at end of file
+                    position2 = obj2.position
+                    position2.x += normal.x * correction
+                    position2.y += normal.y * correction
+                    position2.z += normal.z * correction
+                    obj2.position = position2 
\ No newline at end of file
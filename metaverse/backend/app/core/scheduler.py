@@ -0,0 +1,126 @@
+import asyncio
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+import inspect
+import logging
+import time
+import numpy as np
+
+logger = logging.getLogger("metaverse.scheduler")
+
+PhaseCallback = Callable[[float], Optional[Awaitable[Any]]]
+
+class PhaseTimings:
+    """Rolling window of durations for one tick phase"""
+
+    def __init__(self, window: int = 1000):
+        self.samples: Deque[float] = deque(maxlen=window)
+        self.count = 0
+        self.max = 0.0
+
+    def record(self, duration: float):
+        self.samples.append(duration)
+        self.count += 1
+        if duration > self.max:
+            self.max = duration
+
+    def stats(self) -> Dict[str, float]:
+        """Durations in milliseconds; p50/p99 over the window, max since start"""
+        if not self.samples:
+            return {"count": 0, "p50": 0.0, "p99": 0.0, "max": 0.0}
+
+        p50, p99 = np.percentile(np.fromiter(self.samples, dtype=np.float64), [50, 99])
+        return {
+            "count": self.count,
+            "p50": p50 * 1000.0,
+            "p99": p99 * 1000.0,
+            "max": self.max * 1000.0
+        }
+
+class FixedTimestepScheduler:
+    """Runs named phases at a fixed tick rate.
+
+    Wall-clock time goes into an accumulator and every full dt of it runs one
+    tick, so the simulation rate doesn't drift with load. After a stall at most
+    max_catch_up ticks run back to back and the rest of the backlog is
+    skipped. Every phase and every whole tick is timed.
+    """
+
+    def __init__(self, tick_rate: float = 20.0, max_catch_up: int = 5, window: int = 1000):
+        self.dt = 1.0 / tick_rate
+        self.max_catch_up = max_catch_up
+        self.phases: List[Tuple[str, PhaseCallback]] = []
+        self.phase_timings: Dict[str, PhaseTimings] = {}
+        self.tick_timings = PhaseTimings(window)
+        self.window = window
+        self.ticks = 0
+        self.overruns = 0
+        self.skipped_ticks = 0
+        self.running = False
+
+    def add_phase(self, name: str, callback: PhaseCallback):
+        """Add a phase; callback(dt) may return an awaitable"""
+        self.phases.append((name, callback))
+        self.phase_timings[name] = PhaseTimings(self.window)
+
+    async def tick(self) -> float:
+        """Run every phase once and return the tick's duration"""
+        dt = self.dt
+        clock = time.perf_counter
+        tick_start = clock()
+
+        for name, callback in self.phases:
+            phase_start = clock()
+            try:
+                result = callback(dt)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                logger.error(f"Error in {name} phase: {e}")
+            self.phase_timings[name].record(clock() - phase_start)
+
+        duration = clock() - tick_start
+        self.tick_timings.record(duration)
+        self.ticks += 1
+        if duration > dt:
+            self.overruns += 1
+        return duration
+
+    async def run(self):
+        dt = self.dt
+        clock = time.perf_counter
+        self.running = True
+        accumulator = dt  # Run the first tick straight away
+        previous = clock()
+
+        while self.running:
+            steps = 0
+            while accumulator >= dt and steps < self.max_catch_up and self.running:
+                await self.tick()
+                accumulator -= dt
+                steps += 1
+
+            if accumulator >= dt:
+                # Too far behind: drop the backlog instead of spiralling
+                skipped = int(accumulator // dt)
+                self.skipped_ticks += skipped
+                accumulator -= skipped * dt
+
+            await asyncio.sleep(max(0.0, dt - accumulator))
+            now = clock()
+            accumulator += now - previous
+            previous = now
+
+    def stop(self):
+        self.running = False
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "tick_rate": 1.0 / self.dt,
+            "budget_ms": self.dt * 1000.0,
+            "ticks": self.ticks,
+            "overruns": self.overruns,
+            "skipped_ticks": self.skipped_ticks,
+            "tick": self.tick_timings.stats(),
+            "phases": {name: timings.stats() for name, timings in self.phase_timings.items()}
+        }
@@ -0,0 +1,31 @@
+from typing import Any
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+import json
+import numpy as np
+
+if orjson is not None:
+    # numpy arrays and scalars, and dicts keyed by numbers, appear in game state
+    ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+def _default(value: Any) -> Any:
+    """Convert values neither serializer handles natively, such as numpy scalars"""
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+def dumps(data: Any) -> str:
+    """Serialize a message for a websocket text frame.
+
+    Uses orjson when it is installed and falls back to the stdlib with the
+    same compact output Starlette's send_json produces.
+    """
+    if orjson is not None:
+        return orjson.dumps(data, default=_default, option=ORJSON_OPTIONS).decode("utf-8")
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False, default=_default)
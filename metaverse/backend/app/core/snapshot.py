@@ -0,0 +1,84 @@
+from typing import Any, Dict, List, Optional
+
+# Entity groups carried in a world_update, as (keyframe field, delta field)
+SNAPSHOT_GROUPS = (("nearby_users", "users"), ("nearby_npcs", "npcs"))
+
+class SnapshotTracker:
+    """Turns one client's world_update states into keyframes and deltas.
+
+    A keyframe carries every nearby entity in full, in the original
+    world_update layout. A delta carries, per group, only the fields that
+    changed since the previous update (new entities in full) and the ids
+    that dropped out of range. Every update has a sequence number and every
+    delta names the update it applies to as "base"; a client that sees a gap
+    asks for a keyframe with a "resync" message.
+    """
+
+    def __init__(self, keyframe_interval: int = 100):
+        self.keyframe_interval = keyframe_interval
+        self.seq = 0
+        self.ticks_since_keyframe = 0
+        self.keyframe_pending = True
+        # Delivery losses seen on the connection when the last update was built
+        self.losses = 0
+        # Last state sent per group, keyed by entity id
+        self.baseline: Dict[str, Dict[str, Dict[str, Any]]] = {group: {} for _, group in SNAPSHOT_GROUPS}
+
+    def request_keyframe(self):
+        self.keyframe_pending = True
+
+    def build(self, update: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Build the message for a full world_update, or None if nothing changed"""
+        if self.keyframe_pending or self.ticks_since_keyframe >= self.keyframe_interval:
+            return self._keyframe(update)
+
+        message = {
+            "type": "world_update",
+            "seq": self.seq + 1,
+            "base": self.seq,
+            "keyframe": False,
+            "timestamp": update["timestamp"]
+        }
+        changed_any = False
+        for full_field, group in SNAPSHOT_GROUPS:
+            changed, removed = self._diff(group, update[full_field])
+            message[group] = {"changed": changed, "removed": removed}
+            changed_any = changed_any or bool(changed or removed)
+
+        self.ticks_since_keyframe += 1
+        if not changed_any:
+            return None
+
+        self.seq += 1
+        return message
+
+    def _keyframe(self, update: Dict[str, Any]) -> Dict[str, Any]:
+        for full_field, group in SNAPSHOT_GROUPS:
+            self.baseline[group] = {state["id"]: state for state in update[full_field]}
+
+        self.seq += 1
+        self.ticks_since_keyframe = 0
+        self.keyframe_pending = False
+        return dict(update, seq=self.seq, keyframe=True)
+
+    def _diff(self, group: str, states: List[Dict[str, Any]]):
+        previous = self.baseline[group]
+        current = {}
+        changed = []
+
+        for state in states:
+            entity_id = state["id"]
+            current[entity_id] = state
+            old = previous.get(entity_id)
+            if old is None:
+                changed.append(state)
+                continue
+
+            fields = {key: value for key, value in state.items() if old.get(key) != value}
+            if fields:
+                fields["id"] = entity_id
+                changed.append(fields)
+
+        removed = [entity_id for entity_id in previous if entity_id not in current]
+        self.baseline[group] = current
+        return changed, removed
@@ -0,0 +1,189 @@
+import math
+from typing import Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+Cell = Tuple[int, int, int]
+CellRange = Tuple[int, int, int, int, int, int]
+
+class SpatialHashGrid:
+    """Uniform grid that buckets axis-aligned boxes by the cells they overlap.
+
+    Entries are keyed by any hashable id and can be moved incrementally: an
+    update only touches the buckets when the cell range of the entry changes.
+    Entries spanning more than max_cells_per_entry cells are kept in a separate
+    oversized set that every query returns, so huge colliders stay cheap.
+    cell_height sets a separate vertical cell size (defaults to cell_size),
+    which lets mostly-planar indexes use tall cells. After track_updates()
+    the grid also collects the keys updated or removed since the last
+    take_updated() call.
+    """
+
+    def __init__(self, cell_size: float = 4.0, max_cells_per_entry: int = 512,
+                 cell_height: Optional[float] = None):
+        if cell_size <= 0 or (cell_height is not None and cell_height <= 0):
+            raise ValueError("cell sizes must be positive")
+        self.cell_size = float(cell_size)
+        self.cell_height = float(cell_height) if cell_height is not None else self.cell_size
+        self.max_cells_per_entry = max_cells_per_entry
+        self.cells: Dict[Cell, Set[Hashable]] = {}
+        self.oversized: Set[Hashable] = set()
+        self._ranges: Dict[Hashable, CellRange] = {}
+        self._bounds: Dict[Hashable, Tuple[float, float, float, float, float, float]] = {}
+        self._updated: Optional[Set[Hashable]] = None
+
+    def __len__(self) -> int:
+        return len(self._ranges)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._ranges
+
+    def keys(self) -> Iterable[Hashable]:
+        return self._ranges.keys()
+
+    def track_updates(self):
+        """Start collecting updated and removed keys for take_updated(), starting with every key"""
+        if self._updated is None:
+            self._updated = set(self._ranges)
+
+    def take_updated(self) -> Set[Hashable]:
+        """Get the keys updated or removed since the last call, and start over"""
+        updated = self._updated
+        if updated is None:
+            return set()
+        self._updated = set()
+        return updated
+
+    def cell_range(self, min_x: float, min_y: float, min_z: float,
+                   max_x: float, max_y: float, max_z: float) -> CellRange:
+        """Get the inclusive range of cells covered by a box"""
+        size = self.cell_size
+        height = self.cell_height
+        return (
+            math.floor(min_x / size), math.floor(min_y / height), math.floor(min_z / size),
+            math.floor(max_x / size), math.floor(max_y / height), math.floor(max_z / size)
+        )
+
+    def update(self, key: Hashable, min_x: float, min_y: float, min_z: float,
+               max_x: float, max_y: float, max_z: float):
+        """Insert an entry or move it to new bounds"""
+        self._bounds[key] = (min_x, min_y, min_z, max_x, max_y, max_z)
+        if self._updated is not None:
+            self._updated.add(key)
+        new_range = self.cell_range(min_x, min_y, min_z, max_x, max_y, max_z)
+        old_range = self._ranges.get(key)
+
+        if old_range == new_range:
+            return
+
+        if old_range is not None:
+            self._unlink(key, old_range)
+
+        self._ranges[key] = new_range
+        if self._range_volume(new_range) > self.max_cells_per_entry:
+            self.oversized.add(key)
+            return
+
+        cells = self.cells
+        for cell in self._iter_cells(new_range):
+            bucket = cells.get(cell)
+            if bucket is None:
+                cells[cell] = {key}
+            else:
+                bucket.add(key)
+
+    def update_point(self, key: Hashable, x: float, y: float, z: float):
+        """Insert or move a point entry"""
+        self.update(key, x, y, z, x, y, z)
+
+    def remove(self, key: Hashable):
+        """Remove an entry from the grid"""
+        old_range = self._ranges.pop(key, None)
+        self._bounds.pop(key, None)
+        if self._updated is not None:
+            self._updated.add(key)
+        if old_range is not None:
+            self._unlink(key, old_range)
+
+    def clear(self):
+        if self._updated is not None:
+            self._updated.update(self._ranges)
+        self.cells.clear()
+        self.oversized.clear()
+        self._ranges.clear()
+        self._bounds.clear()
+
+    def get_bounds(self, key: Hashable) -> Tuple[float, float, float, float, float, float]:
+        return self._bounds[key]
+
+    def query_range(self, cell_range: CellRange) -> Set[Hashable]:
+        """Get all entries stored in the given range of cells"""
+        found = set(self.oversized)
+        cells = self.cells
+
+        if self._range_volume(cell_range) > len(cells):
+            # Cheaper to walk the occupied cells than the requested range
+            x0, y0, z0, x1, y1, z1 = cell_range
+            for (x, y, z), bucket in cells.items():
+                if x0 <= x <= x1 and y0 <= y <= y1 and z0 <= z <= z1:
+                    found.update(bucket)
+            return found
+
+        for cell in self._iter_cells(cell_range):
+            bucket = cells.get(cell)
+            if bucket:
+                found.update(bucket)
+        return found
+
+    def query_key(self, key: Hashable) -> Set[Hashable]:
+        """Get the entries sharing at least one cell with an existing entry"""
+        found = self.query_range(self._ranges[key])
+        found.discard(key)
+        return found
+
+    def query_aabb(self, min_x: float, min_y: float, min_z: float,
+                   max_x: float, max_y: float, max_z: float) -> Set[Hashable]:
+        """Get the entries sharing at least one cell with a box"""
+        return self.query_range(self.cell_range(min_x, min_y, min_z, max_x, max_y, max_z))
+
+    def query_radius(self, x: float, y: float, z: float, radius: float) -> List[Hashable]:
+        """Get the point entries within radius of a position"""
+        candidates = self.query_aabb(x - radius, y - radius, z - radius,
+                                     x + radius, y + radius, z + radius)
+        radius_squared = radius * radius
+        bounds = self._bounds
+        in_range = []
+
+        for key in candidates:
+            px, py, pz = bounds[key][:3]
+            dx = px - x
+            dy = py - y
+            dz = pz - z
+            if dx*dx + dy*dy + dz*dz <= radius_squared:
+                in_range.append(key)
+
+        return in_range
+
+    def _unlink(self, key: Hashable, cell_range: CellRange):
+        if key in self.oversized:
+            self.oversized.discard(key)
+            return
+
+        cells = self.cells
+        for cell in self._iter_cells(cell_range):
+            bucket = cells.get(cell)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del cells[cell]
+
+    @staticmethod
+    def _range_volume(cell_range: CellRange) -> int:
+        x0, y0, z0, x1, y1, z1 = cell_range
+        return (x1 - x0 + 1) * (y1 - y0 + 1) * (z1 - z0 + 1)
+
+    @staticmethod
+    def _iter_cells(cell_range: CellRange):
+        x0, y0, z0, x1, y1, z1 = cell_range
+        for x in range(x0, x1 + 1):
+            for y in range(y0, y1 + 1):
+                for z in range(z0, z1 + 1):
+                    yield (x, y, z)
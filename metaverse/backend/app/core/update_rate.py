@@ -0,0 +1,84 @@
+from typing import Dict, Hashable, Set, Tuple
+
+from .spatial_hash import SpatialHashGrid
+
+class UpdateRateController:
+    """Chooses how often each client gets a world_update.
+
+    Entities in the spatial index count as moving while their speed since
+    they were last observed is above moving_speed, and for idle_timeout
+    seconds after that; only entries updated in the index since the
+    previous network tick are looked at. A client that is moving itself,
+    or has a moving entity within near_radius, is updated at the full
+    network rate; every other client at idle_rate.
+    """
+
+    def __init__(self, spatial_index: SpatialHashGrid, full_rate: float = 20.0, idle_rate: float = 5.0,
+                 near_radius: float = 20.0, moving_speed: float = 0.5, idle_timeout: float = 0.5):
+        self.spatial_index = spatial_index
+        self.full_interval = 1.0 / full_rate
+        self.idle_interval = 1.0 / idle_rate
+        self.near_radius = near_radius
+        self.moving_speed = moving_speed
+        self.idle_timeout = idle_timeout
+        self.moving: Set[Hashable] = set()
+        self.intervals: Dict[str, float] = {}
+        self._next_update: Dict[str, float] = {}
+        # Position and time each entity was last observed at
+        self._positions: Dict[Hashable, Tuple[float, float, float, float]] = {}
+        self._moved_at: Dict[Hashable, float] = {}
+        spatial_index.track_updates()
+
+    def observe(self, now: float):
+        """Compare the entities updated since the previous network tick with where they were"""
+        index = self.spatial_index
+        positions = self._positions
+        moved_at = self._moved_at
+        moving_speed_sq = self.moving_speed * self.moving_speed
+
+        for key in index.take_updated():
+            if key not in index:
+                positions.pop(key, None)
+                moved_at.pop(key, None)
+                continue
+
+            x, y, z = index.get_bounds(key)[:3]
+            previous = positions.get(key)
+            positions[key] = (x, y, z, now)
+            if previous is None:
+                continue
+
+            elapsed = now - previous[3]
+            dx = x - previous[0]
+            dy = y - previous[1]
+            dz = z - previous[2]
+            if elapsed > 0 and dx * dx + dy * dy + dz * dz > moving_speed_sq * elapsed * elapsed:
+                moved_at[key] = now
+
+        cutoff = now - self.idle_timeout
+        self._moved_at = {key: moved for key, moved in moved_at.items() if moved >= cutoff}
+        self.moving = set(self._moved_at)
+
+    def is_due(self, user_id: str, now: float) -> bool:
+        return now >= self._next_update.get(user_id, 0.0)
+
+    def schedule(self, user_id: str, now: float, tolerance: float = 0.0) -> float:
+        """Pick the client's interval and book its next update, tolerance absorbs tick jitter"""
+        interval = self.idle_interval
+        key = ("user", user_id)
+        if key in self.moving:
+            interval = self.full_interval
+        elif self.moving and key in self.spatial_index:
+            x, y, z = self.spatial_index.get_bounds(key)[:3]
+            for nearby in self.spatial_index.query_radius(x, y, z, self.near_radius):
+                if nearby in self.moving:
+                    interval = self.full_interval
+                    break
+
+        self.intervals[user_id] = interval
+        self._next_update[user_id] = now + interval - tolerance
+        return interval
+
+    def forget(self, user_id: str):
+        self.intervals.pop(user_id, None)
+        self._next_update.pop(user_id, None)
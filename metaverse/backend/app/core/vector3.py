@@ -1,25 +1,62 @@
-from dataclasses import dataclass
 from typing import Dict, Any
 
-@dataclass
 class Vector3:
-    x: float
-    y: float
-    z: float
+    """Mutable 3D vector.
+    
+    The operators return new vectors. The in-place methods (iadd, set)
+    modify the vector and return it, so hot loops can update a vector
+    without allocating. Vectors compare by value and are unhashable.
+    """
+    __slots__ = ("x", "y", "z")
+    
+    def __init__(self, x: float, y: float, z: float):
+        self.x = x
+        self.y = y
+        self.z = z
+    
+    def __repr__(self) -> str:
+        return f"Vector3(x={self.x!r}, y={self.y!r}, z={self.z!r})"
+    
+    def __eq__(self, other):
+        if isinstance(other, Vector3):
+            return self.x == other.x and self.y == other.y and self.z == other.z
+        return NotImplemented
+    
+    __hash__ = None
     
     def __add__(self, other):
         if isinstance(other, Vector3):
             return Vector3(self.x + other.x, self.y + other.y, self.z + other.z)
         return NotImplemented
     
+    def __sub__(self, other):
+        if isinstance(other, Vector3):
+            return Vector3(self.x - other.x, self.y - other.y, self.z - other.z)
+        return NotImplemented
+    
     def __mul__(self, scalar: float):
         if isinstance(scalar, (int, float)):
             return Vector3(self.x * scalar, self.y * scalar, self.z * scalar)
         return NotImplemented
-        
+    
+    def set(self, x: float, y: float, z: float) -> 'Vector3':
+        self.x = x
+        self.y = y
+        self.z = z
+        return self
+    
+    def iadd(self, other: 'Vector3') -> 'Vector3':
+        self.x += other.x
+        self.y += other.y
+        self.z += other.z
+        return self
+    
+    def length_sq(self) -> float:
+        return self.x * self.x + self.y * self.y + self.z * self.z
+    
     def to_dict(self) -> Dict[str, float]:
         return {"x": self.x, "y": self.y, "z": self.z}
-        
+    
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> 'Vector3':
-        return cls(x=data.get("x", 0.0), y=data.get("y", 0.0), z=data.get("z", 0.0)) 
\ No newline at end of file
+        return cls(x=data.get("x", 0.0), y=data.get("y", 0.0), z=data.get("z", 0.0))
@@ -1,53 +1,188 @@
 import asyncio
-from typing import Dict, Any, List, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple
+import json
+import logging
 import uuid
 import numpy as np
 from .vector3 import Vector3
+from .chunk_cache import ChunkCache
+from .chunk_codec import encode_chunk
+
+logger = logging.getLogger("metaverse.world")
 
 class WorldEngine:
-    def __init__(self):
+    def __init__(self, seed: Optional[int] = None, chunk_workers: Optional[int] = None,
+                 chunk_cache_size: int = 4096):
         self.grid_size = 1000
         self.chunk_size = 16
-        self.chunks = {}
+        # Loaded chunks, least recently used are evicted to the database
+        self.chunks = ChunkCache(chunk_cache_size)
+        self.database = None  # Chunk persistence (set during initialization)
+        self.persisting_chunks: Dict[str, 'Chunk'] = {}
         self.objects = {}
-        self.world_generator = WorldGenerator()
+        # Seed given by configuration; None reuses the seed stored in the database
+        self.configured_seed = seed
+        self.world_generator = WorldGenerator(seed)
+        # Chunk generation runs in a process pool so it never blocks the event loop.
+        # None uses one worker per CPU, 0 generates inline on the event loop.
+        self.chunk_workers = chunk_workers
+        self.chunk_executor = None
+        self.pending_chunks: Dict[str, asyncio.Task] = {}
         
     async def initialize(self):
         """Initialize the world with some starter chunks"""
+        if self.database is not None:
+            await self._load_seed()
+            
         # Generate the initial chunks around origin
         await self.generate_chunks_around_position(Vector3(0, 0, 0), 2)
         
+    def set_database(self, database):
+        """Set the database used to persist evicted chunks"""
+        self.database = database
+        
+    async def _load_seed(self):
+        """Keep the world seed across restarts by storing it in the database.
+        
+        Saved chunks belong to the stored seed; when the world starts with a
+        different one they are deleted so they can't leave seams next to
+        newly generated chunks.
+        """
+        stored_seed = await self.database.load_world_seed()
+        if self.configured_seed is None and stored_seed is not None:
+            self.world_generator = WorldGenerator(stored_seed)
+        elif stored_seed != self.world_generator.seed:
+            deleted = await self.database.delete_chunks()
+            if deleted:
+                logger.info(f"World seed changed, discarded {deleted} saved chunks")
+            await self.database.save_world_seed(self.world_generator.seed)
+            
+    def shutdown(self):
+        """Stop the chunk generation workers"""
+        if self.chunk_executor is not None:
+            self.chunk_executor.shutdown(wait=False, cancel_futures=True)
+            self.chunk_executor = None
+        
     async def generate_chunks_around_position(self, position: Vector3, radius: int = 1):
         """Generate chunks in a square around the given position with given radius"""
         chunk_x = int(position.x // self.chunk_size)
         chunk_z = int(position.z // self.chunk_size)
         
+        loading = []
         for x in range(chunk_x - radius, chunk_x + radius + 1):
             for z in range(chunk_z - radius, chunk_z + radius + 1):
-                chunk_pos = Vector3(x * self.chunk_size, 0, z * self.chunk_size)
                 chunk_id = f"{x}:{z}"
                 
-                if chunk_id not in self.chunks:
-                    chunk = await self.world_generator.create_chunk(chunk_pos, self.chunk_size)
-                    self.chunks[chunk_id] = chunk
+                if self.chunks.get(chunk_id) is None:
+                    loading.append(self.request_chunk(chunk_id, x, z))
+                    
+        if loading:
+            # Shield the shared tasks so a cancelled caller doesn't cancel them for everyone
+            await asyncio.gather(*(asyncio.shield(task) for task in loading))
+            
+    def request_chunk(self, chunk_id: str, x: int, z: int) -> asyncio.Task:
+        """Start generating a chunk, or join the request already in flight for it"""
+        task = self.pending_chunks.get(chunk_id)
+        if task is None:
+            task = asyncio.ensure_future(self._load_chunk(chunk_id, x, z))
+            self.pending_chunks[chunk_id] = task
+        return task
+        
+    async def _load_chunk(self, chunk_id: str, x: int, z: int) -> 'Chunk':
+        try:
+            chunk = await self._restore_chunk(chunk_id)
+            if chunk is None:
+                chunk = await self._generate_chunk(Vector3(x * self.chunk_size, 0, z * self.chunk_size))
+            await self._store_chunk(chunk_id, chunk)
+            return chunk
+        except Exception as e:
+            logger.error(f"Error loading chunk {chunk_id}: {e}")
+            raise
+        finally:
+            self.pending_chunks.pop(chunk_id, None)
+            
+    async def _generate_chunk(self, chunk_pos: Vector3) -> 'Chunk':
+        if self.chunk_workers == 0:
+            return self.world_generator.build_chunk(chunk_pos, self.chunk_size)
+            
+        if self.chunk_executor is None:
+            self.chunk_executor = ProcessPoolExecutor(max_workers=self.chunk_workers)
+        return await asyncio.get_running_loop().run_in_executor(
+            self.chunk_executor, self.world_generator.build_chunk, chunk_pos, self.chunk_size
+        )
+            
+    async def _store_chunk(self, chunk_id: str, chunk: 'Chunk'):
+        """Add a chunk to the cache and write out whatever it evicts"""
+        for evicted_id, evicted in self.chunks.put(chunk_id, chunk):
+            if self.database is not None:
+                await self._persist_chunk(evicted_id, evicted)
+                
+    async def _persist_chunk(self, chunk_id: str, chunk: 'Chunk'):
+        # Keep the chunk reachable until the write lands so a quick revisit can't miss it
+        self.persisting_chunks[chunk_id] = chunk
+        try:
+            terrain_data, object_data = chunk.to_storage()
+            await self.database.save_chunk(chunk_id, chunk.position, terrain_data, object_data)
+        finally:
+            if self.persisting_chunks.get(chunk_id) is chunk:
+                del self.persisting_chunks[chunk_id]
+                
+    async def _restore_chunk(self, chunk_id: str) -> Optional['Chunk']:
+        """Get a previously evicted chunk back, or None if it must be generated"""
+        chunk = self.persisting_chunks.get(chunk_id)
+        if chunk is not None or self.database is None:
+            return chunk
+            
+        row = await self.database.load_chunk(chunk_id)
+        if row is None:
+            return None
+        return Chunk.from_storage(row["position"], row["terrain_data"], row["object_data"])
                     
     async def get_chunks_for_client(self, position: Vector3, view_distance: int = 2) -> List[Dict[str, Any]]:
         """Get a list of chunks data to send to the client"""
+        chunks = await self.get_chunks_in_view(position, view_distance)
+        return [chunk.to_client_data() for chunk in chunks]
+        
+    def chunk_coords(self, position: Vector3) -> Tuple[int, int]:
+        """Get the coordinates of the chunk containing a position"""
+        return int(position.x // self.chunk_size), int(position.z // self.chunk_size)
+        
+    async def get_chunks_at(self, coords: List[Tuple[int, int]]) -> List['Chunk']:
+        """Get the chunks at the given chunk coordinates, generating any that are missing"""
+        loading = []
+        for x, z in coords:
+            chunk_id = f"{x}:{z}"
+            if self.chunks.get(chunk_id) is None:
+                loading.append(self.request_chunk(chunk_id, x, z))
+                
+        if loading:
+            await asyncio.gather(*(asyncio.shield(task) for task in loading))
+            
+        chunks = []
+        for x, z in coords:
+            chunk = self.chunks.peek(f"{x}:{z}")
+            if chunk is not None:
+                chunks.append(chunk)
+        return chunks
+        
+    async def get_chunks_in_view(self, position: Vector3, view_distance: int = 2) -> List['Chunk']:
+        """Get the chunks in a square around a position, generating any that are missing"""
         chunk_x = int(position.x // self.chunk_size)
         chunk_z = int(position.z // self.chunk_size)
         
         # First ensure all needed chunks are generated
         await self.generate_chunks_around_position(position, view_distance)
         
-        # Then return chunk data
-        chunk_data = []
+        # Then collect the chunks
+        chunks = []
         for x in range(chunk_x - view_distance, chunk_x + view_distance + 1):
             for z in range(chunk_z - view_distance, chunk_z + view_distance + 1):
-                chunk_id = f"{x}:{z}"
-                if chunk_id in self.chunks:
-                    chunk_data.append(self.chunks[chunk_id].to_client_data())
+                chunk = self.chunks.peek(f"{x}:{z}")
+                if chunk is not None:
+                    chunks.append(chunk)
                     
-        return chunk_data
+        return chunks
         
     async def get_nearby_objects(self, position: Vector3, radius: float = 50.0) -> List[Dict[str, Any]]:
         """Get all objects near a position"""
@@ -84,26 +219,88 @@ class WorldEngine:
         """Get the terrain height at a given x,z position"""
         chunk_x = int(x // self.chunk_size)
         chunk_z = int(z // self.chunk_size)
-        chunk_id = f"{chunk_x}:{chunk_z}"
+        chunk = self.chunks.peek(f"{chunk_x}:{chunk_z}")
         
-        if chunk_id not in self.chunks:
+        if chunk is None:
             return 0.0  # Default height if chunk not loaded
             
         # Get local coordinates within the chunk
         local_x = int(x % self.chunk_size)
         local_z = int(z % self.chunk_size)
         
-        return self.chunks[chunk_id].get_height(local_x, local_z)
+        return chunk.get_height(local_x, local_z)
+        
+    def get_terrain_heights(self, xs: np.ndarray, zs: np.ndarray) -> np.ndarray:
+        """Get terrain heights for arrays of x,z positions in one batched call.
+        
+        Matches get_terrain_height element-wise: queries are grouped by chunk
+        and each chunk's heightmap is read with a single fancy index.
+        """
+        xs = np.asarray(xs, dtype=np.float64)
+        zs = np.asarray(zs, dtype=np.float64)
+        heights = np.zeros(xs.shape, dtype=np.float64)
+        if xs.size == 0:
+            return heights
+            
+        flat_xs = xs.reshape(-1)
+        flat_zs = zs.reshape(-1)
+        flat_heights = heights.reshape(-1)
+        
+        chunk_coords = np.stack([
+            np.floor_divide(flat_xs, self.chunk_size),
+            np.floor_divide(flat_zs, self.chunk_size)
+        ], axis=1).astype(np.int64)
+        local_xs = np.mod(flat_xs, self.chunk_size).astype(np.int64)
+        local_zs = np.mod(flat_zs, self.chunk_size).astype(np.int64)
+        
+        # Group query indices by the chunk they fall in
+        unique_coords, inverse, counts = np.unique(
+            chunk_coords, axis=0, return_inverse=True, return_counts=True
+        )
+        order = np.argsort(inverse.reshape(-1), kind="stable")
+        groups = np.split(order, np.cumsum(counts)[:-1])
+        
+        for (chunk_x, chunk_z), indices in zip(unique_coords.tolist(), groups):
+            chunk = self.chunks.peek(f"{chunk_x}:{chunk_z}")
+            if chunk is None:
+                continue  # Default height of 0.0 if chunk not loaded
+                
+            lx = local_xs[indices]
+            lz = local_zs[indices]
+            inside = (lx >= 0) & (lx < chunk.size) & (lz >= 0) & (lz < chunk.size)
+            flat_heights[indices[inside]] = chunk.heightmap[lx[inside], lz[inside]]
+            
+        return heights
 
 class WorldGenerator:
-    def __init__(self):
+    # Mask for folding signed chunk coordinates into SeedSequence entropy words
+    SEED_WORD_MASK = 0xFFFFFFFFFFFFFFFF
+    
+    def __init__(self, seed: Optional[int] = None):
+        # The world seed fully determines every chunk, across restarts and processes
+        if seed is None:
+            seed = int(np.random.SeedSequence().entropy % 2**63)
+        self.seed = seed
+        
         # Different seed for each feature
-        self.terrain_seed = np.random.randint(0, 100000)
-        self.vegetation_seed = np.random.randint(0, 100000)
-        self.structure_seed = np.random.randint(0, 100000)
+        self.terrain_seed, self.vegetation_seed, self.structure_seed = (
+            int(feature_seed) for feature_seed in np.random.SeedSequence(seed).generate_state(3)
+        )
+        
+    def chunk_rng(self, feature_seed: int, position: Vector3) -> np.random.Generator:
+        """Get a generator seeded from a stable hash of the feature seed and chunk coordinates"""
+        return np.random.default_rng(np.random.SeedSequence([
+            feature_seed,
+            int(position.x) & self.SEED_WORD_MASK,
+            int(position.z) & self.SEED_WORD_MASK
+        ]))
         
     async def create_chunk(self, position: Vector3, chunk_size: int) -> 'Chunk':
         """Generate a new chunk at the given position"""
+        return self.build_chunk(position, chunk_size)
+        
+    def build_chunk(self, position: Vector3, chunk_size: int) -> 'Chunk':
+        """Generate a new chunk synchronously (used by the chunk worker processes)"""
         chunk = Chunk(position, chunk_size)
         
         # Generate terrain heightmap
@@ -111,119 +308,97 @@ class WorldGenerator:
         chunk.set_heightmap(heights)
         
         # Generate vegetation
-        vegetation = await self.generate_vegetation(position, heights, chunk_size)
+        vegetation = self.generate_vegetation(position, heights, chunk_size)
         chunk.set_vegetation(vegetation)
         
         # Generate structures
-        structures = await self.generate_structures(position, heights, chunk_size)
+        structures = self.generate_structures(position, heights, chunk_size)
         chunk.set_structures(structures)
         
         return chunk
         
     def generate_terrain(self, position: Vector3, chunk_size: int) -> np.ndarray:
         """Generate terrain heightmap using simple noise function"""
-        heights = np.zeros((chunk_size, chunk_size), dtype=float)
-        
-        # Используем numpy для генерации шума вместо библиотеки noise
-        np.random.seed(self.terrain_seed + hash(f"{position.x}:{position.z}") % 100000)
+        rng = self.chunk_rng(self.terrain_seed, position)
         
         # Базовая высота для этого чанка
-        base_height = np.random.uniform(10, 30)
-        
-        # Создаем простой ландшафт с холмами
-        for x in range(chunk_size):
-            for z in range(chunk_size):
-                # Рассчитываем мировые координаты
-                world_x = position.x + x
-                world_z = position.z + z
-                
-                # Создаем простой шум на основе синуса
-                noise_x = np.sin(world_x / 20.0) * 5.0
-                noise_z = np.cos(world_z / 15.0) * 5.0
-                
-                # Добавляем случайные вариации
-                random_noise = np.random.uniform(-2.0, 2.0)
-                
-                # Комбинируем все компоненты для окончательной высоты
-                height = base_height + noise_x + noise_z + random_noise
-                
-                heights[x, z] = height
-                
-        return heights
+        base_height = rng.uniform(10, 30)
         
-    async def generate_vegetation(self, position: Vector3, heights: np.ndarray, chunk_size: int) -> List[Dict[str, Any]]:
-        """Generate vegetation based on the heightmap"""
-        vegetation = []
+        # Мировые координаты всех ячеек чанка, heights[x, z]
+        offsets = np.arange(chunk_size, dtype=float)
+        world_x, world_z = np.meshgrid(position.x + offsets, position.z + offsets, indexing="ij")
         
-        # Randomize vegetation
-        np.random.seed(self.vegetation_seed + hash(f"{position.x}:{position.z}") % 100000)
+        # Простой шум на основе синуса и случайные вариации
+        noise_x = np.sin(world_x / 20.0) * 5.0
+        noise_z = np.cos(world_z / 15.0) * 5.0
+        random_noise = rng.uniform(-2.0, 2.0, size=(chunk_size, chunk_size))
+        
+        # Комбинируем все компоненты для окончательной высоты
+        return base_height + noise_x + noise_z + random_noise
+        
+    def generate_vegetation(self, position: Vector3, heights: np.ndarray, chunk_size: int) -> List[Dict[str, Any]]:
+        """Generate vegetation based on the heightmap"""
+        rng = self.chunk_rng(self.vegetation_seed, position)
         
         # Vegetation types
         veg_types = ["tree", "bush", "grass", "flower"]
         
-        # Generate vegetation with some probability
-        for x in range(chunk_size):
-            for z in range(chunk_size):
-                if np.random.random() < 0.05:  # 5% chance
-                    veg_type = np.random.choice(veg_types, p=[0.2, 0.3, 0.4, 0.1])
-                    
-                    world_x = position.x + x
-                    world_z = position.z + z
-                    world_y = heights[x, z]
-                    
-                    vegetation.append({
-                        "type": veg_type,
-                        "position": {
-                            "x": world_x,
-                            "y": world_y,
-                            "z": world_z
-                        },
-                        "properties": {
-                            "scale": np.random.uniform(0.8, 1.2),
-                            "rotation": np.random.uniform(0, 360)
-                        }
-                    })
-                    
+        # Generate vegetation with some probability (5% chance per cell)
+        xs, zs = np.nonzero(rng.random((chunk_size, chunk_size)) < 0.05)
+        count = len(xs)
+        types = rng.choice(len(veg_types), size=count, p=[0.2, 0.3, 0.4, 0.1])
+        scales = rng.uniform(0.8, 1.2, size=count)
+        rotations = rng.uniform(0, 360, size=count)
+        
+        vegetation = []
+        for x, z, veg_type, scale, rotation in zip(
+            xs.tolist(), zs.tolist(), types.tolist(), scales.tolist(), rotations.tolist()
+        ):
+            vegetation.append({
+                "type": veg_types[veg_type],
+                "position": {
+                    "x": position.x + x,
+                    "y": float(heights[x, z]),
+                    "z": position.z + z
+                },
+                "properties": {
+                    "scale": scale,
+                    "rotation": rotation
+                }
+            })
+            
         return vegetation
         
-    async def generate_structures(self, position: Vector3, heights: np.ndarray, chunk_size: int) -> List[Dict[str, Any]]:
+    def generate_structures(self, position: Vector3, heights: np.ndarray, chunk_size: int) -> List[Dict[str, Any]]:
         """Generate structures like buildings or landmarks"""
         structures = []
-        
-        # Randomize structures
-        np.random.seed(self.structure_seed + hash(f"{position.x}:{position.z}") % 100000)
+        rng = self.chunk_rng(self.structure_seed, position)
         
         # Very rare chance to generate a structure (1% per chunk)
-        if np.random.random() < 0.01:
+        if rng.random() < 0.01 and chunk_size >= 5:
             structure_types = ["house", "tower", "ruins", "camp"]
-            structure_type = np.random.choice(structure_types)
-            
-            # Find a suitable location (somewhat flat area)
-            suitable_locations = []
+            structure_type = structure_types[rng.integers(len(structure_types))]
             
-            for x in range(2, chunk_size-2):
-                for z in range(2, chunk_size-2):
-                    # Check if the area is relatively flat
-                    area = heights[x-2:x+3, z-2:z+3]
-                    if np.max(area) - np.min(area) < 2.0:
-                        suitable_locations.append((x, z))
+            # Find a suitable location: a relatively flat 5x5 area
+            windows = np.lib.stride_tricks.sliding_window_view(heights, (5, 5))
+            flatness = windows.max(axis=(2, 3)) - windows.min(axis=(2, 3))
+            suitable_xs, suitable_zs = np.nonzero(flatness < 2.0)
             
-            if suitable_locations:
-                x, z = suitable_locations[np.random.randint(0, len(suitable_locations))]
-                world_x = position.x + x
-                world_z = position.z + z
-                world_y = heights[x, z]
+            if len(suitable_xs):
+                choice = rng.integers(len(suitable_xs))
+                x = int(suitable_xs[choice]) + 2
+                z = int(suitable_zs[choice]) + 2
                 
                 structures.append({
                     "type": structure_type,
                     "position": {
-                        "x": world_x,
-                        "y": world_y,
-                        "z": world_z
+                        "x": position.x + x,
+                        "y": float(heights[x, z]),
+                        "z": position.z + z
                     },
                     "properties": {
-                        "rotation": np.random.uniform(0, 360),
-                        "variant": np.random.randint(1, 4)
+                        "rotation": float(rng.uniform(0, 360)),
+                        "variant": int(rng.integers(1, 4))
                     }
                 })
                 
@@ -236,31 +411,105 @@ class Chunk:
         self.heightmap = None
         self.vegetation = []
         self.structures = []
+        # Bumped on every content change; cached client payloads are tagged with it
+        self.version = 0
+        self._client_data = None
+        self._client_data_version = -1
+        self._json = None
+        self._json_version = -1
+        self._encoded = {}
+        self._encoded_version = -1
+        
+    def __getstate__(self) -> Dict[str, Any]:
+        # Payload caches are cheap to rebuild and not worth shipping between processes
+        state = self.__dict__.copy()
+        state.update(_client_data=None, _client_data_version=-1, _json=None,
+                     _json_version=-1, _encoded={}, _encoded_version=-1)
+        return state
+        
+    @property
+    def chunk_id(self) -> str:
+        return f"{int(self.position.x // self.size)}:{int(self.position.z // self.size)}"
+        
+    def mark_dirty(self):
+        """Invalidate cached payloads, call after changing chunk data in place"""
+        self.version += 1
         
     def set_heightmap(self, heightmap: np.ndarray):
         self.heightmap = heightmap
+        self.mark_dirty()
         
     def set_vegetation(self, vegetation: List[Dict[str, Any]]):
         self.vegetation = vegetation
+        self.mark_dirty()
         
     def set_structures(self, structures: List[Dict[str, Any]]):
         self.structures = structures
+        self.mark_dirty()
         
     def get_height(self, x: int, z: int) -> float:
         """Get the terrain height at a local position"""
         if 0 <= x < self.size and 0 <= z < self.size:
-            return self.heightmap[x, z]
+            return float(self.heightmap[x, z])
         return 0.0
         
     def to_client_data(self) -> Dict[str, Any]:
-        """Convert chunk data to a format suitable for the client"""
-        return {
-            "position": self.position.to_dict(),
+        """Convert chunk data to a format suitable for the client.
+        
+        The result is cached until the chunk changes and shared between
+        callers, so it must not be modified.
+        """
+        if self._client_data_version != self.version:
+            self._client_data = {
+                "id": self.chunk_id,
+                "position": self.position.to_dict(),
+                "size": self.size,
+                "heightmap": self.heightmap.tolist(),
+                "vegetation": self.vegetation,
+                "structures": self.structures
+            }
+            self._client_data_version = self.version
+        return self._client_data
+        
+    def to_json(self) -> str:
+        """Get the client data pre-encoded as JSON (cached until the chunk changes)"""
+        if self._json_version != self.version:
+            self._json = json.dumps(self.to_client_data(), separators=(",", ":"))
+            self._json_version = self.version
+        return self._json
+        
+    def to_bytes(self, quantize: bool = True) -> bytes:
+        """Get the binary wire encoding (cached until the chunk changes)"""
+        if self._encoded_version != self.version:
+            self._encoded = {}
+            self._encoded_version = self.version
+            
+        encoded = self._encoded.get(quantize)
+        if encoded is None:
+            encoded = encode_chunk(self, quantize=quantize)
+            self._encoded[quantize] = encoded
+        return encoded
+        
+    def to_storage(self) -> Tuple[bytes, Dict[str, Any]]:
+        """Convert chunk data to the (terrain_data, object_data) stored by Database.save_chunk"""
+        terrain_data = np.ascontiguousarray(self.heightmap, dtype="<f4").tobytes()
+        object_data = {
             "size": self.size,
-            "heightmap": self.heightmap.tolist(),
             "vegetation": self.vegetation,
             "structures": self.structures
         }
+        return terrain_data, object_data
+        
+    @classmethod
+    def from_storage(cls, position: Vector3, terrain_data: bytes, object_data: Dict[str, Any]) -> 'Chunk':
+        """Rebuild a chunk from the data returned by Database.load_chunk"""
+        size = object_data["size"]
+        chunk = cls(position, size)
+        heightmap = np.frombuffer(terrain_data, dtype="<f4").reshape(size, size)
+        chunk.set_heightmap(heightmap.astype(np.float64))
+        chunk.set_vegetation(object_data.get("vegetation", []))
+        chunk.set_structures(object_data.get("structures", []))
+        return chunk
 
 class WorldObject:
     def __init__(self, obj_id: str, obj_type: str, position: Vector3, properties: Dict[str, Any]):
@@ -51,6 +51,14 @@ class Database:
         )
         """)
         
+        # World settings table, such as the seed the world is generated from
+        await self.connection.execute("""
+        CREATE TABLE IF NOT EXISTS world_settings (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        )
+        """)
+        
         # NPCs table
         await self.connection.execute("""
         CREATE TABLE IF NOT EXISTS npcs (
@@ -188,6 +196,16 @@ class Database:
             print(f"Error loading chunk: {e}")
             return None
             
+    async def delete_chunks(self) -> int:
+        """Delete every saved world chunk, returning how many there were"""
+        try:
+            cursor = await self.connection.execute("DELETE FROM world_chunks")
+            await self.connection.commit()
+            return cursor.rowcount
+        except Exception as e:
+            print(f"Error deleting chunks: {e}")
+            return 0
+            
     async def get_chunks_in_range(self, center_position: Vector3, radius: int) -> List[str]:
         """Get chunk IDs that are within a certain range of a position"""
         # This is a simple implementation - in a real system, you'd use a spatial index
@@ -210,6 +228,33 @@ class Database:
             print(f"Error getting chunks in range: {e}")
             return []
             
+    # World Settings Methods
+    async def load_world_seed(self) -> Optional[int]:
+        """Load the seed the world is generated from"""
+        try:
+            async with self.connection.execute(
+                "SELECT value FROM world_settings WHERE key = 'seed'"
+            ) as cursor:
+                row = await cursor.fetchone()
+                
+            return int(row[0]) if row else None
+        except Exception as e:
+            print(f"Error loading world seed: {e}")
+            return None
+            
+    async def save_world_seed(self, seed: int) -> bool:
+        """Save the seed the world is generated from"""
+        try:
+            await self.connection.execute(
+                "INSERT OR REPLACE INTO world_settings (key, value) VALUES ('seed', ?)",
+                (str(seed),)
+            )
+            await self.connection.commit()
+            return True
+        except Exception as e:
+            print(f"Error saving world seed: {e}")
+            return False
+            
     # NPC Methods
     async def save_npc(self, npc_id: str, position: Vector3, personality_type: str,
                       attributes: Dict[str, Any], memory_data: Dict[str, Any]) -> bool:
@@ -260,6 +305,27 @@ class Database:
             print(f"Error loading NPC: {e}")
             return None
             
+    async def load_npcs(self) -> List[Dict[str, Any]]:
+        """Load every saved NPC, in the same layout as load_npc"""
+        try:
+            npcs = []
+            async with self.connection.execute(
+                "SELECT npc_id, position_data, personality_type, attributes, memory_data FROM npcs"
+            ) as cursor:
+                async for row in cursor:
+                    npc_id, position_data, personality_type, attributes, memory_data = row
+                    npcs.append({
+                        "npc_id": npc_id,
+                        "position": Vector3.from_dict(json.loads(position_data)),
+                        "personality_type": personality_type,
+                        "attributes": json.loads(attributes),
+                        "memory_data": json.loads(memory_data)
+                    })
+            return npcs
+        except Exception as e:
+            print(f"Error loading NPCs: {e}")
+            return []
+            
     async def get_npcs_in_range(self, center_position: Vector3, radius: float) -> List[str]:
         """Get NPC IDs that are within a certain range of a position"""
         try:
@@ -1,7 +1,7 @@
 import asyncio
 import os
 import uvicorn
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Depends, HTTPException
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Depends, HTTPException, Request, Response
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 from typing import Dict, Any, List, Optional
@@ -12,6 +12,8 @@ import random
 
 from .core.metaverse_core import MetaverseCore
 from .core.vector3 import Vector3
+from .core.chunk_codec import CHUNK_MEDIA_TYPE, encode_chunks
+from .core.serialization import dumps
 from .database.db import Database
 from .models.user import User
 from .models.railway_system import railway_system, Position, RailwayWorldChunk, Train, Station, Track, RailwaySignal
@@ -29,8 +31,9 @@ logging.basicConfig(
 
 logger = logging.getLogger("metaverse")
 
-# Create MetaverseCore instance
-metaverse = MetaverseCore()
+# Create MetaverseCore instance, optionally with a fixed world seed
+world_seed = os.environ.get("METAVERSE_WORLD_SEED")
+metaverse = MetaverseCore(world_seed=int(world_seed) if world_seed else None)
 app = metaverse.app
 
 # Add CORS middleware
@@ -91,7 +94,8 @@ async def startup_event():
     await database.initialize()
     logger.info("Database initialized")
     
-    # Initialize world
+    # Initialize world, persisting evicted chunks to the database
+    metaverse.world.set_database(database)
     await metaverse.world.initialize()
     logger.info("World engine initialized")
     
@@ -107,9 +111,15 @@ async def startup_event():
     metaverse.physics.set_world_reference(metaverse.world)
     logger.info("Physics engine initialized")
     
-    # Create some initial NPCs
-    await create_initial_npcs()
-    logger.info("Initial NPCs created")
+    # Bring back the saved NPCs, or create some initial ones on a fresh database
+    saved_npcs = await database.load_npcs()
+    if saved_npcs:
+        for npc_data in saved_npcs:
+            await metaverse.ai_system.restore_npc(npc_data)
+        logger.info(f"Restored {len(saved_npcs)} NPCs")
+    else:
+        await create_initial_npcs()
+        logger.info("Initial NPCs created")
     
     # Start the simulation loop
     asyncio.create_task(metaverse.run_simulation_loop())
@@ -126,6 +136,18 @@ async def shutdown_event():
     """Clean up on shutdown"""
     logger.info("Shutting down Metaverse server...")
     
+    # Stop the simulation loop
+    metaverse.stop_simulation_loop()
+    await metaverse.npc_chat.close()
+    
+    # Stop chunk generation and physics workers
+    metaverse.world.shutdown()
+    metaverse.physics.shutdown()
+    logger.info("World engine stopped")
+    
+    # Save NPCs with their memory so they remember users across restarts
+    await save_npcs()
+    
     # Close database connection
     await database.close()
     logger.info("Database connection closed")
@@ -154,14 +176,22 @@ async def create_initial_npcs():
         logger.info(f"Created NPC {npc_id} at position {position.to_dict()}")
         
         # Save NPC to database
-        npc = metaverse.ai_system.npcs[npc_id]
-        await database.save_npc(
-            npc_id,
-            npc.position,
-            npc.personality_type,
-            npc.attributes,
-            npc.memory.identity
-        )
+        await save_npc(metaverse.ai_system.npcs[npc_id])
+
+async def save_npc(npc):
+    """Save one NPC, memory included"""
+    await database.save_npc(
+        npc.id,
+        npc.position,
+        npc.personality_type,
+        npc.attributes,
+        npc.memory.to_dict()
+    )
+
+async def save_npcs():
+    """Save every NPC"""
+    for npc in list(metaverse.ai_system.npcs.values()):
+        await save_npc(npc)
 
 # API Endpoints
 @app.get("/api/status")
@@ -174,9 +204,20 @@ async def get_status():
         "time": time.time(),
         "trains": len(railway_system.trains),
         "stations": len(railway_system.stations),
-        "tracks": len(railway_system.tracks)
+        "tracks": len(railway_system.tracks),
+        "chunk_cache": metaverse.world.chunks.stats()
     }
 
+@app.get("/api/connections")
+async def get_connections():
+    """Get outbound queue depth and lag for every connected client"""
+    return metaverse.get_connection_stats()
+
+@app.get("/api/stats")
+async def get_stats():
+    """Get tick timings per simulation phase, chunk cache and connection stats"""
+    return metaverse.get_stats()
+
 @app.get("/api/user/{user_id}")
 async def get_user(user_id: str, db = Depends(get_db)):
     """Get user information"""
@@ -208,11 +249,23 @@ async def get_nearby_npcs(x: float, y: float, z: float, radius: float = 50.0):
     return {"npcs": npcs}
 
 @app.get("/api/world/chunks")
-async def get_world_chunks(x: float, y: float, z: float, view_distance: int = 2):
-    """Get world chunks around a position"""
+async def get_world_chunks(request: Request, x: float, y: float, z: float, view_distance: int = 2):
+    """Get world chunks around a position.
+    
+    Clients that send "Accept: application/x-metaverse-chunks" get the compact
+    binary encoding instead of JSON.
+    """
     position = Vector3(x, y, z)
-    chunks = await metaverse.world.get_chunks_for_client(position, view_distance)
-    return {"chunks": chunks}
+    view_distance = metaverse.clamp_view_distance(view_distance, 2)
+    chunks = await metaverse.world.get_chunks_in_view(position, view_distance)
+    
+    if CHUNK_MEDIA_TYPE in request.headers.get("accept", ""):
+        payload = encode_chunks([chunk.to_bytes() for chunk in chunks])
+        return Response(content=payload, media_type=CHUNK_MEDIA_TYPE)
+    
+    # Splice the per-chunk cached JSON instead of re-serializing every heightmap
+    payload = '{"chunks":[' + ",".join(chunk.to_json() for chunk in chunks) + "]}"
+    return Response(content=payload, media_type="application/json")
 
 @app.get("/api/world/objects")
 async def get_world_objects(x: float, y: float, z: float, radius: float = 50.0):
@@ -512,10 +565,11 @@ async def update_railway_system():
                 }
             }
             
-            # Send to all connected clients
+            # Serialize once and send the same frame to all connected clients
+            payload = dumps(update_data)
             for connection in active_connections:
                 try:
-                    await connection.send_json(update_data)
+                    await connection.send_text(payload)
                 except Exception as e:
                     print(f"Error sending update to client: {e}")
         
@@ -0,0 +1,91 @@
+"""Count fast bodies tunnelling through thin walls, with and without swept collision.
+
+Bullets are fired as boxes and then as spheres; a bullet that is swept
+into the wall must also bounce off it, so one still moving towards the
+wall while touching it at the end counts as pinned.
+
+Run from metaverse/backend:  python benchmarks/bench_ccd.py
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.physics_engine import PhysicsEngine
+from app.core.vector3 import Vector3
+
+class FlatTerrain:
+    def get_terrain_height(self, x: float, z: float) -> float:
+        return 0.0
+
+    def get_terrain_heights(self, xs, zs) -> np.ndarray:
+        return np.zeros(len(xs), dtype=np.float64)
+
+def build_engine(bullets: int, crowd: int, ccd: bool, vectorized: bool, shape: str = "box") -> PhysicsEngine:
+    rng = random.Random(7)
+    physics = PhysicsEngine(vectorized=vectorized, ccd_speed=10.0 if ccd else None, sleep_ticks=None)
+    physics.set_world_reference(FlatTerrain())
+    # A 0.1 thick wall at x=20 and slow bodies moving about behind the firing line
+    physics.register_object("wall", position=Vector3(20, 5, 0), is_static=True,
+                            collider_size=Vector3(0.1, 10, bullets * 2 + 10))
+    for i in range(crowd):
+        physics.register_object(
+            f"body_{i}",
+            position=Vector3(rng.uniform(-60, 0), rng.uniform(0, 4), rng.uniform(-bullets, bullets)),
+            velocity=Vector3(rng.uniform(-2, 2), 0, rng.uniform(-2, 2))
+        )
+    for i in range(bullets):
+        physics.register_object(
+            f"bullet_{i}",
+            position=Vector3(0, 5, i * 2 - bullets),
+            velocity=Vector3(rng.uniform(60, 400), rng.uniform(-5, 5), 0),
+            collider_type=shape,
+            collider_size=Vector3(0.2, 0.2, 0.2)
+        )
+    return physics
+
+def run(label: str, physics: PhysicsEngine, bullets: int, seconds: float, rate: float):
+    ticks = int(seconds * rate)
+    # Time the swept step on its own as well as the whole tick
+    swept = [0.0]
+    integrate_swept = physics.integrate_swept
+
+    def timed_swept(fast, delta_time):
+        start = time.perf_counter()
+        integrate_swept(fast, delta_time)
+        swept[0] += time.perf_counter() - start
+
+    physics.integrate_swept = timed_swept
+    start = time.perf_counter()
+    for _ in range(ticks):
+        physics.update(1 / rate)
+    elapsed = time.perf_counter() - start
+    bodies = [physics.objects[f"bullet_{i}"] for i in range(bullets)]
+    through = sum(1 for body in bodies if body.position.x > 20)
+    # Touching the front face (x=19.95) and still moving into it
+    pinned = sum(1 for body in bodies if 19.8 < body.position.x <= 20 and body.velocity.x > 0)
+    print(f"{label:<24} {ticks:>4} ticks {elapsed * 1000:>9.1f} ms  {elapsed / ticks * 1000:>7.2f} ms/tick  "
+          f"sweep {swept[0] / ticks * 1000:>6.2f} ms/tick  "
+          f"{elapsed / seconds * 100:>6.1f}% of real time  {through:>4}/{bullets} tunnelled  {pinned:>4} pinned")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark continuous collision detection")
+    parser.add_argument("--bullets", type=int, default=200, help="Fast bodies fired at the wall")
+    parser.add_argument("--crowd", type=int, default=2000, help="Slow bodies that are stepped as usual")
+    parser.add_argument("--seconds", type=float, default=0.25, help="Simulated time")
+    parser.add_argument("--vectorized", action="store_true", help="Use the array body store")
+    args = parser.parse_args()
+
+    for shape in ("box", "sphere"):
+        for label, ccd, rate in (("discrete 20 Hz", False, 20), ("discrete 200 Hz", False, 200),
+                                 ("discrete 2000 Hz", False, 2000), ("swept 20 Hz", True, 20)):
+            physics = build_engine(args.bullets, args.crowd, ccd, args.vectorized, shape)
+            run(f"{shape} {label}", physics, args.bullets, args.seconds, rate)
+
+if __name__ == "__main__":
+    main()
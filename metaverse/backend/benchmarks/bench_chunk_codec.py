@@ -0,0 +1,61 @@
+"""Compare the binary chunk wire format with the JSON heightmap.tolist() path.
+
+Run from metaverse/backend:  python benchmarks/bench_chunk_codec.py
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.chunk_codec import decode_chunk, encode_chunk
+from app.core.vector3 import Vector3
+from app.core.world_engine import WorldGenerator
+
+def build_chunks(count: int, chunk_size: int = 16):
+    generator = WorldGenerator(seed=1234)
+    return [
+        generator.build_chunk(Vector3(i * chunk_size, 0, 0), chunk_size)
+        for i in range(count)
+    ]
+
+def measure(label: str, encode, chunks, repeat: int):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        payloads = [encode(chunk) for chunk in chunks]
+    elapsed = (time.perf_counter() - start) / (repeat * len(chunks))
+    size = sum(len(payload) for payload in payloads) / len(chunks)
+    print(f"{label:<16} {size:>10.0f} bytes/chunk {elapsed * 1e6:>10.1f} us/chunk")
+    return size, elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark chunk encodings")
+    parser.add_argument("--chunks", type=int, default=200, help="Number of chunks to encode")
+    parser.add_argument("--repeat", type=int, default=5, help="Passes over the chunk set")
+    args = parser.parse_args()
+
+    chunks = build_chunks(args.chunks)
+
+    json_size, json_time = measure(
+        "json", lambda chunk: json.dumps(chunk.to_client_data()).encode(), chunks, args.repeat
+    )
+    int16_size, int16_time = measure("binary int16", encode_chunk, chunks, args.repeat)
+    float32_size, float32_time = measure(
+        "binary float32", lambda chunk: encode_chunk(chunk, quantize=False), chunks, args.repeat
+    )
+
+    print(f"int16 is {json_size / int16_size:.1f}x smaller and {json_time / int16_time:.1f}x faster than json")
+    print(f"float32 is {json_size / float32_size:.1f}x smaller and {json_time / float32_time:.1f}x faster than json")
+
+    # Quantization error for the int16 encoding
+    worst = 0.0
+    for chunk in chunks:
+        decoded = decode_chunk(encode_chunk(chunk))["heightmap"]
+        for decoded_row, row in zip(decoded, chunk.heightmap.tolist()):
+            worst = max(worst, max(abs(a - b) for a, b in zip(decoded_row, row)))
+    print(f"max int16 height error: {worst:.6f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Compare the compiled intent matcher with the original chain of any() keyword scans.
+
+Run from metaverse/backend:  python benchmarks/bench_intent_matcher.py
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.ai.intent_matcher import IntentMatcher
+
+WORDS = [
+    "hello", "there", "where", "is", "the", "market", "bye", "what", "weather", "today", "who",
+    "are", "you", "tell", "me", "about", "yourself", "nice", "place", "sunny", "trade", "sword",
+    "quest", "village", "see", "your", "name", "region", "rain", "thanks", "friend", "map"
+]
+
+def classify_with_any(message: str) -> str:
+    """The keyword checks DialogueModel.generate_response used before the matcher"""
+    if any(word in message for word in ["hello", "hi", "hey", "greetings"]):
+        return "greeting"
+    elif any(word in message for word in ["goodbye", "bye", "farewell", "see you"]):
+        return "farewell"
+    elif any(word in message for word in ["who are you", "your name", "about you", "yourself"]):
+        return "about_self"
+    elif any(word in message for word in ["where", "place", "area", "location", "region"]):
+        return "about_location"
+    elif any(word in message for word in ["weather", "rain", "sunny", "temperature"]):
+        return "about_weather"
+    return "unknown"
+
+def build_messages(count: int, distinct: int, seed: int = 7):
+    rng = random.Random(seed)
+    phrases = [" ".join(rng.choice(WORDS) for _ in range(rng.randint(2, 12))) for _ in range(distinct)]
+    return [rng.choice(phrases) for _ in range(count)]
+
+def measure(label: str, classify, messages):
+    start = time.perf_counter()
+    for message in messages:
+        classify(message)
+    elapsed = (time.perf_counter() - start) / len(messages)
+    print(f"{label:<24} {elapsed * 1e6:>8.2f} us/message")
+    return elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark NPC intent classification")
+    parser.add_argument("--messages", type=int, default=200000, help="Number of messages to classify")
+    parser.add_argument("--distinct", type=int, default=500, help="Distinct phrases among the messages")
+    args = parser.parse_args()
+
+    messages = build_messages(args.messages, args.distinct)
+    matcher = IntentMatcher.from_file()
+    uncached = IntentMatcher.from_file(cache_size=0)
+
+    mismatches = sum(classify_with_any(message) != uncached.classify(message) for message in set(messages))
+    print(f"mismatches against any() scans: {mismatches}")
+
+    baseline = measure("any() scans", classify_with_any, messages)
+    compiled = measure("compiled regex", uncached.classify, messages)
+    cached = measure("compiled regex + lru", matcher.classify, messages)
+    print(f"compiled is {baseline / compiled:.1f}x, cached is {baseline / cached:.1f}x the any() scans")
+    print(matcher.classify.cache_info())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""Check that batched NPCs pick actions with the same odds as BehaviorModel.get_action, and time both paths.
+
+Action odds are compared three ways, with and without interaction
+cooldown: the exact odds behind get_action, the odds in NPCBatch's
+flattened action table, and the frequencies sampled from both.
+
+Run from metaverse/backend:  python benchmarks/bench_npc_batch.py
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+from collections import Counter
+from types import SimpleNamespace
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.ai.ai_system import AISystem, BehaviorModel
+from app.ai.npc_batch import ACTION_KINDS, NPCBatch
+from app.core.vector3 import Vector3
+
+KIND_NAMES = {code: name for name, code in ACTION_KINDS.items()}
+
+def action_label(kind: str, emote: str) -> str:
+    return f"{kind}:{emote}" if kind == "emote" else kind
+
+def exact_odds(behaviors, cooling: bool) -> Counter:
+    """Odds of every action under get_action, summed over behaviors that share it"""
+    odds = Counter()
+    if cooling:
+        actions = behaviors["idle"]["actions"]
+        for action in actions:
+            odds[action_label(action.get("type", "idle"), action.get("emote", "idle"))] += 1 / len(actions)
+        return odds
+
+    total_weight = sum(data["weight"] for data in behaviors.values())
+    for data in behaviors.values():
+        for action in data["actions"]:
+            label = action_label(action.get("type", "idle"), action.get("emote", "idle"))
+            odds[label] += data["weight"] / total_weight / len(data["actions"])
+    return odds
+
+def table_labels(batch: NPCBatch):
+    return [action_label(KIND_NAMES[int(kind)], batch.state_names[state])
+            for kind, state in zip(batch.action_kinds, batch.action_states)]
+
+def table_odds(batch: NPCBatch, cooling: bool) -> Counter:
+    cdf = batch.idle_cdf if cooling else batch.action_cdf
+    odds = Counter()
+    for label, probability in zip(table_labels(batch), np.diff(cdf, prepend=0.0)):
+        odds[label] += probability
+    return odds
+
+async def sample_scalar(model: BehaviorModel, cooling: bool, samples: int) -> Counter:
+    npc = SimpleNamespace(interaction_cooldown=5 if cooling else 0)
+    counts = Counter()
+    for _ in range(samples):
+        action = await model.get_action(npc)
+        counts[action_label(action.get("type", "idle"), action.get("emote", "idle"))] += 1
+    return counts
+
+def sample_batched(batch: NPCBatch, cooling: bool, samples: int) -> Counter:
+    # Same draw and lookup as NPCBatch.step
+    cdf = batch.idle_cdf if cooling else batch.action_cdf
+    choice = np.searchsorted(cdf, batch.rng.random(samples), side="right")
+    np.minimum(choice, len(batch.action_kinds) - 1, out=choice)
+    labels = table_labels(batch)
+    return Counter(labels[index] for index in choice.tolist())
+
+async def check_odds(samples: int) -> bool:
+    random.seed(11)
+    model = BehaviorModel()
+    await model.initialize()
+    batch = NPCBatch(seed=11)
+    batch.build_action_table(model.behaviors)
+
+    matched = True
+    for cooling in (False, True):
+        exact = exact_odds(model.behaviors, cooling)
+        table = table_odds(batch, cooling)
+        scalar = await sample_scalar(model, cooling, samples)
+        batched = sample_batched(batch, cooling, samples)
+        print(f"{'in cooldown' if cooling else 'no cooldown'} ({samples} samples each)")
+        print(f"  {'action':<22} {'exact':>8} {'table':>8} {'scalar':>8} {'batched':>8}")
+        for label in sorted(set(exact) | set(table)):
+            p = exact[label]
+            # Two sampled shares differ by chance, allow 5 standard deviations of the difference
+            tolerance = 5 * np.sqrt(2 * p * (1 - p) / samples)
+            ok = (abs(table[label] - p) < 1e-9 and
+                  abs(scalar[label] / samples - batched[label] / samples) <= tolerance)
+            matched = matched and ok
+            print(f"  {label:<22} {p:>8.4f} {table[label]:>8.4f} {scalar[label] / samples:>8.4f} "
+                  f"{batched[label] / samples:>8.4f}  {'ok' if ok else 'MISMATCH'}")
+    return matched
+
+async def build_npcs(count: int, batched: bool) -> AISystem:
+    random.seed(5)
+    ai_system = AISystem(batched=batched, seed=5)
+    await ai_system.initialize()
+    for _ in range(count):
+        await ai_system.create_npc(Vector3(random.uniform(-500, 500), 0, random.uniform(-500, 500)))
+    return ai_system
+
+async def time_ticks(count: int, batched: bool, ticks: int) -> float:
+    ai_system = await build_npcs(count, batched)
+    start = time.perf_counter()
+    for _ in range(ticks):
+        await ai_system.update_npcs()
+    return (time.perf_counter() - start) / ticks
+
+async def main():
+    parser = argparse.ArgumentParser(description="Compare batched and scalar NPC stepping")
+    parser.add_argument("--samples", type=int, default=200000, help="Actions sampled per path")
+    parser.add_argument("--npcs", type=int, nargs="+", default=[1000, 10000, 50000], help="NPC counts to time")
+    parser.add_argument("--max-scalar", type=int, default=10000, help="Largest NPC count to time the scalar path at")
+    parser.add_argument("--ticks", type=int, default=10, help="Ticks per timing")
+    args = parser.parse_args()
+
+    matched = await check_odds(args.samples)
+    print("action odds " + ("match" if matched else "DIFFER"))
+
+    for count in args.npcs:
+        batched = await time_ticks(count, True, args.ticks)
+        line = f"{count:>7} NPCs  batched {batched * 1000:>8.2f} ms/tick"
+        if count <= args.max_scalar:
+            scalar = await time_ticks(count, False, args.ticks)
+            line += f"  scalar {scalar * 1000:>8.2f} ms/tick  {scalar / batched:>6.1f}x"
+        print(line)
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,82 @@
+"""Time region-parallel physics stepping across worker counts.
+
+Run from metaverse/backend:  python benchmarks/bench_parallel_physics.py
+"""
+import argparse
+import hashlib
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.physics_engine import PhysicsEngine
+from app.core.vector3 import Vector3
+
+class FlatTerrain:
+    """Ground plane at y=0 so bodies pile up and keep colliding"""
+
+    def get_terrain_height(self, x: float, z: float) -> float:
+        return 0.0
+
+    def get_terrain_heights(self, xs, zs) -> np.ndarray:
+        return np.zeros(len(xs), dtype=np.float64)
+
+def build_engine(bodies: int, extent: float, workers: int, floor: bool = False) -> PhysicsEngine:
+    rng = random.Random(7)
+    # Sleeping disabled so every body is stepped on every tick
+    physics = PhysicsEngine(vectorized=True, workers=workers, sleep_ticks=None)
+    physics.set_world_reference(FlatTerrain())
+    if floor:
+        # One static slab under everything, wider than any region
+        physics.register_object("floor", position=Vector3(extent / 2, -0.5, extent / 2), is_static=True,
+                                collider_size=Vector3(extent, 1, extent))
+    for i in range(bodies):
+        physics.register_object(
+            f"body_{i}",
+            position=Vector3(rng.uniform(0, extent), rng.uniform(0, 4), rng.uniform(0, extent)),
+            velocity=Vector3(rng.uniform(-2, 2), 0, rng.uniform(-2, 2)),
+            is_static=i % 20 == 0,
+            collider_type="sphere" if i % 2 else "box"
+        )
+    return physics
+
+def digest(physics: PhysicsEngine) -> str:
+    store = physics.store
+    state = np.concatenate([store.positions[:store.count], store.velocities[:store.count]])
+    return hashlib.sha1(state.tobytes()).hexdigest()[:12]
+
+def run(label: str, physics: PhysicsEngine, ticks: int, warmup: int) -> float:
+    for _ in range(warmup):
+        physics.update(0.05)
+    start = time.perf_counter()
+    for _ in range(ticks):
+        physics.update(0.05)
+    elapsed = (time.perf_counter() - start) / ticks
+    print(f"{label:<10} {elapsed * 1000:>9.2f} ms/tick  state {digest(physics)}  {physics.stats().get('regions', '')}")
+    physics.shutdown()
+    return elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark parallel physics stepping")
+    parser.add_argument("--bodies", type=int, default=20000, help="Physics bodies")
+    parser.add_argument("--extent", type=float, default=400.0, help="Side of the square the bodies start in")
+    parser.add_argument("--ticks", type=int, default=10, help="Timed ticks")
+    parser.add_argument("--warmup", type=int, default=2, help="Untimed ticks, includes starting the pool")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8], help="Worker counts to try")
+    parser.add_argument("--floor", action="store_true", help="Add a static slab under the whole scene")
+    args = parser.parse_args()
+
+    print(f"{os.cpu_count()} CPUs, {args.bodies} bodies")
+    run("serial", build_engine(args.bodies, args.extent, 0, args.floor), args.ticks, args.warmup)
+    baseline = None
+    for workers in args.workers:
+        elapsed = run(f"{workers} workers", build_engine(args.bodies, args.extent, workers, args.floor), args.ticks, args.warmup)
+        baseline = baseline or elapsed
+        print(f"{'':<10} {baseline / elapsed:>9.2f}x vs {args.workers[0]} worker(s)")
+
+if __name__ == "__main__":
+    main()
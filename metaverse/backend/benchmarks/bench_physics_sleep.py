@@ -0,0 +1,87 @@
+"""Check that grid and brute-force collisions agree with sleeping enabled, and time both.
+
+Bodies settle and fall asleep, then fast bodies are fired into them to
+wake islands mid-pass. Every tick the full state of both engines is
+compared.
+
+Run from metaverse/backend:  python benchmarks/bench_physics_sleep.py
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.physics_engine import PhysicsEngine
+from app.core.vector3 import Vector3
+
+class FlatTerrain:
+    def get_terrain_height(self, x: float, z: float) -> float:
+        return 0.0
+
+    def get_terrain_heights(self, xs, zs) -> np.ndarray:
+        return np.zeros(len(xs), dtype=np.float64)
+
+def build_engine(bodies: int, seed: int, cell_size) -> PhysicsEngine:
+    rng = random.Random(seed)
+    extent = (bodies ** 0.5) * 1.7  # Dense enough for islands of several bodies
+    physics = PhysicsEngine(collision_cell_size=cell_size)
+    physics.set_world_reference(FlatTerrain())
+    for i in range(bodies):
+        physics.register_object(
+            f"body_{i}",
+            position=Vector3(rng.uniform(0, extent), rng.uniform(0, 3), rng.uniform(0, extent)),
+            velocity=Vector3(rng.uniform(-1, 1), 0, rng.uniform(-1, 1)),
+            is_static=i % 25 == 0,
+            collider_type="sphere" if i % 3 == 0 else "box"
+        )
+    return physics
+
+def fire(physics: PhysicsEngine, tick: int, count: int):
+    for k in range(count):
+        physics.register_object(f"hit_{tick}_{k}", position=Vector3(-5 + k, 0.5, 3 + k * 4),
+                                velocity=Vector3(7, 0, 0.3 * k))
+
+def state(physics: PhysicsEngine):
+    return [(obj.position.x, obj.position.y, obj.position.z,
+             obj.velocity.x, obj.velocity.y, obj.velocity.z, obj.sleeping)
+            for obj in physics.objects.values()]
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare grid and brute-force collisions with sleeping")
+    parser.add_argument("--bodies", type=int, nargs="+", default=[150, 600], help="Body counts")
+    parser.add_argument("--seeds", type=int, default=4, help="Scenes per body count")
+    parser.add_argument("--ticks", type=int, default=70, help="Ticks per scene")
+    parser.add_argument("--hits", type=int, nargs="+", default=[25, 45], help="Ticks that fire bodies in")
+    args = parser.parse_args()
+
+    for bodies in args.bodies:
+        for seed in range(1, args.seeds + 1):
+            grid = build_engine(bodies, seed, 4.0)
+            brute = build_engine(bodies, seed, None)
+            timings = {"grid": 0.0, "brute": 0.0}
+            diverged = None
+            for tick in range(args.ticks):
+                if tick in args.hits:
+                    fire(grid, tick, 6)
+                    fire(brute, tick, 6)
+                for label, physics in (("grid", grid), ("brute", brute)):
+                    start = time.perf_counter()
+                    physics.update(0.05)
+                    timings[label] += time.perf_counter() - start
+                if state(grid) != state(brute):
+                    diverged = tick
+                    break
+
+            result = "identical" if diverged is None else f"DIVERGED at tick {diverged}"
+            print(f"{bodies:>5} bodies seed {seed}: {result:<20} "
+                  f"grid {timings['grid'] / args.ticks * 1000:>7.2f} ms/tick  "
+                  f"brute {timings['brute'] / args.ticks * 1000:>7.2f} ms/tick  "
+                  f"{grid.stats()['sleeping']} asleep")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Count Vector3 allocations and time per tick in the scalar physics and NPC paths.
+
+Run from metaverse/backend:  python benchmarks/bench_vector_alloc.py
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.ai.ai_system import AISystem
+from app.core.physics_engine import PhysicsEngine
+from app.core.vector3 import Vector3
+
+class AllocationCounter:
+    """Counts Vector3 constructions by wrapping __init__"""
+
+    def __init__(self):
+        self.count = 0
+        self._original = Vector3.__init__
+
+    def __enter__(self):
+        original = self._original
+
+        def counting_init(vector, *args, **kwargs):
+            self.count += 1
+            original(vector, *args, **kwargs)
+
+        Vector3.__init__ = counting_init
+        return self
+
+    def __exit__(self, *exc):
+        Vector3.__init__ = self._original
+
+def build_physics(bodies: int) -> PhysicsEngine:
+    rng = random.Random(3)
+    physics = PhysicsEngine()
+    for i in range(bodies):
+        physics.register_object(
+            f"body_{i}",
+            position=Vector3(rng.uniform(0, 200), rng.uniform(0, 20), rng.uniform(0, 200)),
+            velocity=Vector3(rng.uniform(-1, 1), 0, rng.uniform(-1, 1)),
+            is_static=i % 10 == 0,
+            collider_type="sphere" if i % 2 else "box"
+        )
+    return physics
+
+async def build_npcs(count: int) -> AISystem:
+    random.seed(5)
+    ai_system = AISystem()
+    await ai_system.initialize()
+    for _ in range(count):
+        await ai_system.create_npc(Vector3(random.uniform(-100, 100), 0, random.uniform(-100, 100)))
+    # Give every NPC a target so the walk path runs
+    for npc in ai_system.npcs.values():
+        npc.target_position = Vector3(npc.position.x + 50, 0, npc.position.z)
+    return ai_system
+
+def report(label: str, allocations: int, elapsed: float, ticks: int):
+    print(f"{label:<8} {allocations / ticks:>10.0f} Vector3/tick {elapsed / ticks * 1000:>8.2f} ms/tick")
+
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmark Vector3 allocations per tick")
+    parser.add_argument("--bodies", type=int, default=2000, help="Physics bodies")
+    parser.add_argument("--npcs", type=int, default=2000, help="NPCs")
+    parser.add_argument("--ticks", type=int, default=20, help="Ticks to run")
+    args = parser.parse_args()
+
+    physics = build_physics(args.bodies)
+    with AllocationCounter() as counter:
+        start = time.perf_counter()
+        for _ in range(args.ticks):
+            physics.update(0.05)
+        elapsed = time.perf_counter() - start
+    report("physics", counter.count, elapsed, args.ticks)
+
+    ai_system = await build_npcs(args.npcs)
+    with AllocationCounter() as counter:
+        start = time.perf_counter()
+        for _ in range(args.ticks):
+            await ai_system.update_npcs()
+        elapsed = time.perf_counter() - start
+    report("npcs", counter.count, elapsed, args.ticks)
+
+if __name__ == "__main__":
+    asyncio.run(main())